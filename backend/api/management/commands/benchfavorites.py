@@ -0,0 +1,153 @@
+import random
+import statistics
+import time
+from typing import Callable
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from foodgram.models import Favorite, Recipe
+from users.models import User
+
+PAGE_SIZE = 6
+PERCENTILES = (50, 95, 99)
+
+SEED_FAVORITES_SQL = '''
+INSERT INTO {table} (user_id, recipe_id)
+SELECT u.id, r.id
+FROM unnest(%(users)s::bigint[]) WITH ORDINALITY AS u (id, n)
+CROSS JOIN generate_series(0, %(per_user)s - 1) AS k
+JOIN unnest(%(recipes)s::bigint[]) WITH ORDINALITY AS r (id, n)
+    ON r.n - 1 = (u.n - 1 + k) %% %(n_recipes)s
+'''
+
+
+class Rollback(Exception):
+    """Discards the seeded dataset."""
+
+
+class Command(BaseCommand):
+    help = ('Measure the latency of favorite lookups and inserts on '
+            'a seeded dataset, to compare table layouts between runs')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', help='Users in the seeded dataset',
+                            type=int, default=10000)
+        parser.add_argument('--recipes', help='Recipes in the seeded dataset',
+                            type=int, default=1000)
+        parser.add_argument('--per-user', help='Favorites of every user',
+                            type=int, default=100)
+        parser.add_argument('--samples', help='Timed runs of every operation',
+                            type=int, default=1000)
+
+    def handle(self, *args, **kwargs):
+        if connection.vendor != 'postgresql':
+            raise CommandError('The benchmark runs on PostgreSQL only.')
+        if min(kwargs['users'], kwargs['recipes'], kwargs['per_user'],
+               kwargs['samples']) < 1:
+            raise CommandError('Expected a positive dataset size.')
+        if kwargs['per_user'] > kwargs['recipes']:
+            raise CommandError('A user favorites every recipe at most once.')
+        if kwargs['samples'] > kwargs['users']:
+            raise CommandError('Every timed insert needs a user of its own.')
+
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                users, recipes, extra = self._seed(
+                    kwargs['users'], kwargs['recipes'], kwargs['per_user']
+                )
+                self.stdout.write(
+                    f'{self._get_layout()}, '
+                    f'{kwargs["users"] * kwargs["per_user"]} favorites '
+                    f'seeded in {time.perf_counter() - started:.1f} s'
+                )
+                for name, operation in self._get_operations(
+                    users, recipes, extra, kwargs['per_user']
+                ):
+                    self._measure(name, operation, kwargs['samples'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _seed(self, n_users: int, n_recipes: int,
+              per_user: int) -> tuple[list[int], list[int], int]:
+        users = User.objects.bulk_create(
+            (User(email=f'bench{i}@example.com', username=f'bench{i}',
+                  first_name='bench', last_name='bench')
+             for i in range(n_users)),
+            batch_size=1000
+        )
+        *recipes, extra = Recipe.objects.bulk_create(
+            (Recipe(name=f'bench{i}', text='bench', image='bench.png',
+                    cooking_time=1, author=users[i % n_users])
+             for i in range(n_recipes + 1)),
+            batch_size=1000
+        )
+        user_ids = [user.pk for user in users]
+        recipe_ids = [recipe.pk for recipe in recipes]
+
+        table = connection.ops.quote_name(Favorite._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(SEED_FAVORITES_SQL.format(table=table), {
+                'users': user_ids,
+                'recipes': recipe_ids,
+                'per_user': per_user,
+                'n_recipes': n_recipes,
+            })
+            cursor.execute(f'ANALYZE {table}')
+        return user_ids, recipe_ids, extra.pk
+
+    def _get_layout(self) -> str:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT count(*) FROM pg_inherits '
+                'WHERE inhparent = %s::regclass',
+                (Favorite._meta.db_table,)
+            )
+            partitions, = cursor.fetchone()
+        return (f'{partitions} partitions' if partitions
+                else 'Unpartitioned table')
+
+    def _get_operations(self, users: list[int], recipes: list[int],
+                        extra: int, per_user: int):
+        def exists():
+            n = random.randrange(len(users))
+            recipe = recipes[(n + random.randrange(per_user)) % len(recipes)]
+            Favorite.objects.filter(user_id=users[n],
+                                    recipe_id=recipe).exists()
+
+        def user_favorites():
+            list(Favorite.objects.filter(
+                user_id=random.choice(users)
+            ).values_list('recipe_id', flat=True))
+
+        def recipe_page():
+            list(Recipe.objects.annotate_is_favorited_in_shopping_cart(
+                user_id=random.choice(users)
+            ).values_list('pk', 'is_favorited')[:PAGE_SIZE])
+
+        # Every user favorites the extra recipe at most once.
+        new_favorites = iter(random.sample(users, len(users)))
+
+        def insert():
+            Favorite.objects.bulk_create(
+                (Favorite(user_id=next(new_favorites), recipe_id=extra),)
+            )
+
+        return (('exists', exists),
+                ('user favorites', user_favorites),
+                ('recipe page', recipe_page),
+                ('insert', insert))
+
+    def _measure(self, name: str, operation: Callable[[], None],
+                 samples: int) -> None:
+        timings = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            operation()
+            timings.append((time.perf_counter() - started) * 1000)
+        quantiles = statistics.quantiles(timings, n=100)
+        self.stdout.write(f'{name:>15}: ' + ', '.join(
+            f'p{p} {quantiles[p - 1]:.3f} ms' for p in PERCENTILES
+        ))
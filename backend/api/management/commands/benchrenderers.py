@@ -0,0 +1,67 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.parsers import MessagePackParser, ORJSONParser
+from api.renderers import MessagePackRenderer, ORJSONRenderer
+from api.serializers import IngredientSerializer, RecipeReadSerializer
+from foodgram.models import Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    help = ('Compare per-response serialization time of DRF JSON, '
+            'orjson and MessagePack on recipe and ingredient lists')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', help='Recipes per page',
+                            type=int, default=100)
+        parser.add_argument('--repeat', help='Renders per measurement',
+                            type=int, default=200)
+
+    def handle(self, *args, **kwargs):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        recipes = Recipe.objects.select_related('author').prefetch_related(
+            'tags', 'ingredients'
+        )[:kwargs['recipes']]
+        payloads = {
+            'recipes': RecipeReadSerializer(
+                recipes, many=True, context={'request': request}
+            ).data,
+            'ingredients': IngredientSerializer(
+                Ingredient.objects.all(), many=True
+            ).data,
+        }
+        codecs = (
+            ('json', JSONRenderer(), JSONParser()),
+            ('orjson', ORJSONRenderer(), ORJSONParser()),
+            ('msgpack', MessagePackRenderer(), MessagePackParser()),
+        )
+
+        for name, data in payloads.items():
+            self.stdout.write(f'{name}: {len(data)} items')
+            baseline = None
+            for codec, renderer, parser in codecs:
+                render_ms, content = self._measure(
+                    lambda: renderer.render(data), kwargs['repeat']
+                )
+                parse_ms, _ = self._measure(
+                    lambda: parser.parse(io.BytesIO(content)),
+                    kwargs['repeat']
+                )
+                baseline = baseline or render_ms
+                self.stdout.write(
+                    f'  {codec:<8} render {render_ms:8.3f} ms '
+                    f'(x{baseline / render_ms:.1f}), '
+                    f'parse {parse_ms:8.3f} ms, {len(content)} bytes'
+                )
+
+    def _measure(self, func, repeat: int):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        return (time.perf_counter() - start) * 1000 / repeat, result
@@ -0,0 +1,111 @@
+from typing import Optional
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import QuerySet, Value
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.management.commands.checkqueries import Rollback, seed
+from api.serializers import (IngredientSerializer, RecipeReadSerializer,
+                             TagSerializer, UserReadSerializer)
+from api.serializers.common import CommonRecipeReadSerializer
+from api.serializers.fast import compile_serializer, get_fast_serializer
+from foodgram.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Check that fast path serializers render byte-identical '
+            'output to the regular serializers on the current database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Id of the requesting user',
+                            type=int)
+        parser.add_argument('--seed', action='store_true',
+                            help='Add a dataset in a rolled back transaction '
+                            'and check it anonymously and for its user')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['seed']:
+            mismatches = 0
+            try:
+                with transaction.atomic():
+                    user = seed()[0]
+                    Token.objects.create(user=user)
+                    mismatches = (self._check_all(None)
+                                  + self._check_all(user))
+                    raise Rollback
+            except Rollback:
+                pass
+        else:
+            user = None
+            if kwargs['user'] is not None:
+                user = User.objects.filter(pk=kwargs['user']).first()
+                if user is None:
+                    raise CommandError(
+                        f'User not exists, id: {kwargs["user"]}'
+                    )
+            mismatches = self._check_all(user)
+
+        if mismatches:
+            raise CommandError(f'{mismatches} objects differ.')
+
+    def _check_all(self, user: Optional[User]) -> int:
+        request = Request(APIRequestFactory().get('/api/'))
+        request.user = user
+        request.auth = user and getattr(user, 'auth_token', None)
+
+        recipes = Recipe.objects.select_related('author').annotate(
+            is_favorited=Value(False), is_in_shopping_cart=Value(False)
+        )
+        if request.auth:
+            recipes = recipes.annotate_is_favorited_in_shopping_cart(
+                user_id=user.id
+            )
+
+        checks = (
+            (RecipeReadSerializer, recipes.order_by('pk')),
+            (CommonRecipeReadSerializer, Recipe.objects.order_by('pk')),
+            (UserReadSerializer, User.objects.order_by('pk')),
+            (TagSerializer, Tag.objects.order_by('pk')),
+            (IngredientSerializer, Ingredient.objects.order_by('pk')),
+        )
+        mismatches = 0
+        for serializer_class, queryset in checks:
+            mismatches += self._check(serializer_class, queryset,
+                                      {'request': request})
+        return mismatches
+
+    def _check(self, serializer_class, queryset: QuerySet,
+               context: dict) -> int:
+        name = serializer_class.__name__
+        if compile_serializer(serializer_class) is None:
+            self.stdout.write(self.style.WARNING(f'{name}: not supported'))
+            return 0
+
+        renderer = JSONRenderer()
+        fast = get_fast_serializer(serializer_class, context)
+        fast_data = fast.serialize(fast.values(queryset))
+        data = serializer_class(queryset, many=True, context=context).data
+        mismatched: list[Optional[int]] = [
+            obj.get('id') for obj, fast_obj in zip(data, fast_data)
+            if renderer.render(obj) != renderer.render(fast_obj)
+        ]
+        if len(data) != len(fast_data):
+            mismatched.append(None)
+
+        if mismatched:
+            self.stdout.write(self.style.ERROR(
+                f'{name}: {len(mismatched)} of {len(data)} differ, '
+                f'ids: {mismatched[:10]}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: {len(data)} identical'
+            ))
+        return len(mismatched)
@@ -0,0 +1,148 @@
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+from rest_framework.authtoken.models import Token
+
+from api.management.commands.checkthrottle import patch_throttle
+from core.const import INGREDIENTS_CACHE_KEY, TAGS_CACHE_KEY
+from core.queries import QueryTracker, get_budget
+from foodgram.facets import invalidate_facets
+from foodgram.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                             ShoppingCart, Tag)
+from users.models import Subscription, User
+
+# More rows than on a page, so a query per row shows up as a repeat.
+N_AUTHORS = 8
+RECIPES_PER_AUTHOR = 2
+
+# Cached lists are checked cold, and mustn't keep the rolled back rows.
+LIST_CACHE_KEYS = (TAGS_CACHE_KEY, INGREDIENTS_CACHE_KEY)
+
+
+class Rollback(Exception):
+    """Discards the seeded dataset and the writes of the requests."""
+
+
+def seed() -> tuple[User, User, Recipe, Ingredient]:
+    """Seed a dataset, call inside a transaction to roll it back.
+
+    Returns the requesting user, an author they don't follow, a recipe
+    out of their lists and an ingredient.
+    """
+    user, *authors = User.objects.bulk_create(
+        User(email=f'queries{i}@example.com', username=f'queries{i}',
+             first_name='queries', last_name='queries')
+        for i in range(N_AUTHORS + 1)
+    )
+    tag = Tag.objects.create(name='queries', slug='queries')
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'queries{i}', measurement_unit='г')
+        for i in range(2)
+    )
+    recipes = Recipe.objects.bulk_create(
+        Recipe(name=f'queries{i}', text='queries', image='queries.png',
+               cooking_time=1, author=authors[i % N_AUTHORS])
+        for i in range(N_AUTHORS * RECIPES_PER_AUTHOR)
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe=recipe, tag=tag) for recipe in recipes
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+        for recipe in recipes for ingredient in ingredients
+    )
+    for model in (Favorite, ShoppingCart):
+        model.objects.bulk_create(model(user=user, recipe=recipe)
+                                  for recipe in recipes[1:])
+    # The last author is left for the subscribe request.
+    Subscription.objects.bulk_create(
+        Subscription(user=user, author=author) for author in authors[:-1]
+    )
+    return user, authors[-1], recipes[0], ingredients[0]
+
+
+class Command(BaseCommand):
+    help = ('Request the API endpoints on a seeded dataset and fail when '
+            'one repeats a query shape or exceeds its budget '
+            'from `query_budgets.json`')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slow', action='store_true',
+                            help='Check the regular serializers, '
+                                 'not the fast path')
+
+    def handle(self, *args, **kwargs):
+        failures = 0
+        cache.delete_many(LIST_CACHE_KEYS)
+        invalidate_facets()
+        try:
+            # Buckets of a run of its own, earlier runs mustn't get
+            # the requests throttled.
+            with transaction.atomic(), override_settings(
+                ALLOWED_HOSTS=['testserver'],
+                FAST_SERIALIZERS=not kwargs['slow']
+            ), patch_throttle(LocMemCache('checkqueries', {})):
+                user, author, recipe, ingredient = seed()
+                token = Token.objects.create(user=user)
+                client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+                for method, path in self._get_requests(author, recipe,
+                                                       ingredient):
+                    failures += self._check(client, method, path)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            cache.delete_many(LIST_CACHE_KEYS)
+            invalidate_facets()
+
+        if failures:
+            raise CommandError(f'{failures} endpoints are over budget.')
+        self.stdout.write(self.style.SUCCESS('All endpoints are in budget.'))
+
+    def _get_requests(self, author: User, recipe: Recipe,
+                      ingredient: Ingredient) -> tuple[tuple[str, str], ...]:
+        return (
+            ('get', '/api/recipes/'),
+            ('get', '/api/recipes/?is_favorited=1&is_in_shopping_cart=1'),
+            ('get', '/api/recipes/?format=ndjson'),
+            ('get', f'/api/recipes/{recipe.pk}/'),
+            ('get', f'/api/recipes/{recipe.pk}/similar/'),
+            ('get', '/api/recipes/facets/?tags=queries'
+                    '&facets=tags&facets=author'),
+            ('get', '/api/recipes/facets/?is_favorited=1&facets=tags'),
+            ('get', f'/api/recipes/pantry/?ingredients={ingredient.pk}'),
+            ('post', f'/api/recipes/{recipe.pk}/favorite/'),
+            ('post', f'/api/recipes/{recipe.pk}/shopping_cart/'),
+            ('get', '/api/recipes/download_shopping_cart/'),
+            ('delete', f'/api/recipes/{recipe.pk}/favorite/'),
+            ('get', '/api/users/'),
+            ('get', f'/api/users/{author.pk}/'),
+            ('get', '/api/users/me/'),
+            ('post', f'/api/users/{author.pk}/subscribe/'),
+            ('get', '/api/users/subscriptions/?recipes_limit=1'),
+            ('get', '/api/tags/'),
+            ('get', '/api/ingredients/?name=queries'),
+        )
+
+    def _check(self, client: Client, method: str, path: str) -> int:
+        with QueryTracker() as tracker:
+            response = getattr(client, method)(path)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        url_name = getattr(response.resolver_match, 'url_name', None)
+        budget = get_budget(url_name, method)
+        problems = tracker.check(budget)
+
+        line = (f'{method.upper()} {path} {response.status_code}: '
+                f'{tracker.count}/{budget["queries"]} queries')
+        if response.status_code >= 400:
+            problems.append(f'Unexpected status {response.status_code}.')
+        if not problems:
+            self.stdout.write(line)
+            return 0
+        self.stdout.write(self.style.ERROR(line))
+        for problem in problems:
+            self.stdout.write(f'  {problem}')
+        return 1
@@ -0,0 +1,144 @@
+import json
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.http import QueryDict
+
+from api.filters import RecipeListFilter
+from core.const import RECIPE_ORDERING
+from foodgram.models import Favorite, Recipe, ShoppingCart, Tag
+from users.models import User
+
+INDEXED_TABLES = frozenset((
+    Recipe._meta.db_table,
+    Recipe.tags.through._meta.db_table,
+    Favorite._meta.db_table,
+    ShoppingCart._meta.db_table,
+))
+
+PAGE_SIZE = 6
+
+
+class Rollback(Exception):
+    """Discards the seeded dataset."""
+
+
+class Command(BaseCommand):
+    help = ('Check with EXPLAIN that recipe list filters are served by '
+            'indexes and never fall back to a sequential scan')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', help='Recipes in the seeded dataset',
+                            type=int, default=20000)
+        parser.add_argument('--users', help='Users in the seeded dataset',
+                            type=int, default=200)
+        parser.add_argument('--tags', help='Tags in the seeded dataset',
+                            type=int, default=50)
+        parser.add_argument('--verbose-plans', action='store_true',
+                            help='Print the plan of every query')
+
+    def handle(self, *args, **kwargs):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Query plans are checked on PostgreSQL only.')
+        if min(kwargs['recipes'], kwargs['users'], kwargs['tags']) < 1:
+            raise CommandError('Expected a positive dataset size.')
+
+        failures = []
+        try:
+            with transaction.atomic():
+                user, tag = self._seed(kwargs['recipes'], kwargs['users'],
+                                       kwargs['tags'])
+                parents = self._get_partition_parents()
+                for name, queryset in self._get_querysets(user, tag):
+                    failures.extend(
+                        self._check(name, queryset, parents,
+                                    kwargs['verbose_plans'])
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError('Sequential scans found:\n' + '\n'.join(
+                f'  {name}: {table}' for name, table in failures
+            ))
+        self.stdout.write(self.style.SUCCESS('All query plans use indexes.'))
+
+    def _seed(self, n_recipes: int, n_users: int,
+              n_tags: int) -> tuple[User, Tag]:
+        users = User.objects.bulk_create(
+            User(email=f'explain{i}@example.com', username=f'explain{i}',
+                 first_name='explain', last_name='explain')
+            for i in range(n_users)
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'explain{i}', slug=f'explain{i}')
+            for i in range(n_tags)
+        )
+        recipes = Recipe.objects.bulk_create(
+            (Recipe(name=f'explain{i}', text='explain', image='explain.png',
+                    cooking_time=1, author=users[i % n_users])
+             for i in range(n_recipes)),
+            batch_size=1000
+        )
+
+        Recipe.tags.through.objects.bulk_create(
+            (Recipe.tags.through(recipe=recipe, tag=tags[i % n_tags])
+             for i, recipe in enumerate(recipes)),
+            batch_size=1000
+        )
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create(
+                (model(user=users[i % n_users], recipe=recipe)
+                 for i, recipe in enumerate(recipes)),
+                batch_size=1000
+            )
+
+        with connection.cursor() as cursor:
+            for table in sorted(INDEXED_TABLES):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+        return users[0], tags[0]
+
+    def _get_querysets(self, user: User, tag: Tag):
+        request = SimpleNamespace(user=user, auth=True)
+        cases = (
+            ('list', ''),
+            ('author', f'author={user.pk}'),
+            ('tags', f'tags={tag.slug}'),
+            ('is_favorited', 'is_favorited=1'),
+            ('is_in_shopping_cart', 'is_in_shopping_cart=1'),
+            ('combined', f'tags={tag.slug}&is_favorited=1'),
+        )
+        for name, query in cases:
+            filterset = RecipeListFilter(
+                QueryDict(query),
+                queryset=Recipe.objects.all(),
+                request=request
+            )
+            if not filterset.is_valid():
+                raise CommandError(f'{name}: {filterset.errors}')
+            yield name, filterset.qs.order_by(*RECIPE_ORDERING)[:PAGE_SIZE]
+
+    def _get_partition_parents(self) -> dict[str, str]:
+        """Partitioned tables are scanned by their partitions."""
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT inhrelid::regclass::text, '
+                           'inhparent::regclass::text FROM pg_inherits')
+            return dict(cursor.fetchall())
+
+    def _check(self, name: str, queryset: QuerySet, parents: dict[str, str],
+               verbose: bool) -> list[tuple[str, str]]:
+        plan = json.loads(queryset.explain(format='json'))
+        if verbose:
+            self.stdout.write(f'{name}\n{json.dumps(plan, indent=2)}')
+        tables = (parents.get(table, table)
+                  for table in self._seq_scans(plan[0]['Plan']))
+        return [(name, table) for table in tables if table in INDEXED_TABLES]
+
+    def _seq_scans(self, node: dict):
+        if node['Node Type'] == 'Seq Scan':
+            yield node['Relation Name']
+        for child in node.get('Plans', ()):
+            yield from self._seq_scans(child)
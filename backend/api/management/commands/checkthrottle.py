@@ -0,0 +1,121 @@
+import multiprocessing
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from django.core.cache import BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+
+from api.throttling import CostThrottle
+
+CAPACITY = 10
+RATE = 1
+COSTS = {'tags-list': 4, 'ingredients-list': 25}
+
+# Seconds to advance the clock, path, expected status and Retry-After.
+STEPS = (
+    (0, '/api/tags/', 200, None),
+    (0, '/api/tags/', 200, None),
+    (0, '/api/tags/', 429, '2'),
+    (2, '/api/tags/', 200, None),
+    # A cost above the capacity is charged as a full bucket.
+    (10, '/api/ingredients/', 200, None),
+    (0, '/api/ingredients/', 429, '10'),
+    (5, '/api/ingredients/', 429, '5'),
+)
+
+# Concurrent clients spending one bucket of the shared file cache.
+CONCURRENT_COST = 20
+CONCURRENT_CAPACITY = 120
+CONCURRENT_PROCESSES = 16
+CONCURRENT_REQUESTS = 64
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@contextmanager
+def patch_throttle(cache: BaseCache,
+                   clock: Callable[[], float] = time.time) -> Iterator[None]:
+    """Keep buckets in `cache` and tell the time with `clock`."""
+    saved = CostThrottle.cache, CostThrottle.timer
+    CostThrottle.cache, CostThrottle.timer = cache, clock
+    try:
+        yield
+    finally:
+        CostThrottle.cache, CostThrottle.timer = saved
+
+
+def request_tags(_) -> int:
+    return Client().get('/api/tags/').status_code
+
+
+class Command(BaseCommand):
+    help = ('Drive the throttle with a fake clock and fail when refill, '
+            'costs, `Retry-After` or concurrent spending are off')
+
+    def handle(self, *args, **kwargs):
+        clock = FakeClock()
+        failures = 0
+        with override_settings(ALLOWED_HOSTS=['testserver'],
+                               THROTTLE_BUCKET_CAPACITY=CAPACITY,
+                               THROTTLE_BUCKET_RATE=RATE,
+                               THROTTLE_COSTS=COSTS):
+            with patch_throttle(LocMemCache('checkthrottle', {}), clock):
+                client = Client()
+                for seconds, path, status, retry_after in STEPS:
+                    clock.now += seconds
+                    failures += self._check(client, clock, path, status,
+                                            retry_after)
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            THROTTLE_BUCKET_CAPACITY=CONCURRENT_CAPACITY,
+            THROTTLE_COSTS={'tags-list': CONCURRENT_COST}
+        ), patch_throttle(FileBasedCache(directory, {}), clock):
+            failures += self._check_concurrent()
+
+        if failures:
+            raise CommandError(f'{failures} throttle checks failed.')
+        self.stdout.write(self.style.SUCCESS('Throttle checks passed.'))
+
+    def _check(self, client: Client, clock: FakeClock, path: str,
+               status: int, retry_after: Optional[str]) -> int:
+        response = client.get(path)
+        got = (response.status_code, response.get('Retry-After'))
+        line = (f'{clock.now:.0f} s GET {path}: {got[0]}, '
+                f'Retry-After {got[1]}')
+        if got == (status, retry_after):
+            self.stdout.write(line)
+            return 0
+        self.stdout.write(self.style.ERROR(
+            f'{line}, expected {status}, Retry-After {retry_after}'
+        ))
+        return 1
+
+    def _check_concurrent(self) -> int:
+        # Forked workers mustn't share the connections of the parent.
+        connections.close_all()
+        with multiprocessing.get_context('fork').Pool(
+            CONCURRENT_PROCESSES
+        ) as pool:
+            statuses = pool.map(request_tags, range(CONCURRENT_REQUESTS))
+        allowed = statuses.count(200)
+        expected = CONCURRENT_CAPACITY // CONCURRENT_COST
+        line = (f'{CONCURRENT_REQUESTS} concurrent GET /api/tags/ '
+                f'at cost {CONCURRENT_COST}: {allowed} allowed')
+        if allowed == expected:
+            self.stdout.write(line)
+            return 0
+        self.stdout.write(self.style.ERROR(f'{line}, expected {expected}'))
+        return 1
@@ -0,0 +1,123 @@
+import time
+from contextlib import nullcontext
+from itertools import islice
+from pathlib import Path
+from typing import IO, Any, Iterator, Optional
+
+import orjson
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+from api.serializers import RecipeImportSerializer
+from core.const import IMPORT_BATCH_SIZE
+from foodgram.dataset import STDIO_PATH, open_dataset
+from foodgram.importing import Errors, RecipeImporter
+from foodgram.management.commands.dumpdataset import report_counts
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Import recipes of one author from NDJSON, a recipe per line, '
+            'resolving tags and ingredients and inserting them in bulk '
+            'with a transaction per batch')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', nargs='?', default=STDIO_PATH,
+                            help='File to read, `.gz` is decompressed, '
+                            'stdin by default')
+        parser.add_argument('--author', required=True,
+                            help='Username or email of the author')
+        parser.add_argument('--images-dir',
+                            help='Directory of relative image paths, '
+                            'the directory of the input by default')
+        parser.add_argument('--batch-size', help='Recipes per transaction',
+                            type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--rejects',
+                            help='NDJSON file for the errors of rejected '
+                            'lines, stderr by default')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Check the lines without storing anything')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['batch_size'] < 1:
+            raise CommandError('Expected a positive batch size.')
+        author = User.objects.filter(
+            Q(username=kwargs['author']) | Q(email=kwargs['author'])
+        ).first()
+        if author is None:
+            raise CommandError(f'User {kwargs["author"]} is not found.')
+
+        importer = RecipeImporter(author, self._get_images_dir(kwargs),
+                                  kwargs['dry_run'])
+        started = time.perf_counter()
+        imported = rejected = 0
+        try:
+            with open_dataset(kwargs['input'], 'rb') as lines, (
+                open(kwargs['rejects'], 'wb') if kwargs['rejects']
+                else nullcontext()
+            ) as rejects:
+                for batch in self._read_batches(lines, kwargs['batch_size']):
+                    rows, errors = self._validate(batch)
+                    count, resolve_errors = importer.import_batch(rows)
+                    imported += count
+                    for number, line_errors in errors + resolve_errors:
+                        self._reject(rejects, number, line_errors)
+                        rejected += 1
+                    self._report(imported, rejected, started)
+        except (DatabaseError, OSError) as exc:
+            raise CommandError(f'Import is interrupted after {imported} '
+                               f'recipes: {exc}')
+
+        report_counts(self.stderr, {'recipes': imported},
+                      time.perf_counter() - started)
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Checked" if kwargs["dry_run"] else "Imported"} {imported} '
+            f'recipes, rejected {rejected} lines.'
+        ))
+
+    def _get_images_dir(self, kwargs: dict[str, Any]) -> Path:
+        if kwargs['images_dir']:
+            return Path(kwargs['images_dir'])
+        if kwargs['input'] == STDIO_PATH:
+            return Path.cwd()
+        return Path(kwargs['input']).resolve().parent
+
+    def _read_batches(
+        self, lines: IO[bytes], size: int
+    ) -> Iterator[list[tuple[int, bytes]]]:
+        numbered = ((number, line) for number, line in enumerate(lines, 1)
+                    if line.strip())
+        while batch := list(islice(numbered, size)):
+            yield batch
+
+    def _validate(self, batch: list[tuple[int, bytes]]) -> tuple[
+        list[tuple[int, dict[str, Any]]], list[tuple[int, Errors]]
+    ]:
+        serializer = RecipeImportSerializer()
+        rows, errors = [], []
+        for number, line in batch:
+            try:
+                rows.append((number,
+                             serializer.run_validation(orjson.loads(line))))
+            except orjson.JSONDecodeError as exc:
+                errors.append((number, {'non_field_errors': [str(exc)]}))
+            except ValidationError as exc:
+                errors.append((number, exc.detail))
+        return rows, errors
+
+    def _reject(self, rejects: Optional[IO[bytes]], number: int,
+                errors: Errors) -> None:
+        if rejects is None:
+            self.stderr.write(f'Line {number}: '
+                              f'{orjson.dumps(errors).decode()}')
+            return
+        rejects.write(orjson.dumps({'line': number, 'errors': errors}))
+        rejects.write(b'\n')
+
+    def _report(self, imported: int, rejected: int, started: float) -> None:
+        seconds = time.perf_counter() - started
+        self.stderr.write(f'{imported} imported, {rejected} rejected '
+                          f'in {seconds:.1f} s, '
+                          f'{imported / max(seconds, 1e-9):.0f} recipes/s')
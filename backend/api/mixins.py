@@ -0,0 +1,422 @@
+from itertools import islice
+from typing import AsyncIterator, Callable, Iterator, Optional, Type
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Model, QuerySet, prefetch_related_objects
+from django.http import Http404, StreamingHttpResponse
+from django.utils.decorators import classonlymethod
+from django.utils.functional import cached_property
+from rest_framework import exceptions
+from rest_framework.generics import get_object_or_404
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
+
+from api.renderers import NDJSONRenderer, render_line
+from api.serializers.fast import (FastSerializer, UnsupportedSerializer,
+                                  get_fast_serializer)
+from api.serializers.sparse import get_sparse_serializer
+from core.const import (EXPAND_QUERY_PARAM, EXPORT_CHUNK_SIZE,
+                        FIELDS_QUERY_PARAM, REFERENCE_CACHE_TIMEOUT,
+                        HttpMethod)
+
+
+def _render_lines(items: list) -> bytes:
+    return b''.join(map(render_line, items))
+
+
+def _get_export_end(count: int) -> dict:
+    """Last line of an export, a stream cut short lacks it."""
+    return {'complete': True, 'count': count}
+
+
+class AsyncReadViewSetMixin:
+    """Serve `list` and `retrieve` with the async ORM.
+
+    Every other action is delegated to the regular sync view,
+    which runs in a worker thread, so writes keep working under ASGI.
+    """
+
+    async_actions: tuple = ('list', 'retrieve')
+
+    @classonlymethod
+    def as_view(cls, actions=None, **initkwargs):
+        sync_view = super().as_view(actions, **initkwargs)
+        run_sync_view = sync_to_async(sync_view)
+        actions = dict(actions)
+
+        if HttpMethod.GET in actions and HttpMethod.HEAD not in actions:
+            actions[HttpMethod.HEAD] = actions[HttpMethod.GET]
+
+        async def view(request, *args, **kwargs):
+            if actions.get(request.method.lower()) not in cls.async_actions:
+                return await run_sync_view(request, *args, **kwargs)
+
+            self = cls(**initkwargs)
+            self.action_map = actions
+            return await self.adispatch(request, *args, **kwargs)
+
+        view.__name__ = sync_view.__name__
+        view.__doc__ = sync_view.__doc__
+        view.cls = cls
+        view.initkwargs = initkwargs
+        view.actions = actions
+        view.csrf_exempt = True
+        return view
+
+    async def adispatch(self, request, *args, **kwargs) -> Response:
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            handler = getattr(self, f'a{self.action}')
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response,
+                                               *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request: Request, *args, **kwargs) -> None:
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+
+        neg = self.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = neg
+
+        version, scheme = self.determine_version(request, *args, **kwargs)
+        request.version, request.versioning_scheme = version, scheme
+
+        await self.aperform_authentication(request)
+        self.check_permissions(request)
+        await sync_to_async(self.check_throttles)(request)
+
+    async def aperform_authentication(self, request: Request) -> None:
+        for authenticator in request.authenticators:
+            aauthenticate = getattr(authenticator, 'aauthenticate', None)
+            try:
+                if aauthenticate is None:
+                    user_auth = await sync_to_async(
+                        authenticator.authenticate
+                    )(request)
+                else:
+                    user_auth = await aauthenticate(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth
+                return
+
+        request._not_authenticated()
+
+    async def afilter_queryset(self, queryset: QuerySet) -> QuerySet:
+        # Filter forms validate choices against the database.
+        return await sync_to_async(self.filter_queryset)(queryset)
+
+    async def apaginate_queryset(self, queryset: QuerySet):
+        if self.paginator is None:
+            return None
+        apaginate_queryset = getattr(self.paginator,
+                                     'apaginate_queryset', None)
+        if apaginate_queryset is None:
+            return await sync_to_async(self.paginate_queryset)(queryset)
+        return await apaginate_queryset(queryset, self.request, view=self)
+
+    async def aget_object(self) -> Model:
+        queryset = await self.afilter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+
+        try:
+            obj = await queryset.aget(**filter_kwargs)
+        except (queryset.model.DoesNotExist,
+                TypeError, ValueError, ValidationError):
+            raise Http404
+
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def aserialize(self, serializer: BaseSerializer):
+        # Nested serializers may still touch the database.
+        return await sync_to_async(getattr)(serializer, 'data')
+
+    async def alist(self, request: Request, *args, **kwargs) -> Response:
+        queryset = await self.afilter_queryset(self.get_queryset())
+
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(
+                await self.aserialize(serializer)
+            )
+
+        serializer = self.get_serializer(
+            [obj async for obj in queryset], many=True
+        )
+        return Response(await self.aserialize(serializer))
+
+    async def aretrieve(self, request: Request, *args, **kwargs) -> Response:
+        serializer = self.get_serializer(await self.aget_object())
+        return Response(await self.aserialize(serializer))
+
+
+class FastSerializerMixin:
+    """Serve `list` and `retrieve` through the compiled fast path.
+
+    Falls back to the regular serializer when it isn't supported.
+    The async actions require `AsyncReadViewSetMixin`.
+    """
+
+    def get_fast_serializer(self) -> Optional[FastSerializer]:
+        return get_fast_serializer(self.get_serializer_class(),
+                                   self.get_serializer_context())
+
+    def _fast_values(self, fast: Optional[FastSerializer],
+                     queryset: QuerySet) -> Optional[QuerySet]:
+        if fast is None:
+            return None
+        try:
+            return fast.values(queryset)
+        except UnsupportedSerializer:
+            return None
+
+    def _fast_filter_kwargs(self) -> dict:
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        fast = self.get_fast_serializer()
+        queryset = self._fast_values(
+            fast, self.filter_queryset(self.get_queryset())
+        )
+        if queryset is None:
+            return super().list(request, *args, **kwargs)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fast.serialize(page))
+        return Response(fast.serialize(queryset))
+
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        fast = self.get_fast_serializer()
+        queryset = self._fast_values(
+            fast, self.filter_queryset(self.get_queryset())
+        )
+        if queryset is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        row = get_object_or_404(queryset, **self._fast_filter_kwargs())
+        self.check_object_permissions(request, row)
+        return Response(fast.serialize((row,))[0])
+
+    async def alist(self, request: Request, *args, **kwargs) -> Response:
+        fast = self.get_fast_serializer()
+        queryset = self._fast_values(
+            fast, await self.afilter_queryset(self.get_queryset())
+        )
+        if queryset is None:
+            return await super().alist(request, *args, **kwargs)
+
+        page = await self.apaginate_queryset(queryset)
+        rows = page if page is not None else [row async for row in queryset]
+        data = await sync_to_async(fast.serialize)(rows)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    async def aretrieve(self, request: Request, *args, **kwargs) -> Response:
+        fast = self.get_fast_serializer()
+        queryset = self._fast_values(
+            fast, await self.afilter_queryset(self.get_queryset())
+        )
+        if queryset is None:
+            return await super().aretrieve(request, *args, **kwargs)
+
+        try:
+            row = await queryset.aget(**self._fast_filter_kwargs())
+        except (queryset.model.DoesNotExist,
+                TypeError, ValueError, ValidationError):
+            raise Http404
+
+        self.check_object_permissions(request, row)
+        return Response((await sync_to_async(fast.serialize)((row,)))[0])
+
+
+class NDJSONExportMixin:
+    """Stream the whole filtered list on `?format=ndjson`, unpaginated.
+
+    Rows are read with a server-side cursor and serialized a chunk
+    at a time, so a worker holds one chunk whatever the list size.
+    The last line is `{"complete": true, "count": N}`.
+    Add `NDJSONRenderer` to the view's renderers. The compiled fast
+    path of `FastSerializerMixin` is used when the view has one.
+    """
+
+    export_chunk_size: int = EXPORT_CHUNK_SIZE
+
+    @property
+    def is_export(self) -> bool:
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        return self.action == 'list' and isinstance(renderer, NDJSONRenderer)
+
+    @property
+    def paginator(self):
+        if self.is_export:
+            return None
+        return super().paginator
+
+    def get_export_source(self) -> tuple[QuerySet, Callable[[list], list]]:
+        """Queryset to stream and the serializer of its chunks.
+
+        Filters are validated here, before the response starts.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        fast = getattr(self, 'get_fast_serializer', lambda: None)()
+        if fast is not None:
+            try:
+                return fast.values(queryset), fast.serialize
+            except UnsupportedSerializer:
+                pass
+
+        # Prefetches run per chunk, async iteration doesn't support them.
+        lookups = queryset._prefetch_related_lookups
+
+        def serialize(chunk: list[Model]) -> list:
+            prefetch_related_objects(chunk, *lookups)
+            return self.get_serializer(chunk, many=True).data
+
+        return queryset.prefetch_related(None), serialize
+
+    def _stream_export(self, queryset: QuerySet,
+                       serialize: Callable[[list], list]
+                       ) -> StreamingHttpResponse:
+        # The first chunk is read before the response starts, so a
+        # failing database gets the usual 503 instead of a cut stream.
+        rows = queryset.iterator(chunk_size=self.export_chunk_size)
+        first = self._read_chunk(rows, serialize)
+        # Django buffers the whole stream when its iterator
+        # doesn't match the server, sync for WSGI and async for ASGI.
+        if isinstance(self.request._request, ASGIRequest):
+            stream = self._aiter_export(rows, serialize, first)
+        else:
+            stream = self._iter_export(rows, serialize, first)
+        response = StreamingHttpResponse(
+            stream, content_type=NDJSONRenderer.media_type
+        )
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def _read_chunk(self, rows: Iterator[Model],
+                    serialize: Callable[[list], list]) -> Optional[list]:
+        chunk = list(islice(rows, self.export_chunk_size))
+        return serialize(chunk) if chunk else None
+
+    def _iter_export(self, rows: Iterator[Model],
+                     serialize: Callable[[list], list],
+                     chunk: Optional[list]) -> Iterator[bytes]:
+        count = 0
+        while chunk is not None:
+            count += len(chunk)
+            yield _render_lines(chunk)
+            chunk = self._read_chunk(rows, serialize)
+        yield render_line(_get_export_end(count))
+
+    async def _aiter_export(
+        self, rows: Iterator[Model], serialize: Callable[[list], list],
+        chunk: Optional[list]
+    ) -> AsyncIterator[bytes]:
+        # The cursor belongs to the connection of the request's thread.
+        read_chunk = sync_to_async(self._read_chunk)
+        count = 0
+        while chunk is not None:
+            count += len(chunk)
+            yield _render_lines(chunk)
+            chunk = await read_chunk(rows, serialize)
+        yield render_line(_get_export_end(count))
+
+    def list(self, request: Request, *args, **kwargs):
+        if not self.is_export:
+            return super().list(request, *args, **kwargs)
+        return self._stream_export(*self.get_export_source())
+
+    async def alist(self, request: Request, *args, **kwargs):
+        if not self.is_export:
+            return await super().alist(request, *args, **kwargs)
+        return await sync_to_async(
+            lambda: self._stream_export(*self.get_export_source())
+        )()
+
+
+class SparseFieldsMixin:
+    """Render only the fields listed in `?fields=` on read actions.
+
+    Nested objects are reduced to their id unless listed in `?expand=`.
+    `is_field_requested()` and `is_field_expanded()` let `get_queryset()`
+    skip joins and columns nobody renders.
+    """
+
+    sparse_actions: tuple = ('list', 'retrieve')
+
+    @cached_property
+    def sparse_fields(self) -> Optional[tuple[frozenset, frozenset]]:
+        fields = self.request.query_params.get(FIELDS_QUERY_PARAM)
+        if self.action not in self.sparse_actions or fields is None:
+            return None
+        expand = self.request.query_params.get(EXPAND_QUERY_PARAM, '')
+        return (frozenset(filter(None, fields.split(','))),
+                frozenset(filter(None, expand.split(','))))
+
+    def is_field_requested(self, name: str) -> bool:
+        if self.sparse_fields is None:
+            return True
+        fields, expand = self.sparse_fields
+        return name in fields or name in expand
+
+    def is_field_expanded(self, name: str) -> bool:
+        return self.sparse_fields is None or name in self.sparse_fields[1]
+
+    def get_serializer_class(self) -> Type[BaseSerializer]:
+        serializer_class = super().get_serializer_class()
+        if self.sparse_fields is None:
+            return serializer_class
+        return get_sparse_serializer(serializer_class, *self.sparse_fields)
+
+
+class CachedListMixin:
+    """Serve the list of a small reference table from the cache.
+
+    The whole unfiltered list is cached under `list_cache_key`
+    and narrowed per request by `filter_cached_list()`,
+    model signals delete the key on writes.
+    """
+
+    list_cache_key: str
+
+    @classmethod
+    def get_cached_list(cls) -> list[dict]:
+        data = cache.get(cls.list_cache_key)
+        if data is None:
+            data = list(cls.serializer_class(cls.queryset.all(),
+                                             many=True).data)
+            cache.set(cls.list_cache_key, data, REFERENCE_CACHE_TIMEOUT)
+        return data
+
+    def filter_cached_list(self, data: list[dict]) -> list[dict]:
+        return data
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        return Response(self.filter_cached_list(self.get_cached_list()))
+
+    async def alist(self, request: Request, *args, **kwargs) -> Response:
+        data = await sync_to_async(self.get_cached_list)()
+        return Response(self.filter_cached_list(data))
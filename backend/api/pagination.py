@@ -1,5 +1,35 @@
+from django.core.paginator import InvalidPage
+from django.db.models import QuerySet
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+
+from core.const import PAGE_MAX_SIZE
 
 
 class PageNumberPagination(pagination.PageNumberPagination):
     page_size_query_param = 'limit'
+    max_page_size = PAGE_MAX_SIZE
+
+    async def apaginate_queryset(self, queryset: QuerySet,
+                                 request: Request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        return [obj async for obj in self.page.object_list]
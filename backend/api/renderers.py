@@ -0,0 +1,77 @@
+import msgpack
+import orjson
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+_encoder = JSONEncoder()
+
+
+def default(obj):
+    """Encode types unknown to C encoders the way DRF does."""
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """JSON renderer backed by orjson.
+
+    orjson only knows two-space indentation,
+    it is used for any requested `indent`. Non-string keys,
+    e.g. indexes of list item errors, are converted as `json` does.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        ret = orjson.dumps(data, default=default, option=option)
+
+        # Keep the output a strict javascript subset, as DRF does.
+        if LINE_SEPARATOR in ret or PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(LINE_SEPARATOR, b'\\u2028').replace(
+                PARAGRAPH_SEPARATOR, b'\\u2029'
+            )
+        return ret
+
+
+def render_line(item) -> bytes:
+    return orjson.dumps(
+        item, default=default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+    )
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """Newline-delimited JSON, a line per list item.
+
+    Selects the streaming export of views with `NDJSONExportMixin`,
+    their other responses, e.g. errors, are rendered here.
+    """
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else (data,)
+        return b''.join(map(render_line, items))
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=default, use_bin_type=True)
@@ -1,21 +1,31 @@
+from .common import CommonRecipeReadSerializer
 from .favorite import FavoriteSerializer
 from .ingredient import IngredientSerializer
-from .recipe import (RecipeCreateUpdateSerializer, RecipeReadSerializer,
-                     ShortLinkSerializer)
+from .pantry import PantryQuerySerializer
+from .recipe import (RecipeCreateUpdateSerializer, RecipeFacetsQuerySerializer,
+                     RecipeIdsQuerySerializer, RecipeImportSerializer,
+                     RecipeReadSerializer, ShortLinkSerializer)
 from .shopping_cart import ShoppingCartSerializer
 from .subscription import SubscribeSerializer, SubscriptionSerializer
+from .sync import SyncQuerySerializer
 from .tag import TagSerializer
 from .user import UserAvatarSerializer, UserReadSerializer
 
 __all__ = (
+    'CommonRecipeReadSerializer',
     'FavoriteSerializer',
     'IngredientSerializer',
+    'PantryQuerySerializer',
     'RecipeCreateUpdateSerializer',
+    'RecipeFacetsQuerySerializer',
+    'RecipeIdsQuerySerializer',
+    'RecipeImportSerializer',
     'RecipeReadSerializer',
     'ShoppingCartSerializer',
     'ShortLinkSerializer',
     'SubscribeSerializer',
     'SubscriptionSerializer',
+    'SyncQuerySerializer',
     'TagSerializer',
     'UserAvatarSerializer',
     'UserReadSerializer',
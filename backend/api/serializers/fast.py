@@ -0,0 +1,250 @@
+"""Read-only fast path for model serializers.
+
+A serializer class is compiled once into plain functions
+over `.values()` rows: forward relations are flattened into the row,
+`many=True` relations are fetched with one query per relation
+and method fields are computed by `annotate_<field>` class methods
+of the serializer. Anything else is reported as unsupported,
+so callers fall back to the regular serializer.
+"""
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Optional, Type
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, FieldError
+from django.db.models import Model, OuterRef, QuerySet
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from core.const import FAST_SERIALIZERS_CACHE_SIZE
+
+Getter = Callable[[dict[str, Any], Any], Any]
+
+ROOT_PK = 'pk'
+
+SIMPLE_CONVERTERS: dict[type, Callable[[Any], Any]] = {
+    serializers.CharField: str,
+    serializers.EmailField: str,
+    serializers.SlugField: str,
+    serializers.IntegerField: int,
+}
+
+
+class UnsupportedSerializer(Exception):
+    """The serializer can't be served by the fast path."""
+
+
+class Relation:
+    """`many=True` nested serializer fetched with a single query."""
+
+    def __init__(self, node: 'Node', link: str) -> None:
+        self.node = node
+        self.link = link
+
+    def fetch(self, parent_ids: list, context: dict) -> dict[Any, list]:
+        model = self.node.model
+        queryset = self.node.annotate(
+            model._default_manager.filter(**{f'{self.link}__in': parent_ids}),
+            context
+        ).order_by(*(model._meta.ordering or ('pk',)))
+
+        request = context.get('request')
+        grouped = defaultdict(list)
+        for row in queryset.values(self.link, *self.node.paths):
+            grouped[row[self.link]].append(self.node.build(row, request))
+        return grouped
+
+
+class Node:
+    """Compiled serializer over rows of `model`."""
+
+    def __init__(self, serializer: serializers.BaseSerializer,
+                 model: Type[Model], prefix: str = '') -> None:
+        self.model = model
+        self.paths: list[str] = []
+        self.annotations: dict[str, tuple[Callable, str]] = {}
+        self.relations: dict[str, Relation] = {}
+        self.getters: list[tuple[str, Getter]] = []
+
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            self.getters.append(
+                (field.field_name, self._compile_field(field, prefix))
+            )
+
+    def _compile_field(self, field, prefix: str) -> Getter:
+        if isinstance(field, serializers.SerializerMethodField):
+            return self._compile_method(field, prefix)
+
+        if field.source == '*':
+            raise UnsupportedSerializer(field.field_name)
+
+        path = prefix + '__'.join(field.source_attrs)
+
+        if isinstance(field, serializers.ListSerializer):
+            if prefix:
+                raise UnsupportedSerializer(field.field_name)
+            return self._compile_relation(field, path)
+
+        if isinstance(field, serializers.BaseSerializer):
+            return self._compile_nested(field, path)
+
+        if isinstance(field, serializers.RelatedField):
+            raise UnsupportedSerializer(field.field_name)
+
+        self.paths.append(path)
+        return self._compile_leaf(field, path)
+
+    def _compile_leaf(self, field, path: str) -> Getter:
+        if isinstance(field, serializers.FileField):
+            return self._compile_file(field, path)
+
+        convert = SIMPLE_CONVERTERS.get(type(field))
+        if convert is None:
+            if type(field) is serializers.ReadOnlyField:
+                return lambda row, request: row[path]
+            convert = field.to_representation
+
+        def get(row, request):
+            value = row[path]
+            return None if value is None else convert(value)
+
+        return get
+
+    def _compile_method(self, field, prefix: str) -> Getter:
+        annotate = getattr(field.parent, f'annotate_{field.field_name}', None)
+        if annotate is None:
+            raise UnsupportedSerializer(field.field_name)
+
+        alias = f'fast_{prefix}{field.field_name}'.replace('__', '_')
+        self.annotations[alias] = (annotate, f'{prefix}pk')
+        self.paths.append(alias)
+        return lambda row, request: row[alias]
+
+    def _compile_nested(self, field, path: str) -> Getter:
+        model_field = self._get_model_field(field.source_attrs)
+        if not model_field.many_to_one and not model_field.one_to_one:
+            raise UnsupportedSerializer(field.field_name)
+
+        nested = Node(field, model_field.related_model, f'{path}__')
+        if nested.relations:
+            raise UnsupportedSerializer(field.field_name)
+
+        pk_path = f'{path}__pk'
+        self.paths.append(pk_path)
+        self.paths.extend(nested.paths)
+        self.annotations.update(nested.annotations)
+
+        def get(row, request):
+            return None if row[pk_path] is None else nested.build(row,
+                                                                  request)
+
+        return get
+
+    def _compile_relation(self, field, path: str) -> Getter:
+        child = field.child
+        child_model = getattr(getattr(child, 'Meta', None), 'model', None)
+        link = None
+
+        for relation in self.model._meta.related_objects:
+            if relation.get_accessor_name() == path:
+                link = relation.field.name
+        if link is None:
+            model_field = self._get_model_field((path,))
+            if not model_field.many_to_many:
+                raise UnsupportedSerializer(field.field_name)
+            link = model_field.related_query_name()
+
+        node = Node(child, child_model)
+        if child_model is None or link in node.paths:
+            raise UnsupportedSerializer(field.field_name)
+
+        self.relations[path] = Relation(node, link)
+        return lambda row, request: row[path]
+
+    def _compile_file(self, field, path: str) -> Getter:
+        storage = self._get_model_field(field.source_attrs).storage
+
+        if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+            return lambda row, request: row[path] or None
+
+        def get(row, request):
+            name = row[path]
+            if not name:
+                return None
+            url = storage.url(name)
+            return url if request is None else request.build_absolute_uri(url)
+
+        return get
+
+    def _get_model_field(self, attrs: list[str]):
+        model = self.model
+        try:
+            for attr in attrs[:-1]:
+                model = model._meta.get_field(attr).related_model
+            return model._meta.get_field(attrs[-1])
+        except (FieldDoesNotExist, AttributeError):
+            raise UnsupportedSerializer('.'.join(attrs))
+
+    def annotate(self, queryset: QuerySet, context: dict) -> QuerySet:
+        if not self.annotations:
+            return queryset
+        return queryset.annotate(**{
+            alias: annotate(context, OuterRef(outer_path))
+            for alias, (annotate, outer_path) in self.annotations.items()
+        })
+
+    def build(self, row: dict[str, Any], request) -> dict[str, Any]:
+        return {name: get(row, request) for name, get in self.getters}
+
+
+class FastSerializer:
+    """Compiled serializer bound to a serializer context."""
+
+    def __init__(self, node: Node, context: dict) -> None:
+        self.node = node
+        self.context = context
+
+    def values(self, queryset: QuerySet) -> QuerySet:
+        """Rows of `queryset` with every value the serializer reads."""
+        try:
+            return self.node.annotate(
+                queryset.prefetch_related(None), self.context
+            ).values(ROOT_PK, *self.node.paths)
+        except FieldError as exc:
+            raise UnsupportedSerializer(str(exc))
+
+    def serialize(self, rows: Iterable[dict[str, Any]]) -> list[dict]:
+        rows = list(rows)
+        request = self.context.get('request')
+        if self.node.relations:
+            parent_ids = [row[ROOT_PK] for row in rows]
+            for path, relation in self.node.relations.items():
+                related = relation.fetch(parent_ids, self.context)
+                for row in rows:
+                    row[path] = related.get(row[ROOT_PK], [])
+        return [self.node.build(row, request) for row in rows]
+
+
+@lru_cache(maxsize=FAST_SERIALIZERS_CACHE_SIZE)
+def compile_serializer(
+    serializer_class: Type[serializers.ModelSerializer]
+) -> Optional[Node]:
+    model = getattr(getattr(serializer_class, 'Meta', None), 'model', None)
+    if model is None:
+        return None
+    try:
+        return Node(serializer_class(context={}), model)
+    except UnsupportedSerializer:
+        return None
+
+
+def get_fast_serializer(serializer_class: Type[serializers.BaseSerializer],
+                        context: dict) -> Optional[FastSerializer]:
+    """Fast path for `serializer_class` or `None` if it isn't supported."""
+    if not settings.FAST_SERIALIZERS:
+        return None
+    node = compile_serializer(serializer_class)
+    return None if node is None else FastSerializer(node, context)
@@ -0,0 +1,14 @@
+from rest_framework import serializers
+
+from core.const import PANTRY_MAX_INGREDIENTS, PANTRY_MAX_MISSING
+
+
+class PantryQuerySerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=PANTRY_MAX_INGREDIENTS
+    )
+    missing = serializers.IntegerField(min_value=0,
+                                       max_value=PANTRY_MAX_MISSING,
+                                       default=0)
@@ -1,7 +1,9 @@
+from functools import partial
 from secrets import token_urlsafe
 from typing import Any
 
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.db.models import Manager
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
@@ -9,10 +11,13 @@ from rest_framework.exceptions import ValidationError
 
 from api.serializers.tag import TagSerializer
 from api.serializers.user import UserReadSerializer
-from core.const import (MIN_AMOUNT_VALUE, SHORT_LINK_SLUG_NBYTES,
-                        SHORT_LINK_URL_PATH, SMALL_INTEGER_FIELD_MAX_VALUE)
+from core.const import (MIN_AMOUNT_VALUE, RECIPE_BATCH_MAX_SIZE, RECIPE_FACETS,
+                        SHORT_LINK_SLUG_NBYTES, SHORT_LINK_URL_PATH,
+                        SMALL_INTEGER_FIELD_MAX_VALUE)
 from foodgram.models import (Ingredient, Recipe, RecipeIngredient,
                              RecipeShortLink, Tag)
+from foodgram.pantry import publish_recipe_changes
+from foodgram.similarity import queue_similar_refresh
 
 User = get_user_model()
 
@@ -21,7 +26,13 @@ class IngredientReadListSerializer(serializers.ListSerializer):
     """Special serializer for reduce database queries."""
 
     def to_representation(self, data: Manager):
-        items = data.select_related('ingredient').all()
+        # Rows prefetched by the view are served from the cache.
+        if data.field.remote_field.get_cache_name() in getattr(
+            data.instance, '_prefetched_objects_cache', {}
+        ):
+            items = data.all()
+        else:
+            items = data.select_related('ingredient').order_by('pk')
 
         return [
             self.child.to_representation(item) for item in items
@@ -63,7 +74,21 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        exclude = ('created_at',)
+        exclude = ('created_at', 'deleted_at')
+
+
+class RecipeIdsQuerySerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1),
+                                allow_empty=False,
+                                max_length=RECIPE_BATCH_MAX_SIZE)
+
+
+class RecipeFacetsQuerySerializer(serializers.Serializer):
+    facets = serializers.ListField(
+        child=serializers.ChoiceField(choices=RECIPE_FACETS),
+        allow_empty=False,
+        default=RECIPE_FACETS[:1]
+    )
 
 
 class IngredientCreateUpdateSerializer(serializers.Serializer):
@@ -92,7 +117,7 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        exclude = ('created_at',)
+        exclude = ('created_at', 'deleted_at')
         read_only_fields = ('author',)
 
     def validate_image(self, value):
@@ -155,6 +180,57 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             )
                 for item in ingredients)
         )
+        queue_similar_refresh((recipe.pk,))
+        transaction.on_commit(partial(publish_recipe_changes, (recipe.pk,)),
+                              robust=True)
+
+
+class IngredientImportSerializer(serializers.Serializer):
+    name = serializers.CharField()
+
+    measurement_unit = serializers.CharField(required=False)
+
+    amount = serializers.IntegerField(min_value=MIN_AMOUNT_VALUE,
+                                      max_value=SMALL_INTEGER_FIELD_MAX_VALUE)
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    """Line of an `importrecipes` file, validated without queries.
+
+    Tags come by slug, ingredients by name and the image as a path,
+    `foodgram.importing` resolves them for a whole batch.
+    """
+
+    tags = serializers.ListField(child=serializers.SlugField(),
+                                 allow_empty=False)
+
+    ingredients = IngredientImportSerializer(many=True, allow_empty=False)
+
+    image = serializers.CharField()
+
+    default_error_messages = {'doubles': '{} дублируются.'}
+
+    class Meta:
+        model = Recipe
+        fields = ('name', 'text', 'image', 'cooking_time', 'tags',
+                  'ingredients')
+
+    def validate(self, attrs: dict[str, Any]) -> dict[str, Any]:
+        errors = {}
+        if len(attrs['tags']) > len(set(attrs['tags'])):
+            errors.update(tags=[
+                self.error_messages['doubles'].format('Теги')
+            ])
+        names = [item['name'] for item in attrs['ingredients']]
+        if len(names) > len(set(names)):
+            errors.update(ingredients=[
+                self.error_messages['doubles'].format('Ингредиенты')
+            ])
+
+        if errors:
+            raise ValidationError(errors)
+
+        return attrs
 
 
 class ShortLinkSerializer(serializers.ModelSerializer):
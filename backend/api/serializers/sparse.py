@@ -0,0 +1,72 @@
+"""Sparse fieldsets of read endpoints, `?fields=` and `?expand=`."""
+from functools import lru_cache
+from typing import Optional, Type
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Model
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from core.const import (EXPAND_QUERY_PARAM, FIELDS_QUERY_PARAM,
+                        SPARSE_SERIALIZERS_CACHE_SIZE)
+
+ID_FIELD = 'id'
+
+
+def get_expandable_attname(model: Type[Model],
+                           field: serializers.Field) -> Optional[str]:
+    """Column of the forward relation nested as `field`, if it's one."""
+    if (not isinstance(field, serializers.BaseSerializer)
+            or isinstance(field, serializers.ListSerializer)
+            or len(field.source_attrs) != 1):
+        return None
+    try:
+        model_field = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        return None
+    return model_field.attname if model_field.many_to_one else None
+
+
+@lru_cache(maxsize=SPARSE_SERIALIZERS_CACHE_SIZE)
+def get_sparse_serializer(
+    serializer_class: Type[serializers.ModelSerializer],
+    fields: frozenset[str],
+    expand: frozenset[str]
+) -> Type[serializers.ModelSerializer]:
+    """Subclass of `serializer_class` rendering only `fields` and `id`.
+
+    Expanded fields are included too. Nested objects of forward
+    relations that aren't expanded are reduced to their id,
+    so neither serializer needs the related row.
+    """
+    available = serializer_class(context={}).fields
+    unknown = sorted((fields | expand) - set(available))
+    if unknown:
+        raise ValidationError({FIELDS_QUERY_PARAM: [
+            f'Неизвестные поля: {", ".join(unknown)}.'
+        ]})
+    model = serializer_class.Meta.model
+    attnames = {name: get_expandable_attname(model, field)
+                for name, field in available.items()}
+    not_expandable = sorted(name for name in expand if not attnames[name])
+    if not_expandable:
+        raise ValidationError({EXPAND_QUERY_PARAM: [
+            f'Поля не раскрываются: {", ".join(not_expandable)}.'
+        ]})
+
+    selected = (fields | expand | {ID_FIELD}) & set(available)
+    collapsed = {name: attnames[name] for name in selected - expand
+                 if attnames[name]}
+
+    def get_fields(self) -> dict[str, serializers.Field]:
+        return {
+            name: (serializers.ReadOnlyField(source=collapsed[name])
+                   if name in collapsed else field)
+            for name, field in super(sparse_class, self).get_fields().items()
+            if name in selected
+        }
+
+    sparse_class = type(serializer_class.__name__, (serializer_class,),
+                        {'get_fields': get_fields,
+                         '__module__': serializer_class.__module__})
+    return sparse_class
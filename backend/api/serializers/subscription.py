@@ -1,14 +1,16 @@
-from typing import Any, Union
+from typing import Any, Optional, Union
 
 from django.contrib.auth import get_user_model
-from django.db.models import Count
+from django.db.models import Count, Prefetch, Q
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.request import QueryDict
 from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
 
 from api.serializers.common import CommonRecipeReadSerializer
+from api.serializers.fast import get_fast_serializer
 from api.serializers.user import UserReadSerializer
+from foodgram.models import Recipe
 from users.models import Subscription
 from users.models import User as UserType
 
@@ -26,16 +28,44 @@ class SubscriptionSerializer(UserReadSerializer):
         read_only_fields = ('username', 'first_name',
                             'last_name', 'email', 'avatar')
 
-    def get_recipes(self, instance: UserType) -> Union[ReturnList, ReturnDict]:
+    @classmethod
+    def prefetch_recipes(cls, query_params: QueryDict) -> Prefetch:
+        """Recipes of a page of authors in one query, see `get_recipes()`."""
+        recipes_qs = Recipe.objects.all()
+        limit = cls._get_recipes_limit(query_params)
+        if limit:
+            recipes_qs = recipes_qs[:limit]
+        return Prefetch('recipes', queryset=recipes_qs,
+                        to_attr='limited_recipes')
+
+    @staticmethod
+    def _get_recipes_limit(query_params: QueryDict) -> Optional[int]:
+        try:
+            return int(query_params['recipes_limit'])
+        except (KeyError, ValueError):
+            return None
+
+    def get_recipes(
+        self, instance: UserType
+    ) -> Union[ReturnList, ReturnDict, list]:
+        limited_recipes = getattr(instance, 'limited_recipes', None)
+        if limited_recipes is not None:
+            return CommonRecipeReadSerializer(limited_recipes,
+                                              many=True,
+                                              context=self.context).data
+
         recipes_qs = instance.recipes.all()
         query_params: QueryDict = self.context['request'].query_params
+        fast = get_fast_serializer(CommonRecipeReadSerializer, self.context)
 
-        try:
-            if ('recipes_limit' in query_params
-                    and (limit := int(query_params['recipes_limit']))):
-                recipes_qs = recipes_qs[:limit]
-        except ValueError:
-            pass
+        if fast is not None:
+            recipes_qs = fast.values(recipes_qs)
+
+        if limit := self._get_recipes_limit(query_params):
+            recipes_qs = recipes_qs[:limit]
+
+        if fast is not None:
+            return fast.serialize(recipes_qs)
 
         return CommonRecipeReadSerializer(recipes_qs,
                                           many=True,
@@ -44,7 +74,9 @@ class SubscriptionSerializer(UserReadSerializer):
 
 class SubscribeSerializer(serializers.ModelSerializer):
     author = serializers.PrimaryKeyRelatedField(
-        queryset=User.objects.annotate(recipes_count=Count('recipes'))
+        queryset=User.objects.annotate(recipes_count=Count(
+            'recipes', filter=Q(recipes__deleted_at=None)
+        ))
     )
 
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
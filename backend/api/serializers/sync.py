@@ -0,0 +1,5 @@
+from rest_framework import serializers
+
+
+class SyncQuerySerializer(serializers.Serializer):
+    since = serializers.IntegerField(min_value=0, required=False)
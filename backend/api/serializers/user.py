@@ -1,9 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.db.models import BooleanField, Exists, Expression, OuterRef, Value
 from djoser.serializers import UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.request import Request
 
+from users.models import Subscription
 from users.models import User as UserType
 
 User = get_user_model()
@@ -20,9 +22,30 @@ class UserReadSerializer(UserSerializer):
         return (
             request
             and request.auth is not None
-            and request.user.subscriptions.filter(author=author).exists()
+            and author.pk in self._get_subscribed_ids(request)
         )
 
+    def _get_subscribed_ids(self, request: Request) -> set[int]:
+        """Authors followed by the user, read once per serialization."""
+        subscribed_ids = self.context.get('subscribed_ids')
+        if subscribed_ids is None:
+            subscribed_ids = self.context['subscribed_ids'] = set(
+                request.user.subscriptions.values_list('author', flat=True)
+            )
+        return subscribed_ids
+
+    @classmethod
+    def annotate_is_subscribed(cls, context: dict,
+                               author: OuterRef) -> Expression:
+        """`is_subscribed` as an annotation for the fast path."""
+        request: Request = context.get('request')
+        if not request:
+            return Value(request, output_field=BooleanField())
+        if request.auth is None:
+            return Value(False)
+        return Exists(Subscription.objects.filter(user_id=request.user.id,
+                                                  author=author))
+
 
 class UserAvatarSerializer(UserSerializer):
     avatar = Base64ImageField()
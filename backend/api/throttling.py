@@ -0,0 +1,109 @@
+import math
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+from rest_framework.request import Request
+from rest_framework.throttling import BaseThrottle
+
+from core.const import THROTTLE_CACHE_ALIAS, THROTTLE_CACHE_KEY_PREFIX
+from core.locks import cache_lock
+
+
+@dataclass
+class TokenBucket:
+    """Bucket of `capacity` tokens refilled at `rate` tokens per second."""
+
+    capacity: float
+    rate: float
+    tokens: float
+    updated_at: float
+
+    def refill(self, now: float) -> None:
+        elapsed = max(now - self.updated_at, 0)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def take(self, cost: float, now: float) -> float:
+        """Take `cost` tokens, seconds to wait if there are not enough.
+
+        A cost above the capacity is charged as a full bucket.
+        """
+        self.refill(now)
+        cost = min(cost, self.capacity)
+        if cost <= self.tokens:
+            self.tokens -= cost
+            return 0
+        return (cost - self.tokens) / self.rate
+
+
+class CostThrottle(BaseThrottle):
+    """Token bucket throttle charging every endpoint its own cost.
+
+    Clients are identified by user or, for anonymous ones, by IP.
+    The cost of an endpoint is looked up in `THROTTLE_COSTS` by URL name
+    and response format, e.g. `recipes-list:ndjson`, by URL name and
+    method, e.g. `recipes-list:post`, then by URL name alone.
+    Large request bodies and `limit` values are charged extra.
+    Buckets live in a cache of their own, `THROTTLE_CACHE_ALIAS`,
+    shared by the workers, and are updated under `cache_lock()`.
+    A bucket expires once it would be full again, culling drops
+    expired and then the least recently used buckets.
+    """
+
+    cache = ConnectionProxy(caches, THROTTLE_CACHE_ALIAS)
+    timer = time.time
+    cache_format = THROTTLE_CACHE_KEY_PREFIX + ':{ident}'
+
+    def __init__(self) -> None:
+        self.capacity = settings.THROTTLE_BUCKET_CAPACITY
+        self.rate = settings.THROTTLE_BUCKET_RATE
+        self.wait_seconds: Optional[float] = None
+
+    def get_cache_key(self, request: Request, view) -> str:
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return self.cache_format.format(ident=ident)
+
+    def get_cost(self, request: Request, view) -> float:
+        costs = settings.THROTTLE_COSTS
+        url_name = getattr(request.resolver_match, 'url_name', None)
+        renderer = getattr(request, 'accepted_renderer', None)
+        cost = costs.get(
+            f'{url_name}:{getattr(renderer, "format", None)}',
+            costs.get(f'{url_name}:{request.method.lower()}',
+                      costs.get(url_name, settings.THROTTLE_DEFAULT_COST))
+        )
+
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        cost += content_length // settings.THROTTLE_BYTES_PER_TOKEN
+
+        paginator = getattr(view, 'paginator', None)
+        page_size = getattr(paginator, 'page_size', None)
+        if page_size and getattr(paginator, 'page_size_query_param', None):
+            requested = paginator.get_page_size(request) or page_size
+            cost += max(math.ceil(requested / page_size) - 1, 0)
+        return cost
+
+    def allow_request(self, request: Request, view) -> bool:
+        key = self.get_cache_key(request, view)
+        cost = self.get_cost(request, view)
+
+        with cache_lock(key, self.cache):
+            now = self.timer()
+            state = self.cache.get(key)
+            bucket = (TokenBucket(self.capacity, self.rate, self.capacity, now)
+                      if state is None
+                      else TokenBucket(self.capacity, self.rate, *state))
+            self.wait_seconds = bucket.take(cost, now)
+            self.cache.set(key, (bucket.tokens, bucket.updated_at),
+                           math.ceil(self.capacity / self.rate))
+        return not self.wait_seconds
+
+    def wait(self) -> Optional[float]:
+        return self.wait_seconds
@@ -2,15 +2,18 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from api import views
+from core.const import RECIPE_FEED_URL_PATH
 
 router = DefaultRouter()
 router.register('users', views.UserViewSet, basename='users')
 router.register('ingredients', views.IngredientViewSet, basename='ingredients')
 router.register('tags', views.TagViewSet, basename='tags')
 router.register('recipes', views.RecipeViewSet, basename='recipes')
+router.register('sync', views.SyncViewSet, basename='sync')
 
 urlpatterns = [
-    path('auth/', include('djoser.urls.authtoken'))
+    path('auth/', include('djoser.urls.authtoken')),
+    path(RECIPE_FEED_URL_PATH, views.RecipeFeedView.as_view()),
 ]
 
 urlpatterns += router.urls
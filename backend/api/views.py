@@ -1,36 +1,65 @@
-from typing import Type
+import asyncio
+from typing import AsyncIterator, Optional, Sequence, Type
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
-from django.db.models import Count, F, Model, QuerySet, Sum, Value
-from django.http.response import FileResponse
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.db.models import Count, F, Model, Prefetch, Q, QuerySet, Sum, Value
+from django.http import HttpRequest
+from django.http.response import (FileResponse, HttpResponse, JsonResponse,
+                                  StreamingHttpResponse)
 from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
+from django.views import View
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import (AuthenticationFailed, NotAuthenticated,
+                                       ValidationError)
 from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.serializers import BaseSerializer
+from rest_framework.settings import api_settings
 
+from api.authentication import TokenAuthentication
 from api.filters import IngredientListFilter, RecipeListFilter
+from api.mixins import (AsyncReadViewSetMixin, CachedListMixin,
+                        FastSerializerMixin, NDJSONExportMixin,
+                        SparseFieldsMixin)
 from api.permissions import IsAuthorAdminOrReadOnly
-from api.serializers import (FavoriteSerializer, IngredientSerializer,
+from api.renderers import NDJSONRenderer
+from api.serializers import (CommonRecipeReadSerializer, FavoriteSerializer,
+                             IngredientSerializer, PantryQuerySerializer,
                              RecipeCreateUpdateSerializer,
-                             RecipeReadSerializer, ShoppingCartSerializer,
-                             ShortLinkSerializer, SubscribeSerializer,
-                             SubscriptionSerializer, TagSerializer,
+                             RecipeFacetsQuerySerializer,
+                             RecipeIdsQuerySerializer, RecipeReadSerializer,
+                             ShoppingCartSerializer, ShortLinkSerializer,
+                             SubscribeSerializer, SubscriptionSerializer,
+                             SyncQuerySerializer, TagSerializer,
                              UserAvatarSerializer)
-from core.const import (LOOKUP_DIGIT_PATTERN, ORDER_BY_CREATED_AT_DESC,
+from core.const import (INGREDIENTS_CACHE_KEY, LOOKUP_DIGIT_PATTERN,
+                        RECIPE_FACETS_CACHE_TIMEOUT,
+                        RECIPE_FEED_BACKFILL_LIMIT,
+                        RECIPE_FEED_HEARTBEAT_SECONDS, RECIPE_FEED_RETRY_MS,
+                        RECIPE_ORDERING, SIMILAR_RECIPES_TOP_K, TAGS_CACHE_KEY,
                         HttpMethod)
 from core.factories import make_shopping_list
 from foodgram import models
+from foodgram.deletion import mark_recipes_deleted, mark_users_deleted
+from foodgram.facets import count_authors, count_tags, get_facets_key
+from foodgram.feed import feed, get_missed_recipes
+from foodgram.pantry import match_pantry
+from foodgram.sync import CursorExpired, get_changes, get_cursor
 from users.models import Subscription
 
 User = get_user_model()
 
 
-class UserViewSet(DjoserUserViewSet):
+class UserViewSet(SparseFieldsMixin, FastSerializerMixin, DjoserUserViewSet):
     http_method_names: tuple = (
         HttpMethod.GET,
         HttpMethod.POST,
@@ -41,6 +70,10 @@ class UserViewSet(DjoserUserViewSet):
     )
     lookup_value_regex = LOOKUP_DIGIT_PATTERN
     queryset = User.objects.all()
+    sparse_actions = ('list', 'retrieve', 'me')
+
+    def perform_destroy(self, instance: User) -> None:
+        mark_users_deleted(User.objects.filter(pk=instance.pk))
 
     @action((HttpMethod.GET,), detail=False,
             permission_classes=(IsAuthenticated,))
@@ -69,7 +102,11 @@ class UserViewSet(DjoserUserViewSet):
     def subscriptions(self, request: Request) -> Response:
         authors_qs = User.objects.filter(
             subscriptions_on_author__user=request.user
-        ).annotate(recipes_count=Count('recipes')).order_by('username')
+        ).annotate(recipes_count=Count(
+            'recipes', filter=Q(recipes__deleted_at=None)
+        )).prefetch_related(
+            SubscriptionSerializer.prefetch_recipes(request.query_params)
+        ).order_by('username')
         serializer = self.get_serializer(self.paginate_queryset(authors_qs),
                                          many=True)
         return self.get_paginated_response(serializer.data)
@@ -95,7 +132,8 @@ class UserViewSet(DjoserUserViewSet):
         )
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedListMixin, FastSerializerMixin,
+                        AsyncReadViewSetMixin, viewsets.ReadOnlyModelViewSet):
     http_method_names: tuple = (
         HttpMethod.GET,
         HttpMethod.HEAD,
@@ -105,9 +143,18 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = IngredientSerializer
     filterset_class = IngredientListFilter
     pagination_class = None
+    list_cache_key = INGREDIENTS_CACHE_KEY
+
+    def filter_cached_list(self, data: list[dict]) -> list[dict]:
+        # Same as the case-sensitive `startswith` of IngredientListFilter.
+        name = self.request.query_params.get('name')
+        if not name:
+            return data
+        return [item for item in data if item['name'].startswith(name)]
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedListMixin, FastSerializerMixin, AsyncReadViewSetMixin,
+                 viewsets.ReadOnlyModelViewSet):
     http_method_names: tuple = (
         HttpMethod.GET,
         HttpMethod.HEAD,
@@ -116,9 +163,122 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = models.Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    list_cache_key = TAGS_CACHE_KEY
+
+
+class SyncViewSet(viewsets.GenericViewSet):
+    """Changes of the user's lists since the client's cursor.
+
+    Without `since` only the current cursor is returned,
+    the client takes it before loading the full lists.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    serializer_class = SyncQuerySerializer
+    pagination_class = None
+
+    def list(self, request: Request) -> Response:
+        query = self.get_serializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        since = query.validated_data.get('since')
+        if since is None:
+            return Response({'cursor': get_cursor()})
+
+        try:
+            return Response(get_changes(request.user.id, since))
+        except CursorExpired:
+            return Response(
+                {'detail': 'Курсор устарел, требуется полная синхронизация.'},
+                status=status.HTTP_410_GONE
+            )
+
+
+def _authenticate_stream(request: HttpRequest):
+    try:
+        return TokenAuthentication().authenticate(request)
+    finally:
+        connections.close_all()
+
+
+def _get_missed_recipes(user_id: int, last_id: int):
+    try:
+        return get_missed_recipes(user_id, last_id)
+    finally:
+        connections.close_all()
+
+
+class RecipeFeedView(View):
+    """Server-sent events about new recipes of followed authors.
 
+    Each event carries the recipe and author ids, its id is the recipe
+    id: a reconnecting client sends it back in `Last-Event-ID` and gets
+    the recipes it missed, a page at a time. Idle streams hold no
+    thread or database connection, see `core.asgi.StreamASGIHandler`.
+    """
 
-class RecipeViewSet(viewsets.ModelViewSet):
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {'detail': 'Поток событий доступен только в режиме ASGI.'},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+        try:
+            user_auth = await sync_to_async(
+                _authenticate_stream, thread_sensitive=False
+            )(request)
+        except AuthenticationFailed as exc:
+            return JsonResponse({'detail': exc.detail},
+                                status=status.HTTP_401_UNAUTHORIZED)
+        if user_auth is None:
+            return JsonResponse({'detail': NotAuthenticated.default_detail},
+                                status=status.HTTP_401_UNAUTHORIZED)
+
+        last_id = request.headers.get('Last-Event-ID', '')
+        response = StreamingHttpResponse(
+            self._stream(user_auth[0].id,
+                         int(last_id) if last_id.isdigit() else None),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def _stream(self, user_id: int,
+                      last_id: Optional[int]) -> AsyncIterator[str]:
+        yield f'retry: {RECIPE_FEED_RETRY_MS}\n\n'
+        async with feed.connect(user_id) as queue:
+            # Connected first, so recipes created meanwhile aren't lost.
+            while last_id is not None:
+                events = await sync_to_async(
+                    _get_missed_recipes, thread_sensitive=False
+                )(user_id, last_id)
+                for event in events:
+                    last_id = event[0]
+                    yield self._format(event)
+                if len(events) < RECIPE_FEED_BACKFILL_LIMIT:
+                    break
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), RECIPE_FEED_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                if event is None:
+                    return
+                if last_id is None or event[0] > last_id:
+                    yield self._format(event)
+
+    def _format(self, event: tuple[int, int]) -> str:
+        recipe_id, author_id = event
+        return (f'id: {recipe_id}\nevent: recipe\n'
+                f'data: {{"id": {recipe_id}, "author": {author_id}}}\n\n')
+
+
+class RecipeViewSet(NDJSONExportMixin, SparseFieldsMixin, FastSerializerMixin,
+                    AsyncReadViewSetMixin, viewsets.ModelViewSet):
     http_method_names: tuple = (
         HttpMethod.GET,
         HttpMethod.POST,
@@ -131,34 +291,93 @@ class RecipeViewSet(viewsets.ModelViewSet):
     lookup_value_regex = LOOKUP_DIGIT_PATTERN
     serializer_class = RecipeReadSerializer
     filterset_class = RecipeListFilter
+    renderer_classes = (*api_settings.DEFAULT_RENDERER_CLASSES,
+                        NDJSONRenderer)
     permission_classes = (IsAuthenticatedOrReadOnly,
                           IsAuthorAdminOrReadOnly)
+    sparse_actions = ('list', 'retrieve', 'pantry')
 
     def get_serializer_class(self) -> Type[BaseSerializer]:
         if self.action in ('create', 'partial_update'):
             return RecipeCreateUpdateSerializer
         return super().get_serializer_class()
 
+    def perform_destroy(self, instance: models.Recipe) -> None:
+        mark_recipes_deleted(models.Recipe.objects.filter(pk=instance.pk))
+
     def get_queryset(self) -> QuerySet:
-        queryset = models.Recipe.objects.select_related(
-            'author'
-        ).prefetch_related(
-            'tags',
-            'ingredients'
-        ).annotate(
+        prefetches = {
+            'tags': 'tags',
+            'ingredients': Prefetch(
+                'recipeingredient_set',
+                queryset=models.RecipeIngredient.objects.select_related(
+                    'ingredient'
+                ).order_by('pk')
+            ),
+        }
+        queryset = models.Recipe.objects.prefetch_related(*(
+            prefetch for name, prefetch in prefetches.items()
+            if self.is_field_requested(name)
+        )).annotate(
             is_favorited=Value(False),
             is_in_shopping_cart=Value(False)
-        ).order_by(ORDER_BY_CREATED_AT_DESC)
+        ).order_by(*RECIPE_ORDERING)
+
+        if self.is_field_expanded('author'):
+            queryset = queryset.select_related('author')
+        if not self.is_field_requested('text'):
+            queryset = queryset.defer('text')
 
         request = self.request
+        user_flags = ('is_favorited', 'is_in_shopping_cart')
 
-        if request.auth:
+        if request.auth and any(map(self.is_field_requested, user_flags)):
             queryset = queryset.annotate_is_favorited_in_shopping_cart(
                 user_id=request.user.id
             )
 
         return queryset
 
+    @cached_property
+    def batch_ids(self) -> Optional[list[int]]:
+        """Ids of a `?ids=1,2,3` list request, without repeats."""
+        ids = self.request.query_params.get('ids')
+        if self.action != 'list' or ids is None:
+            return None
+        query = RecipeIdsQuerySerializer(data={'ids': ids.split(',')})
+        query.is_valid(raise_exception=True)
+        return list(dict.fromkeys(query.validated_data['ids']))
+
+    @property
+    def paginator(self):
+        if self.batch_ids is not None:
+            return None
+        return super().paginator
+
+    def filter_queryset(self, queryset: QuerySet) -> QuerySet:
+        queryset = super().filter_queryset(queryset)
+        if self.batch_ids is not None:
+            queryset = queryset.filter(pk__in=self.batch_ids)
+        return queryset
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        return self._order_batch(super().list(request, *args, **kwargs))
+
+    async def alist(self, request: Request, *args, **kwargs) -> Response:
+        return self._order_batch(await super().alist(request, *args,
+                                                     **kwargs))
+
+    def _order_batch(self, response: Response) -> Response:
+        """Put batch results in the requested order, report missing ids."""
+        if self.batch_ids is None or self.is_export:
+            return response
+        found = {item['id']: item for item in response.data}
+        response.data = {
+            'results': [found[pk] for pk in self.batch_ids if pk in found],
+            'missing': [pk for pk in self.batch_ids if pk not in found],
+        }
+        return response
+
     @action((HttpMethod.GET,), detail=True,
             serializer_class=ShortLinkSerializer, url_path='get-link')
     def get_link(self, request: Request, recipe_id: str) -> Response:
@@ -167,6 +386,66 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer.save()
         return Response(serializer.data)
 
+    @action((HttpMethod.GET,), detail=True,
+            serializer_class=CommonRecipeReadSerializer)
+    def similar(self, request: Request, recipe_id: str) -> Response:
+        get_object_or_404(models.Recipe, pk=recipe_id)
+        recipes = models.Recipe.objects.filter(
+            similar_to__recipe_id=recipe_id
+        ).order_by('-similar_to__score', 'pk')[:SIMILAR_RECIPES_TOP_K]
+        return Response(self.get_serializer(recipes, many=True).data)
+
+    @action((HttpMethod.GET,), detail=False)
+    def facets(self, request: Request) -> Response:
+        query = RecipeFacetsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        filterset = self.filterset_class(request.query_params,
+                                         queryset=models.Recipe.objects.all(),
+                                         request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+
+        facets = sorted(set(query.validated_data['facets']))
+        key = get_facets_key(
+            {**filterset.get_signature(), 'facets': facets},
+            request.user.id if filterset.is_user_specific else None
+        )
+        data = cache.get(key)
+        if data is None:
+            data = self._count_facets(filterset, facets)
+            cache.set(key, data, RECIPE_FACETS_CACHE_TIMEOUT)
+        return Response(data)
+
+    def _count_facets(self, filterset: RecipeListFilter,
+                      facets: Sequence[str]) -> dict[str, Sequence[dict]]:
+        """Counts of a facet ignore its own filter, as if it was cleared."""
+        data = {}
+        if 'tags' in facets:
+            counts = count_tags(filterset.filter_queryset_without(
+                models.Recipe.objects.all(), 'tags'
+            ))
+            data['tags'] = [{**tag, 'count': counts.get(tag['id'], 0)}
+                            for tag in TagViewSet.get_cached_list()]
+        if 'author' in facets:
+            data['author'] = count_authors(filterset.filter_queryset_without(
+                models.Recipe.objects.all(), 'author'
+            ))
+        return data
+
+    @action((HttpMethod.GET,), detail=False)
+    def pantry(self, request: Request) -> Response:
+        query = PantryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        recipe_ids = self.paginate_queryset(match_pantry(
+            query.validated_data['ingredients'],
+            query.validated_data['missing']
+        ))
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes], many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
     @action((HttpMethod.POST,), detail=True,
             serializer_class=FavoriteSerializer,
             permission_classes=(IsAuthenticatedOrReadOnly,))
@@ -216,7 +495,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
         ingredients = models.RecipeIngredient.objects.select_related(
             'ingredient'
         ).filter(
-            recipe__shoppingcart__user_id=request.user.id
+            recipe__shoppingcart__user_id=request.user.id,
+            recipe__deleted_at=None
         ).values(
             name=F('ingredient__name'),
             unit=F('ingredient__measurement_unit')
@@ -0,0 +1,19 @@
+from api.serializers import (IngredientSerializer, RecipeReadSerializer,
+                             TagSerializer, UserReadSerializer)
+from api.serializers.common import CommonRecipeReadSerializer
+from api.serializers.fast import compile_serializer
+from api.views import IngredientViewSet, TagViewSet
+from foodgram.cache import warm_short_links
+
+
+def compile_serializers() -> None:
+    for serializer_class in (RecipeReadSerializer, CommonRecipeReadSerializer,
+                             UserReadSerializer, TagSerializer,
+                             IngredientSerializer):
+        compile_serializer(serializer_class)
+
+
+def warm_reference_cache() -> None:
+    for viewset in (TagViewSet, IngredientViewSet):
+        viewset.get_cached_list()
+    warm_short_links()
@@ -0,0 +1,129 @@
+"""Changelist helpers for admin pages over large tables."""
+import json
+from typing import Any, Callable, Iterable, Optional, Type
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import IntegerField, Model, QuerySet, Subquery
+from django.http import HttpRequest
+from django.utils.functional import cached_property
+
+from core.const import (ADMIN_DISPLAY_CACHE_PREFIX,
+                        ADMIN_DISPLAY_CACHE_TIMEOUT, ADMIN_EXACT_COUNT_LIMIT)
+from core.locks import bump_generation, get_generation
+
+
+class SubqueryCount(Subquery):
+    """Number of rows of the subquery, computed per outer row.
+
+    Unlike `Count()` it doesn't join and group the whole outer table.
+    """
+
+    template = '(SELECT COUNT(*) FROM (%(subquery)s) _count)'
+    output_field = IntegerField()
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator trusting the planner's row estimate for large results.
+
+    Exact `COUNT(*)` is only run while the estimate is below
+    `ADMIN_EXACT_COUNT_LIMIT`, or when the database can't estimate.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        estimate = self._estimate_count()
+        if estimate is None or estimate < ADMIN_EXACT_COUNT_LIMIT:
+            return super().count
+        return estimate
+
+    def _estimate_count(self) -> Optional[int]:
+        queryset = self.object_list
+        if connections[queryset.db].vendor != 'postgresql':
+            return None
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+def _get_generation_key(model: Type[Model]) -> str:
+    return f'{ADMIN_DISPLAY_CACHE_PREFIX}:generation:{model._meta.label_lower}'
+
+
+def get_display_cache_keys(model: Type[Model],
+                           pks: Iterable[Any]) -> dict[Any, str]:
+    label = model._meta.label_lower
+    generation = get_generation(_get_generation_key(model))
+    return {pk: f'{ADMIN_DISPLAY_CACHE_PREFIX}:{label}:{generation}:{pk}'
+            for pk in pks}
+
+
+def invalidate_display_cache(model: Type[Model],
+                             pks: Optional[Iterable[Any]] = None) -> None:
+    """Drop cached columns of `pks` rows, or of all rows of `model`."""
+    if pks is None:
+        bump_generation(_get_generation_key(model))
+    else:
+        cache.delete_many(get_display_cache_keys(model, pks).values())
+
+
+class SoftDeleteAdminMixin:
+    """Deletion marks the objects, a worker purges their dependents.
+
+    The confirmation page lists the selected objects only, collecting
+    the dependents is what the marking avoids. `mark_deleted` is
+    the function marking a queryset, set it with `staticmethod()`.
+    """
+
+    mark_deleted: Callable[[QuerySet], int]
+
+    def delete_model(self, request: HttpRequest, obj: Model) -> None:
+        self.mark_deleted(self.model._default_manager.filter(pk=obj.pk))
+
+    def delete_queryset(self, request: HttpRequest,
+                        queryset: QuerySet) -> None:
+        self.mark_deleted(queryset)
+
+    def get_deleted_objects(self, objs: Iterable[Model],
+                            request: HttpRequest):
+        objs = list(objs)
+        opts = self.model._meta
+        perms_needed = (set() if self.has_delete_permission(request)
+                        else {opts.verbose_name})
+        return ([str(obj) for obj in objs],
+                {opts.verbose_name_plural: len(objs)}, perms_needed, [])
+
+
+class ScalableChangeListMixin:
+    """Changelist without exact counts and with cached display columns.
+
+    Columns built by `get_display_columns()` are cached per row
+    and exposed as `obj.display_columns`, changes are reported
+    with `invalidate_display_cache()`.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_display_columns(self,
+                            objs: list[Model]) -> dict[Any, dict[str, Any]]:
+        return {}
+
+    def get_changelist_instance(self, request: HttpRequest):
+        changelist = super().get_changelist_instance(request)
+        objs = list(changelist.result_list)
+        keys = get_display_cache_keys(self.model, (obj.pk for obj in objs))
+
+        cached = cache.get_many(keys.values())
+        columns = {pk: cached[key] for pk, key in keys.items()
+                   if key in cached}
+        missing = [obj for obj in objs if obj.pk not in columns]
+        if missing:
+            computed = self.get_display_columns(missing)
+            cache.set_many({keys[pk]: value for pk, value in computed.items()},
+                           timeout=ADMIN_DISPLAY_CACHE_TIMEOUT)
+            columns.update(computed)
+
+        for obj in objs:
+            obj.display_columns = columns.get(obj.pk, {})
+        return changelist
@@ -0,0 +1,66 @@
+import asyncio
+from contextlib import suppress
+
+from django.core.handlers.asgi import ASGIHandler
+
+
+class StreamASGIHandler(ASGIHandler):
+    """Django handler for long-lived streams.
+
+    Django runs every request in its own thread-sensitive context,
+    the thread of its executor serves the synchronous middleware and
+    lives until the response ends, a thread per open stream. Here
+    such code of all streams shares one thread, it only runs while
+    a stream starts and ends.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.handle(scope, receive, send)
+
+
+class CancelOnDisconnect:
+    """Serve requests to `paths` with `stream_app` and cancel them
+    when the client disconnects.
+
+    Django doesn't watch for disconnects while streaming a response
+    and uvicorn drops writes to a closed connection silently,
+    so an endless stream would otherwise run forever.
+    """
+
+    def __init__(self, app, paths: tuple[str, ...], stream_app) -> None:
+        self.app = app
+        self.paths = paths
+        self.stream_app = stream_app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http' or scope['path'] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        body_read = asyncio.Event()
+
+        async def receive_body():
+            message = await receive()
+            if not message.get('more_body'):
+                body_read.set()
+            return message
+
+        async def wait_disconnect():
+            # Django reads the whole body before the view runs
+            # and doesn't call `receive` afterwards.
+            await body_read.wait()
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        response = asyncio.ensure_future(
+            self.stream_app(scope, receive_body, send)
+        )
+        disconnect = asyncio.ensure_future(wait_disconnect())
+        await asyncio.wait((response, disconnect),
+                           return_when=asyncio.FIRST_COMPLETED)
+        disconnect.cancel()
+        if not response.done():
+            response.cancel()
+            with suppress(asyncio.CancelledError):
+                await response
+            return
+        response.result()
@@ -0,0 +1,46 @@
+import os
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+
+from core.const import CACHE_CULL_INTERVAL_SECONDS
+
+# Next time to look at each cache directory, per process: cache
+# instances are created per request context.
+_next_culls: dict[str, float] = {}
+
+
+class FileCache(FileBasedCache):
+    """File cache culling expired entries first, then the oldest ones.
+
+    Django's file cache lists the directory on every `set()` and,
+    past `MAX_ENTRIES`, deletes a random third of the entries, live
+    ones included. Here the directory is listed at most once per
+    `CACHE_CULL_INTERVAL_SECONDS` in a process, and culling keeps
+    the most recently written entries.
+    """
+
+    def _cull(self) -> None:
+        now = time.monotonic()
+        if now < _next_culls.get(self._dir, 0):
+            return
+        _next_culls[self._dir] = now + CACHE_CULL_INTERVAL_SECONDS
+
+        filelist = self._list_cache_files()
+        if len(filelist) < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+
+        alive = []
+        for fname in filelist:
+            try:
+                with open(fname, 'rb') as file:
+                    # Deletes the file when it is expired.
+                    if not self._is_expired(file):
+                        alive.append((os.path.getmtime(fname), fname))
+            except FileNotFoundError:
+                pass
+        keep = self._max_entries - self._max_entries // self._cull_frequency
+        for _, fname in sorted(alive)[:max(len(alive) - keep, 0)]:
+            self._delete(fname)
@@ -17,14 +17,120 @@ MIN_AMOUNT_VALUE = 1
 DEFAULT_MODEL_ADMIN_NAME_LENGTH = 60
 DEFAULT_MODEL_ADMIN_NAME_SUFFIX = '...'
 ORDER_BY_CREATED_AT_DESC = '-created_at'
+ORDER_BY_ID_DESC = '-id'
+RECIPE_ORDERING = (ORDER_BY_CREATED_AT_DESC, ORDER_BY_ID_DESC)
 
 LOOKUP_DIGIT_PATTERN = r'\d+'
 SHORT_LINK_SLUG_NBYTES = 4
 SHORT_LINK_URL_PATH = 's/'
 SMALL_INTEGER_FIELD_MAX_VALUE = 32767
+RECIPE_BATCH_MAX_SIZE = 100
+IMPORT_BATCH_SIZE = 500
+PAGE_MAX_SIZE = 100
+EXPORT_CHUNK_SIZE = 500
+FIELDS_QUERY_PARAM = 'fields'
+EXPAND_QUERY_PARAM = 'expand'
+SPARSE_SERIALIZERS_CACHE_SIZE = 256
+FAST_SERIALIZERS_CACHE_SIZE = 1024
 
 FRONTEND_RECIPES_PATH = 'recipes/'
 
+PRIMARY_DB_ALIAS = 'default'
+
+DB_BREAKER_PROBE_SECONDS = 2
+DEGRADED_PATH_PREFIXES = ('/api/', f'/{SHORT_LINK_URL_PATH}')
+STALE_RESPONSE_CACHE_PREFIX = 'stale_response'
+STALE_RESPONSE_REFRESH_SECONDS = 60
+STALE_RESPONSE_URL_NAMES = frozenset((
+    'recipes-list', 'recipes-detail', 'tags-list', 'tags-detail',
+    'ingredients-list', 'ingredients-detail', 'short-link',
+))
+STALE_RESPONSE_HEADERS = ('Content-Type', 'Location')
+STALE_RESPONSE_WARNING = '110 - "Response is Stale"'
+REPLICA_PIN_COOKIE = 'primary_pin'
+
+METRICS_PREFIX = 'foodgram_'
+METRICS_URL_PATH = 'metrics/'
+POOL_GAUGES = frozenset(('min_size', 'max_size', 'size',
+                         'available', 'in_use', 'waiting'))
+
+MEDIA_HASH_ALGORITHM = 'sha256'
+MEDIA_HASH_PREFIX_LENGTH = 2
+MEDIA_GC_MIN_AGE_SECONDS = 24 * 60 * 60
+
+CACHE_LOCK_STRIPES = 64
+CACHE_CULL_INTERVAL_SECONDS = 10
+
+ADMIN_EXACT_COUNT_LIMIT = 10000
+ADMIN_DISPLAY_CACHE_PREFIX = 'admin_display'
+ADMIN_DISPLAY_CACHE_TIMEOUT = 24 * 60 * 60
+
+THROTTLE_CACHE_ALIAS = 'throttle'
+THROTTLE_CACHE_KEY_PREFIX = 'throttle'
+
+TAGS_CACHE_KEY = 'reference:tags'
+INGREDIENTS_CACHE_KEY = 'reference:ingredients'
+SHORT_LINK_CACHE_PREFIX = 'short_link'
+REFERENCE_CACHE_TIMEOUT = 24 * 60 * 60
+SHORT_LINK_WARM_LIMIT = 10000
+
+SIMILAR_RECIPES_TOP_K = 12
+SIMILAR_RECIPES_CHUNK_SIZE = 500
+SIMILAR_RECIPES_MAX_REVERSE = 1000
+SIMILAR_RECIPES_BATCH_SIZE = 5000
+SIMILAR_RECIPES_FREQUENT_SHARE = 0.01
+SIMILAR_RECIPES_FREQUENT_MIN = 500
+SIMILAR_RECIPES_FREQUENT_CACHE_KEY = 'similar_recipes:frequent'
+SIMILAR_REFRESH_BATCH_SIZE = 100
+SIMILAR_REFRESH_POLL_SECONDS = 5
+
+DATASET_BATCH_SIZE = 10000
+
+SYNC_PAGE_SIZE = 1000
+SYNC_EVENTS_RETENTION_DAYS = 30
+
+PANTRY_MAX_INGREDIENTS = 50
+PANTRY_MAX_MISSING = 5
+PANTRY_VERSION_CACHE_KEY = 'pantry:version'
+PANTRY_EPOCH_CACHE_KEY = 'pantry:epoch'
+PANTRY_CHANGES_CACHE_PREFIX = 'pantry:changes'
+PANTRY_CHANGES_TIMEOUT = 24 * 60 * 60
+PANTRY_MAX_REPLAY = 1000
+PANTRY_BATCH_SIZE = 5000
+
+RECIPE_FEED_URL_PATH = 'recipes/events/'
+RECIPE_FEED_CHANNEL = 'recipe_feed'
+RECIPE_FEED_QUEUE_SIZE = 100
+RECIPE_FEED_BACKFILL_LIMIT = 100
+RECIPE_FEED_HEARTBEAT_SECONDS = 15
+RECIPE_FEED_RETRY_MS = 5000
+RECIPE_FEED_RECONNECT_SECONDS = 5
+
+PROFILING_HEADER = 'X-Profile'
+PROFILING_INTERVAL_SECONDS = 0.005
+PROFILING_MEMORY_FRAMES = 10
+PROFILING_MEMORY_TOP = 50
+MAX_PROFILE_PATH_LENGTH = 255
+
+QUERY_INSPECTION_MODES = ('off', 'warn', 'strict')
+QUERY_TRACKER_SKIP = 'core/queries.py'
+QUERY_CALL_SITES = 3
+
+RECIPE_FACETS = ('tags', 'author')
+RECIPE_FACETS_CACHE_PREFIX = 'recipe_facets'
+RECIPE_FACETS_CACHE_TIMEOUT = 10 * 60
+RECIPE_FACETS_AUTHORS_LIMIT = 20
+
+DELETION_BATCH_SIZE = 500
+DELETION_POLL_SECONDS = 5
+# Rejected by the username and email validators, so no account can
+# take the name a deleted one is given.
+DELETED_USER_PREFIX = 'deleted:'
+DELETED_USER_EMAIL_DOMAIN = '@deleted.invalid'
+
+HEALTHZ_URL_PATH = 'healthz'
+READYZ_URL_PATH = 'readyz'
+
 
 @dataclass(frozen=True)
 class HttpMethod:
@@ -0,0 +1,139 @@
+from django.db import migrations
+
+
+class PostgresRunSQL(migrations.RunSQL):
+    """`RunSQL` applied on PostgreSQL only.
+
+    Keeps PostgreSQL specific indexes and extensions out of
+    the SQLite database used for development.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state,
+                                      to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state,
+                                       to_state)
+
+
+class PostgresHashPartition(migrations.operations.base.Operation):
+    """Rebuild the table of a model hash partitioned by a field.
+
+    Applied on PostgreSQL only, the model state is left unchanged.
+    The rows are copied into `partitions` tables, the constraints and
+    indexes are recreated under their names. PostgreSQL requires the
+    partition key in every unique constraint, so the primary key is
+    extended with the field's column. Unapplying copies the rows back
+    into a plain table.
+    """
+
+    reversible = True
+
+    def __init__(self, model_name: str, field_name: str,
+                 partitions: int) -> None:
+        self.model_name = model_name
+        self.field_name = field_name
+        self.partitions = partitions
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            model = to_state.apps.get_model(app_label, self.model_name)
+            self._rebuild(schema_editor, model, partitioned=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            model = to_state.apps.get_model(app_label, self.model_name)
+            self._rebuild(schema_editor, model, partitioned=False)
+
+    def describe(self):
+        return (f'Partition {self.model_name} by hash of {self.field_name} '
+                f'into {self.partitions} tables')
+
+    @property
+    def migration_name_fragment(self):
+        return f'partition_{self.model_name.lower()}'
+
+    def _rebuild(self, schema_editor, model, partitioned: bool) -> None:
+        quote = schema_editor.quote_name
+        table = model._meta.db_table
+        pk = model._meta.pk.column
+        key = model._meta.get_field(self.field_name).column
+        rebuilt = f'{table}_rebuilt'
+        constraints, indexes = self._get_schema(schema_editor.connection,
+                                                table)
+
+        schema_editor.execute(
+            f'CREATE TABLE {quote(rebuilt)} '
+            f'(LIKE {quote(table)} INCLUDING DEFAULTS)'
+            + (f' PARTITION BY HASH ({quote(key)})' if partitioned else '')
+        )
+        for remainder in range(self.partitions if partitioned else 0):
+            schema_editor.execute(
+                f'CREATE TABLE {quote(f"{table}_p{remainder}")} '
+                f'PARTITION OF {quote(rebuilt)} FOR VALUES WITH '
+                f'(MODULUS {self.partitions}, REMAINDER {remainder})'
+            )
+        schema_editor.execute(
+            f'INSERT INTO {quote(rebuilt)} SELECT * FROM {quote(table)}'
+        )
+        schema_editor.execute(f'DROP TABLE {quote(table)}')
+        schema_editor.execute(
+            f'ALTER TABLE {quote(rebuilt)} RENAME TO {quote(table)}'
+        )
+
+        primary_key = (pk, key) if partitioned else (pk,)
+        schema_editor.execute(
+            f'ALTER TABLE {quote(table)} ADD CONSTRAINT '
+            f'{quote(f"{table}_pkey")} PRIMARY KEY '
+            f'({", ".join(map(quote, primary_key))})'
+        )
+        schema_editor.execute(
+            f'ALTER TABLE {quote(table)} ALTER COLUMN {quote(pk)} '
+            'ADD GENERATED BY DEFAULT AS IDENTITY'
+        )
+        schema_editor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', '{pk}'), "
+            f'COALESCE(MAX({quote(pk)}), 1), MAX({quote(pk)}) IS NOT NULL) '
+            f'FROM {quote(table)}'
+        )
+        for name, definition in constraints:
+            schema_editor.execute(
+                f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} '
+                f'{definition}'
+            )
+        for definition in indexes:
+            schema_editor.execute(definition)
+
+    def _get_schema(self, connection, table: str
+                    ) -> tuple[list[tuple[str, str]], list[str]]:
+        """Constraints but the primary key, and the other indexes."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT conname, pg_get_constraintdef(oid) '
+                'FROM pg_constraint '
+                "WHERE conrelid = %s::regclass AND contype <> 'p' "
+                'ORDER BY conname',
+                (table,)
+            )
+            constraints = cursor.fetchall()
+            cursor.execute(
+                'SELECT pg_get_indexdef(indexrelid) FROM pg_index i '
+                'WHERE indrelid = %s::regclass AND NOT EXISTS ('
+                '    SELECT FROM pg_constraint c '
+                '    WHERE c.conrelid = i.indrelid '
+                '    AND c.conindid = i.indexrelid'
+                ') ORDER BY indexrelid',
+                (table,)
+            )
+            indexes = [definition for definition, in cursor.fetchall()]
+        return constraints, indexes
@@ -0,0 +1,126 @@
+import threading
+from typing import Optional
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base
+from django.utils.asyncio import async_unsafe
+from psycopg import IsolationLevel
+from psycopg_pool import ConnectionPool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend that checks connections out of a psycopg pool.
+
+    Pool arguments are taken from `OPTIONS['pool']`,
+    pools are shared by all threads of a process, one per alias.
+    """
+
+    _pools: dict[str, ConnectionPool] = {}
+    _pools_lock = threading.Lock()
+
+    @property
+    def pool(self) -> Optional[ConnectionPool]:
+        pool_options = self.settings_dict['OPTIONS'].get('pool')
+        if self.alias == NO_DB_ALIAS or not pool_options:
+            return None
+
+        pool = self._pools.get(self.alias)
+        if pool is not None and pool.name == self._pool_name:
+            return pool
+
+        with self._pools_lock:
+            pool = self._pools.get(self.alias)
+            if pool is not None and pool.name == self._pool_name:
+                return pool
+            if pool is not None:
+                # The database was renamed, e.g. by the test runner.
+                pool.close()
+
+            if self.settings_dict['CONN_MAX_AGE']:
+                raise ImproperlyConfigured(
+                    'Pooled connections must not be persistent, '
+                    'set `CONN_MAX_AGE` to `0`.'
+                )
+
+            connect_kwargs = self.get_connection_params()
+            connect_kwargs['autocommit'] = True
+            self._pools[self.alias] = pool = ConnectionPool(
+                kwargs=connect_kwargs,
+                name=self._pool_name,
+                open=False,
+                check=(ConnectionPool.check_connection
+                       if self.settings_dict['CONN_HEALTH_CHECKS']
+                       else None),
+                **pool_options
+            )
+        return pool
+
+    @property
+    def _pool_name(self) -> str:
+        return f'{self.alias}:{self.settings_dict["NAME"]}'
+
+    def get_connection_params(self) -> dict:
+        conn_params = super().get_connection_params()
+        conn_params.pop('pool', None)
+        return conn_params
+
+    @async_unsafe
+    def get_new_connection(self, conn_params: dict):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        pool.open()
+        connection = pool.getconn()
+        self.isolation_level = IsolationLevel.READ_COMMITTED
+        return connection
+
+    def _close(self) -> None:
+        connection_pool = getattr(self.connection, '_pool', None)
+        if connection_pool is None:
+            return super()._close()
+
+        with self.wrap_database_errors:
+            connection_pool.putconn(self.connection)
+            self.connection = None
+
+    @classmethod
+    def close_pools(cls) -> None:
+        """Close pools of this process, e.g. before forking workers.
+
+        Pool worker threads don't survive a fork, pools are reopened
+        on the next connection.
+        """
+        with cls._pools_lock:
+            for pool in cls._pools.values():
+                pool.close()
+            cls._pools.clear()
+
+    @classmethod
+    def get_pool_stats(cls) -> dict[str, dict[str, int]]:
+        """Pool counters of this process by database alias."""
+        pools_stats = {}
+        for alias, pool in tuple(cls._pools.items()):
+            stats = pool.get_stats()
+            size = stats.get('pool_size', 0)
+            available = stats.get('pool_available', 0)
+            created = stats.get('connections_num', 0)
+            lost = (stats.get('connections_lost', 0)
+                    + stats.get('returns_bad', 0))
+            pools_stats[alias] = {
+                'min_size': stats.get('pool_min', 0),
+                'max_size': stats.get('pool_max', 0),
+                'size': size,
+                'available': available,
+                'in_use': size - available,
+                'waiting': stats.get('requests_waiting', 0),
+                'created': created,
+                'lost': lost,
+                'recycled': max(created - size - lost, 0),
+                'requests': stats.get('requests_num', 0),
+                'requests_queued': stats.get('requests_queued', 0),
+                'requests_errors': stats.get('requests_errors', 0),
+                'requests_wait_ms': stats.get('requests_wait_ms', 0),
+            }
+        return pools_stats
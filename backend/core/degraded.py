@@ -0,0 +1,169 @@
+"""Degraded mode: a circuit breaker and stale copies of public reads.
+
+Requests failing on database errors are counted per process, any
+successful query resets the count. Once the breaker trips, a probe
+thread retries the database in the background until it answers, and
+requests fail fast meanwhile. The last good responses to anonymous
+reads are kept in the shared cache, long past their freshness, to be
+served stale instead of an error.
+"""
+import hashlib
+import threading
+import time
+from typing import Any, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+from django.http import HttpRequest, HttpResponse
+
+from .const import (DB_BREAKER_PROBE_SECONDS, DEGRADED_PATH_PREFIXES,
+                    PRIMARY_DB_ALIAS, STALE_RESPONSE_CACHE_PREFIX,
+                    STALE_RESPONSE_HEADERS, STALE_RESPONSE_REFRESH_SECONDS,
+                    STALE_RESPONSE_URL_NAMES, STALE_RESPONSE_WARNING)
+
+
+class CircuitBreaker:
+    """Process-wide count of consecutive database failures.
+
+    Open after `threshold` failures. Requests are let through again
+    after `reset_seconds`, or as soon as the probe reaches the
+    database, a single failure opens it again until a success.
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float) -> None:
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._probe: Optional[threading.Thread] = None
+
+    @property
+    def is_open(self) -> bool:
+        opened_at = self.opened_at
+        return (opened_at is not None
+                and time.monotonic() - opened_at < self.reset_seconds)
+
+    @property
+    def is_tripped(self) -> bool:
+        return self.failures >= self.threshold
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if not self.is_tripped:
+                return
+            self.opened_at = time.monotonic()
+            if self._probe is None or not self._probe.is_alive():
+                self._probe = threading.Thread(target=self._run_probe,
+                                               name='db-breaker-probe',
+                                               daemon=True)
+                self._probe.start()
+
+    def record_success(self) -> None:
+        # Called on every query, the lock is only taken after failures.
+        if self.failures:
+            with self._lock:
+                self.failures = 0
+                self.opened_at = None
+
+    def _run_probe(self) -> None:
+        connection = connections[PRIMARY_DB_ALIAS]
+        while self.is_tripped:
+            time.sleep(DB_BREAKER_PROBE_SECONDS)
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            except DatabaseError:
+                continue
+            finally:
+                connection.close()
+            self.record_success()
+
+
+breaker = CircuitBreaker(settings.DB_BREAKER_FAILURES,
+                         settings.DB_BREAKER_RESET_SECONDS)
+
+
+def _record_success(execute, sql, params, many, context):
+    result = execute(sql, params, many, context)
+    breaker.record_success()
+    return result
+
+
+def install(connection, **kwargs) -> None:
+    if _record_success not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_success)
+
+
+def enable() -> None:
+    """Reset the breaker on the queries of every connection."""
+    connection_created.connect(install,
+                               dispatch_uid='core.degraded.install')
+    for connection in connections.all(initialized_only=True):
+        install(connection)
+
+
+def is_degradable(request: HttpRequest) -> bool:
+    return request.path.startswith(DEGRADED_PATH_PREFIXES)
+
+
+def get_stale_key(request: HttpRequest) -> Optional[str]:
+    """Key of the stale copy, `None` unless the request is public.
+
+    Requests with credentials may get personal data, e.g. the flags
+    of their lists, so only anonymous ones share copies.
+    """
+    if (request.method != 'GET' or 'HTTP_AUTHORIZATION' in request.META
+            or not is_degradable(request)):
+        return None
+    digest = hashlib.sha1(
+        f'{request.get_full_path()}\n'
+        f'{request.headers.get("Accept", "")}'.encode()
+    ).hexdigest()
+    return f'{STALE_RESPONSE_CACHE_PREFIX}:{digest}'
+
+
+def make_entry(request: HttpRequest,
+               response: HttpResponse) -> Optional[dict[str, Any]]:
+    """Copy of a good response worth keeping, if any."""
+    url_name = getattr(request.resolver_match, 'url_name', None)
+    if (url_name not in STALE_RESPONSE_URL_NAMES or response.streaming
+            or getattr(response, 'is_stale', False)
+            or response.status_code not in (200, 301)):
+        return None
+    return {
+        'status': response.status_code,
+        'content': response.content,
+        'headers': {name: response[name] for name in STALE_RESPONSE_HEADERS
+                    if response.has_header(name)},
+        'stored_at': time.time(),
+    }
+
+
+def get_fresh_key(key: str) -> str:
+    """Marker of a recently stored copy, so it isn't rewritten often."""
+    return f'{key}:fresh'
+
+
+def store(key: str, entry: dict[str, Any]) -> None:
+    if cache.add(get_fresh_key(key), True, STALE_RESPONSE_REFRESH_SECONDS):
+        cache.set(key, entry, settings.STALE_RESPONSE_TIMEOUT)
+
+
+async def astore(key: str, entry: dict[str, Any]) -> None:
+    if await cache.aadd(get_fresh_key(key), True,
+                        STALE_RESPONSE_REFRESH_SECONDS):
+        await cache.aset(key, entry, settings.STALE_RESPONSE_TIMEOUT)
+
+
+def build_stale_response(entry: dict[str, Any]) -> HttpResponse:
+    response = HttpResponse(entry['content'], status=entry['status'])
+    for name, value in entry['headers'].items():
+        response[name] = value
+    response['Age'] = str(max(int(time.time() - entry['stored_at']), 0))
+    response['Warning'] = STALE_RESPONSE_WARNING
+    response.is_stale = True
+    return response
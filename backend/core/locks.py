@@ -0,0 +1,64 @@
+"""Read-modify-write of values shared by the workers in the cache.
+
+The file-based cache reads and writes whole files, its `incr()` is a
+`get()` and a `set()`, so concurrent updates from several processes
+are lost. They are serialized by a lock on one of
+`CACHE_LOCK_STRIPES` files next to the cache files. Other backends
+fall back to a lock of the process. Locks are not reentrant.
+"""
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+from secrets import token_hex
+from typing import Iterator
+
+from django.core.cache import BaseCache
+from django.core.cache import cache as default_cache
+from django.core.files import locks
+
+from .const import CACHE_LOCK_STRIPES
+
+_process_lock = threading.Lock()
+
+
+@contextmanager
+def cache_lock(key: str, cache: BaseCache = default_cache) -> Iterator[None]:
+    directory = getattr(cache, '_dir', None)
+    if directory is None:
+        with _process_lock:
+            yield
+        return
+
+    stripe = zlib.crc32(key.encode()) % CACHE_LOCK_STRIPES
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f'{stripe}.lock'), 'ab') as file:
+        locks.lock(file, locks.LOCK_EX)
+        try:
+            yield
+        finally:
+            locks.unlock(file)
+
+
+def get_generation(key: str, cache: BaseCache = default_cache) -> str:
+    """Generation to name cached values after, see `bump_generation()`."""
+    generation = cache.get(key)
+    if generation is None:
+        with cache_lock(key, cache):
+            generation = cache.get(key)
+            if generation is None:
+                generation = token_hex(4), 0
+                cache.set(key, generation, timeout=None)
+    return '{}.{}'.format(*generation)
+
+
+def bump_generation(key: str, cache: BaseCache = default_cache) -> None:
+    """Move to a new generation, values named after older ones expire.
+
+    A generation is a counter with a random epoch. A counter lost
+    to culling restarts in a new epoch, so it never goes back to
+    a generation whose values may still be cached.
+    """
+    with cache_lock(key, cache):
+        epoch, number = cache.get(key) or (token_hex(4), 0)
+        cache.set(key, (epoch, number + 1), timeout=None)
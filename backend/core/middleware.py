@@ -0,0 +1,181 @@
+import logging
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import InterfaceError, OperationalError
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+
+from . import degraded
+from .const import QUERY_INSPECTION_MODES, REPLICA_PIN_COOKIE
+from .queries import QueryBudgetExceeded, QueryTracker, get_budget
+from .routers import RoutingState, routing_state
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaRoutingMiddleware:
+    """Route safe requests to replicas, pin writers to the primary.
+
+    A request that writes gets a short-lived cookie,
+    so the client reads its own writes from the primary.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            routing_state.reset(token)
+        return self._finish(response, state)
+
+    async def __acall__(self, request: HttpRequest):
+        state, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routing_state.reset(token)
+        return self._finish(response, state)
+
+    def _start(self, request: HttpRequest):
+        state = RoutingState(
+            use_replica=(request.method in SAFE_METHODS
+                         and REPLICA_PIN_COOKIE not in request.COOKIES)
+        )
+        return state, routing_state.set(state)
+
+    def _finish(self, response: HttpResponse,
+                state: RoutingState) -> HttpResponse:
+        if state.wrote:
+            response.set_cookie(REPLICA_PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+
+class DegradedModeMiddleware:
+    """Keep public reads up while the database fails.
+
+    Anonymous reads of recipes, tags, ingredients and short links are
+    answered with their last good copy, marked with `Warning` and
+    `Age`, when the database fails or the circuit breaker is open.
+    Other API requests get 503 instead of waiting on the database.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        degraded.enable()
+
+    def __call__(self, request: HttpRequest):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        key = degraded.get_stale_key(request)
+        if degraded.breaker.is_open and degraded.is_degradable(request):
+            return self._degrade(key and cache.get(key))
+        response = self.get_response(request)
+        entry = key and degraded.make_entry(request, response)
+        if entry:
+            degraded.store(key, entry)
+        return response
+
+    async def __acall__(self, request: HttpRequest):
+        key = degraded.get_stale_key(request)
+        if degraded.breaker.is_open and degraded.is_degradable(request):
+            return self._degrade(key and await cache.aget(key))
+        response = await self.get_response(request)
+        entry = key and degraded.make_entry(request, response)
+        if entry:
+            await degraded.astore(key, entry)
+        return response
+
+    def process_exception(self, request: HttpRequest,
+                          exception: Exception) -> Optional[HttpResponse]:
+        if not isinstance(exception, (OperationalError, InterfaceError)):
+            return None
+        degraded.breaker.record_failure()
+        if not degraded.is_degradable(request):
+            return None
+        key = degraded.get_stale_key(request)
+        return self._degrade(key and cache.get(key))
+
+    def _degrade(self, entry: Optional[dict]) -> HttpResponse:
+        if entry:
+            return degraded.build_stale_response(entry)
+        response = JsonResponse(
+            {'detail': 'Сервис временно недоступен, повторите запрос позже.'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        response['Retry-After'] = str(
+            max(int(degraded.breaker.reset_seconds), 1)
+        )
+        return response
+
+
+class QueryInspectionMiddleware:
+    """Report repeated queries and exceeded query budgets of requests.
+
+    `QUERY_INSPECTION` is `warn` to log the problems, `strict` to fail
+    the request with them, or `off` to leave the middleware out.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        if settings.QUERY_INSPECTION not in QUERY_INSPECTION_MODES:
+            raise ImproperlyConfigured(
+                f'QUERY_INSPECTION must be one of {QUERY_INSPECTION_MODES}.'
+            )
+        if settings.QUERY_INSPECTION == 'off':
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with QueryTracker() as tracker:
+            response = self.get_response(request)
+        return self._finish(request, response, tracker)
+
+    async def __acall__(self, request: HttpRequest):
+        with QueryTracker() as tracker:
+            response = await self.get_response(request)
+        return self._finish(request, response, tracker)
+
+    def _finish(self, request: HttpRequest, response: HttpResponse,
+                tracker: QueryTracker) -> HttpResponse:
+        url_name = getattr(request.resolver_match, 'url_name', None)
+        problems = tracker.check(get_budget(url_name, request.method))
+        if not problems:
+            return response
+
+        report = (f'{request.method} {request.path} ({url_name}):\n'
+                  + '\n'.join(problems))
+        if settings.QUERY_INSPECTION == 'strict':
+            raise QueryBudgetExceeded(report)
+        logger.warning(report)
+        return response
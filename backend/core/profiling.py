@@ -0,0 +1,99 @@
+"""Sampling CPU profiler and allocation tracing for single requests.
+
+The sampler thread reads the stacks of the watched threads at a fixed
+interval and counts them in the folded format of flame graph tools
+(`root;caller;callee count`). Profiled code runs unmodified, so the
+cost is bounded by the interval whatever the code does.
+"""
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import Optional
+
+from core.const import (PROFILING_INTERVAL_SECONDS, PROFILING_MEMORY_FRAMES,
+                        PROFILING_MEMORY_TOP)
+
+
+def _fold(frame: Optional[FrameType]) -> list[str]:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f'{code.co_name} ({code.co_filename}:{frame.f_lineno})')
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class StackSampler(threading.Thread):
+    """Count the stacks of `threads`, named by role, until stopped."""
+
+    def __init__(self, threads: dict[int, str],
+                 interval: float = PROFILING_INTERVAL_SECONDS) -> None:
+        super().__init__(name='stack-sampler', daemon=True)
+        self.threads = threads
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id, role in self.threads.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.stacks[';'.join((role, *_fold(frame)))] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+    def folded(self) -> str:
+        return ''.join(f'{stack} {count}\n'
+                       for stack, count in self.stacks.most_common())
+
+
+class MemoryTracer:
+    """Allocations of a request, traced with `tracemalloc`.
+
+    Tracing is process-wide: it runs while any traced request does,
+    so concurrent requests add to each other's figures.
+    """
+
+    _lock = threading.Lock()
+    _active = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if not MemoryTracer._active:
+                tracemalloc.start(PROFILING_MEMORY_FRAMES)
+            else:
+                tracemalloc.reset_peak()
+            MemoryTracer._active += 1
+
+    def stop(self) -> tuple[int, str]:
+        """Peak traced bytes and the report of allocations still held."""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*'),
+            # The sampler's own stack counts.
+            tracemalloc.Filter(False, __file__, all_frames=True),
+        ))
+        _, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            MemoryTracer._active -= 1
+            if not MemoryTracer._active:
+                tracemalloc.stop()
+
+        statistics = snapshot.statistics('traceback')
+        lines = [f'Peak: {peak} B, held: '
+                 f'{sum(stat.size for stat in statistics)} B', '']
+        for stat in statistics[:PROFILING_MEMORY_TOP]:
+            lines.append(f'{stat.size} B in {stat.count} blocks')
+            lines.extend(f'    {line}' for line in stat.traceback.format(
+                most_recent_first=True
+            ))
+        return peak, '\n'.join(lines) + '\n'
@@ -0,0 +1,148 @@
+"""Repeated query detection and query budgets.
+
+Every query run while a `QueryTracker` is active is reduced to its
+shape: literals and parameter lists are replaced, so the queries of an
+N+1 loop share one fingerprint. The tracker lives in a context
+variable, it follows a request into the threads running its sync code.
+"""
+import json
+import re
+import sys
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from core.const import QUERY_CALL_SITES, QUERY_TRACKER_SKIP
+
+_tracker: ContextVar[Optional['QueryTracker']] = ContextVar('query_tracker',
+                                                            default=None)
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+VALUE_LIST = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+SAVEPOINT = re.compile(r'^(?:RELEASE |ROLLBACK TO )?SAVEPOINT ')
+WHITESPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    """The request ran more queries than allowed or repeated a query."""
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> str:
+    """Shape of the query, the same for any parameter values."""
+    sql = STRING_LITERAL.sub('?', sql)
+    sql = NUMBER_LITERAL.sub('?', sql)
+    sql = VALUE_LIST.sub('(...)', sql)
+    return WHITESPACE.sub(' ', sql).strip()
+
+
+def _get_call_site() -> str:
+    """First frame of the project's own code outside of this module."""
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(base_dir)
+                and not filename.endswith(QUERY_TRACKER_SKIP)):
+            return (f'{Path(filename).relative_to(base_dir)}:'
+                    f'{frame.f_lineno} in {frame.f_code.co_name}')
+        frame = frame.f_back
+    return '<unknown>'
+
+
+def _record(execute, sql, params, many, context):
+    tracker = _tracker.get()
+    if tracker is not None:
+        tracker.add(sql)
+    return execute(sql, params, many, context)
+
+
+def install(connection, **kwargs) -> None:
+    """Watch the queries of a connection, e.g. on `connection_created`."""
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record)
+
+
+def enable() -> None:
+    """Watch every connection of the process, opened now or later."""
+    connection_created.connect(install,
+                               dispatch_uid='core.queries.install')
+    for connection in connections.all(initialized_only=True):
+        install(connection)
+
+
+class QueryTracker:
+    """Queries run within the block, grouped by shape.
+
+    >>> with QueryTracker() as tracker:
+    ...     client.get('/api/recipes/')
+    >>> tracker.check(budget)
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.shapes: Counter[str] = Counter()
+        self.call_sites: dict[str, Counter[str]] = defaultdict(Counter)
+
+    def __enter__(self) -> 'QueryTracker':
+        enable()
+        self._parent = _tracker.get()
+        self._token = _tracker.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _tracker.reset(self._token)
+
+    def add(self, sql: str) -> None:
+        if self._parent is not None:
+            self._parent.add(sql)
+        self.count += 1
+        if SAVEPOINT.match(sql):
+            return
+        shape = fingerprint(sql)
+        self.shapes[shape] += 1
+        self.call_sites[shape][_get_call_site()] += 1
+
+    def repeated(self, limit: int = 1) -> list[tuple[str, int]]:
+        """Shapes run more than `limit` times, most frequent first."""
+        return [(shape, count) for shape, count in self.shapes.most_common()
+                if count > limit]
+
+    def check(self, budget: dict[str, int]) -> list[str]:
+        """Problems found against `{'queries': …, 'repeats': …}`."""
+        problems = []
+        if self.count > budget['queries']:
+            problems.append(f'{self.count} queries, '
+                            f'the budget is {budget["queries"]}.')
+        for shape, count in self.repeated(budget['repeats']):
+            sites = ', '.join(
+                f'{site} ×{n}' for site, n
+                in self.call_sites[shape].most_common(QUERY_CALL_SITES)
+            )
+            problems.append(f'{count}× {shape}\n    from {sites}')
+        return problems
+
+
+@lru_cache(maxsize=None)
+def load_budgets(path: str) -> dict[str, Any]:
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def get_budget(url_name: Optional[str], method: str) -> dict[str, int]:
+    """Budget of `url_name:method`, `url_name`, or the default one.
+
+    Entries of `QUERY_BUDGETS_FILE` override the default per key.
+    """
+    budgets = load_budgets(str(settings.QUERY_BUDGETS_FILE))
+    endpoints = budgets.get('endpoints', {})
+    return {**budgets['default'],
+            **endpoints.get(f'{url_name}:{method.lower()}',
+                            endpoints.get(url_name, {}))}
@@ -0,0 +1,106 @@
+import random
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from .const import PRIMARY_DB_ALIAS
+
+REPLICA_LAG_SQL = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+    'THEN 0 ELSE COALESCE('
+    'EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+)
+
+
+@dataclass
+class RoutingState:
+    """Per-request routing decision shared with worker threads."""
+
+    use_replica: bool = False
+    wrote: bool = False
+
+
+routing_state: ContextVar[Optional[RoutingState]] = ContextVar(
+    'routing_state', default=None
+)
+
+
+class ReplicaHealth:
+    """Process-wide cache of replica lag checks."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._checked_at: dict[str, float] = {}
+        self._healthy: dict[str, bool] = {}
+
+    def is_healthy(self, alias: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            checked_at = self._checked_at.get(alias)
+            if (checked_at is not None
+                    and now - checked_at < settings.REPLICA_CHECK_INTERVAL):
+                return self._healthy[alias]
+            self._checked_at[alias] = now
+
+        healthy = self.check(alias)
+        with self._lock:
+            self._healthy[alias] = healthy
+        return healthy
+
+    def check(self, alias: str) -> bool:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(REPLICA_LAG_SQL)
+                lag, = cursor.fetchone()
+        except DatabaseError:
+            connections[alias].close()
+            return False
+        return float(lag) <= settings.REPLICA_MAX_LAG
+
+
+replica_health = ReplicaHealth()
+
+
+class PrimaryReplicaRouter:
+    """Send safe-method request reads to a healthy replica.
+
+    Writes, transactions, requests pinned to the primary
+    and anything outside of a request go to the primary.
+    """
+
+    def _replicas(self) -> list[str]:
+        return [alias for alias in settings.DATABASES
+                if alias != PRIMARY_DB_ALIAS]
+
+    def db_for_read(self, model, **hints) -> str:
+        state = routing_state.get()
+        if (state is None
+                or not state.use_replica
+                or state.wrote
+                or connections[PRIMARY_DB_ALIAS].in_atomic_block):
+            return PRIMARY_DB_ALIAS
+
+        replicas = self._replicas()
+        random.shuffle(replicas)
+        for alias in replicas:
+            if replica_health.is_healthy(alias):
+                return alias
+        return PRIMARY_DB_ALIAS
+
+    def db_for_write(self, model, **hints) -> str:
+        state = routing_state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        return True
+
+    def allow_migrate(self, db: str, app_label: str,
+                      model_name=None, **hints) -> bool:
+        return db == PRIMARY_DB_ALIAS
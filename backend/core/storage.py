@@ -0,0 +1,58 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from core.const import MEDIA_HASH_ALGORITHM, MEDIA_HASH_PREFIX_LENGTH
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage naming files by the hash of their content.
+
+    `recipes/photo.JPG` is stored as `recipes/ab/abcd….jpg`,
+    so identical uploads share one file. Files are never removed
+    on replace or delete, unreferenced ones are collected
+    by the `cleanmedia` command.
+    """
+
+    def get_hashed_name(self, name: str, content: File) -> str:
+        digest = hashlib.new(MEDIA_HASH_ALGORITHM)
+        for chunk in content.chunks():
+            digest.update(chunk if isinstance(chunk, bytes)
+                          else chunk.encode())
+        content.seek(0)
+
+        hexdigest = digest.hexdigest()
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, hexdigest[:MEDIA_HASH_PREFIX_LENGTH],
+                            hexdigest + extension).replace('\\', '/')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.get_hashed_name(name, content)
+        if self.exists(name):
+            # Fresh mtime keeps a reused file out of the cleanup grace period.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
+
+    def _save(self, name, content):
+        saved_name = super()._save(name, content)
+        if saved_name != name:
+            # Lost a race with an identical upload, keep the first copy.
+            self.delete(saved_name)
+        return name
+
+
+def get_profiles_storage() -> FileSystemStorage:
+    """Request profiles, kept out of the served media directory."""
+    return FileSystemStorage(location=settings.PROFILING_DIR)
@@ -0,0 +1,52 @@
+from django.db import DatabaseError, connections
+from django.http.request import HttpRequest
+from django.http.response import HttpResponse, JsonResponse
+
+from core.const import METRICS_PREFIX, POOL_GAUGES, PRIMARY_DB_ALIAS
+from core.warmup import state, warm_up
+
+
+def metrics(request: HttpRequest) -> HttpResponse:
+    """Prometheus metrics of the current worker process."""
+    get_pool_stats = getattr(connections[PRIMARY_DB_ALIAS],
+                             'get_pool_stats', None)
+    pools_stats = get_pool_stats() if get_pool_stats else {}
+    keys = next(iter(pools_stats.values()), {}).keys()
+    lines = []
+
+    for key in keys:
+        metric_type = 'gauge' if key in POOL_GAUGES else 'counter'
+        name = f'{METRICS_PREFIX}db_pool_{key}'
+        if metric_type == 'counter':
+            name += '_total'
+        lines.append(f'# TYPE {name} {metric_type}')
+        lines.extend(f'{name}{{alias="{alias}"}} {stats[key]}'
+                     for alias, stats in pools_stats.items())
+
+    return HttpResponse('\n'.join(lines) + '\n',
+                        content_type='text/plain; version=0.0.4')
+
+
+def healthz(request: HttpRequest) -> HttpResponse:
+    """Liveness probe, the process serves requests."""
+    return JsonResponse({'status': 'ok'})
+
+
+def readyz(request: HttpRequest) -> HttpResponse:
+    """Readiness probe, warm-up is done and the database responds."""
+    ready = warm_up()
+    try:
+        with connections[PRIMARY_DB_ALIAS].cursor() as cursor:
+            cursor.execute('SELECT 1')
+        database = True
+    except DatabaseError:
+        database = False
+
+    return JsonResponse(
+        {'ready': ready and database,
+         'warm_up': ready,
+         'database': database,
+         'warm_up_ms': state.timings_ms,
+         'error': state.error},
+        status=200 if ready and database else 503
+    )
@@ -0,0 +1,66 @@
+"""Boot-time warm-up of a worker process.
+
+Runs the `WARM_UP_TASKS` callables once, e.g. in the gunicorn master
+before workers are forked, and remembers their timings
+for the readiness probe.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.urls import get_resolver
+from django.utils.module_loading import import_string
+from PIL import Image
+
+
+@dataclass
+class WarmUpState:
+    ready: bool = False
+    timings_ms: dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+state = WarmUpState()
+_lock = threading.Lock()
+
+
+def warm_up() -> bool:
+    """Run warm-up tasks unless they already succeeded."""
+    with _lock:
+        if state.ready:
+            return True
+
+        timings_ms = {}
+        for path in settings.WARM_UP_TASKS:
+            start = time.perf_counter()
+            try:
+                import_string(path)()
+            except (DatabaseError, OSError) as exc:
+                state.error = f'{path}: {exc!r}'
+                return False
+            timings_ms[path] = round((time.perf_counter() - start) * 1000, 1)
+
+        state.timings_ms = timings_ms
+        state.error = None
+        state.ready = True
+        return True
+
+
+def populate_url_resolver() -> None:
+    get_resolver().reverse_dict
+
+
+def init_image_plugins() -> None:
+    Image.init()
+
+
+def release_connections() -> None:
+    """Close connections and pools, so no socket is shared after fork."""
+    connections.close_all()
+    for connection in connections.all(initialized_only=True):
+        close_pools = getattr(connection, 'close_pools', None)
+        if close_pools is not None:
+            close_pools()
@@ -1,10 +1,27 @@
+from collections import defaultdict
+from functools import partial
+from typing import Any
+
 from django.contrib import admin
-from django.db.models import Count
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import OuterRef, Q
 from django.db.models.query import QuerySet
-from django.http import HttpRequest
-
-from foodgram.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                             RecipeShortLink, ShoppingCart, Tag)
+from django.http import FileResponse, HttpRequest
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from core.admin import (ScalableChangeListMixin, SoftDeleteAdminMixin,
+                        SubqueryCount)
+from core.const import RECIPE_ORDERING
+from foodgram.deletion import get_stages, mark_recipes_deleted
+from foodgram.models import (Deletion, Favorite, Ingredient, Recipe,
+                             RecipeIngredient, RecipeShortLink, RequestProfile,
+                             ShoppingCart, Tag)
+from foodgram.pantry import publish_recipe_changes
+from foodgram.similarity import queue_similar_refresh
+from users.models import User
 
 
 @admin.register(Ingredient)
@@ -23,7 +40,9 @@ class RecipeIngredientInLine(admin.TabularInline):
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(SoftDeleteAdminMixin, ScalableChangeListMixin,
+                  admin.ModelAdmin):
+    mark_deleted = staticmethod(mark_recipes_deleted)
     list_select_related = ('author',)
     list_display = ('name', 'author', 'created_at',
                     'tags_list', 'ingredients_list', 'n_favorites')
@@ -41,25 +60,61 @@ class RecipeAdmin(admin.ModelAdmin):
          {'fields': ('n_favorites',)}),
     )
 
-    def _make_list_str(self, obj: Recipe, attr: str) -> str:
-        return ', '.join((item.name for item in getattr(obj, attr).all()))
-
     @admin.display(description='в избранное')
     def n_favorites(self, obj: Recipe) -> int:
-        return obj.favorite__count
+        return obj.favorites_count
 
     @admin.display(description='теги')
     def tags_list(self, obj: Recipe) -> str:
-        return self._make_list_str(obj, 'tags')
+        return obj.display_columns.get('tags_list', '')
 
     @admin.display(description='ингредиенты')
     def ingredients_list(self, obj: Recipe) -> str:
-        return self._make_list_str(obj, 'ingredients')
+        return obj.display_columns.get('ingredients_list', '')
+
+    def get_display_columns(self,
+                            objs: list[Recipe]) -> dict[Any, dict[str, str]]:
+        ids = [obj.pk for obj in objs]
+        names = {'tags_list': defaultdict(list),
+                 'ingredients_list': defaultdict(list)}
+        for column, model in (('tags_list', Tag),
+                              ('ingredients_list', Ingredient)):
+            for recipe_id, name in model.objects.filter(
+                recipe__in=ids
+            ).values_list('recipe', 'name'):
+                names[column][recipe_id].append(name)
+
+        return {pk: {column: ', '.join(by_recipe[pk])
+                     for column, by_recipe in names.items()}
+                for pk in ids}
+
+    def get_search_results(self, request: HttpRequest, queryset: QuerySet,
+                           search_term: str) -> tuple[QuerySet, bool]:
+        if not search_term:
+            return queryset, False
+        # Separate predicates, so each is served by its trigram index.
+        authors = User.objects.filter(
+            username__icontains=search_term
+        ).values('pk')
+        return queryset.filter(
+            Q(name__icontains=search_term) | Q(author__in=authors)
+        ), False
+
+    def save_related(self, request: HttpRequest, form, formsets,
+                     change: bool) -> None:
+        super().save_related(request, form, formsets, change)
+        queue_similar_refresh((form.instance.pk,))
+        transaction.on_commit(
+            partial(publish_recipe_changes, (form.instance.pk,)),
+            robust=True
+        )
 
     def get_queryset(self, request: HttpRequest) -> QuerySet:
-        return super().get_queryset(request).prefetch_related(
-            'tags', 'ingredients'
-        ).annotate(Count('favorite')).order_by('-created_at')
+        return super().get_queryset(request).annotate(
+            favorites_count=SubqueryCount(
+                Favorite.objects.filter(recipe=OuterRef('pk')).values('pk')
+            )
+        ).order_by(*RECIPE_ORDERING)
 
 
 @admin.register(Favorite)
@@ -78,3 +133,67 @@ class ShoppingCartRecipeAdmin(admin.ModelAdmin):
 class RecipeShortLinkAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'slug')
     list_display_links = ('recipe',)
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'status', 'duration_ms',
+                    'memory_peak', 'trigger', 'user', 'downloads')
+    list_filter = ('trigger', 'method', 'status')
+    search_fields = ('path', 'route')
+    list_select_related = ('user',)
+    exclude = ('stacks', 'allocations')
+    readonly_fields = ('downloads',)
+
+    @admin.display(description='файлы')
+    def downloads(self, obj: RequestProfile) -> str:
+        return format_html(
+            '<a href="{}">стеки</a> / <a href="{}">память</a>',
+            reverse('admin:foodgram_requestprofile_download',
+                    args=(obj.pk, 'stacks')),
+            reverse('admin:foodgram_requestprofile_download',
+                    args=(obj.pk, 'allocations'))
+        )
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/<str:field>/',
+                 self.admin_site.admin_view(self.download),
+                 name='foodgram_requestprofile_download'),
+        ] + super().get_urls()
+
+    def download(self, request: HttpRequest, pk: int,
+                 field: str) -> FileResponse:
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        if (field not in ('stacks', 'allocations')
+                or not self.has_view_permission(request, profile)):
+            raise PermissionDenied
+        file = getattr(profile, field)
+        return FileResponse(file.open('rb'), as_attachment=True,
+                            filename=file.name)
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+    def has_change_permission(self, request: HttpRequest,
+                              obj=None) -> bool:
+        return False
+
+
+@admin.register(Deletion)
+class DeletionAdmin(admin.ModelAdmin):
+    list_display = ('requested_at', 'kind', 'object_id', 'progress',
+                    'purged_rows', 'finished_at')
+    list_filter = ('kind',)
+    readonly_fields = ('progress',)
+
+    @admin.display(description='этапов пройдено')
+    def progress(self, obj: Deletion) -> str:
+        return f'{obj.stage} из {len(get_stages(obj))}'
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+    def has_change_permission(self, request: HttpRequest,
+                              obj=None) -> bool:
+        return False
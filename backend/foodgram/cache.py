@@ -0,0 +1,35 @@
+from typing import Optional
+
+from django.core.cache import cache
+
+from core.const import (REFERENCE_CACHE_TIMEOUT, SHORT_LINK_CACHE_PREFIX,
+                        SHORT_LINK_WARM_LIMIT)
+from foodgram.models import RecipeShortLink
+
+
+def get_short_link_key(slug: str) -> str:
+    return f'{SHORT_LINK_CACHE_PREFIX}:{slug}'
+
+
+async def aget_short_link_recipe_id(slug: str) -> Optional[int]:
+    """Recipe of the short link, cached as links never change."""
+    key = get_short_link_key(slug)
+    recipe_id = await cache.aget(key)
+    if recipe_id is None:
+        recipe_id = await RecipeShortLink.objects.filter(
+            slug=slug
+        ).values_list('recipe_id', flat=True).afirst()
+        if recipe_id is not None:
+            await cache.aset(key, recipe_id, REFERENCE_CACHE_TIMEOUT)
+    return recipe_id
+
+
+def warm_short_links(limit: int = SHORT_LINK_WARM_LIMIT) -> int:
+    """Cache the newest short links, returns how many were cached."""
+    links = RecipeShortLink.objects.order_by('-pk').values_list(
+        'slug', 'recipe_id'
+    )[:limit]
+    cache.set_many({get_short_link_key(slug): recipe_id
+                    for slug, recipe_id in links},
+                   REFERENCE_CACHE_TIMEOUT)
+    return len(links)
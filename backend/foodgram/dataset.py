@@ -0,0 +1,210 @@
+"""Streaming NDJSON dump and restore of the whole dataset.
+
+Lines have the layout of Django's `jsonl` serializer,
+`{"model": ..., "pk": ..., "fields": {...}}`, one row per line,
+models follow each other in dependency order. Both directions
+read and write rows in batches, so memory doesn't grow with the data.
+"""
+import gzip
+import sys
+from itertools import groupby, islice
+from typing import IO, Any, Iterable, Iterator, Optional, Type
+
+import orjson
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.db.models import Field, FileField, Model
+
+from core.const import DATASET_BATCH_SIZE
+from foodgram.sync import reset_cursors
+
+DATASET_MODELS = (
+    'users.user',
+    'foodgram.tag',
+    'foodgram.ingredient',
+    'foodgram.recipe',
+    'foodgram.recipe_tags',
+    'foodgram.recipeingredient',
+    'foodgram.favorite',
+    'foodgram.shoppingcart',
+    'users.subscription',
+    'foodgram.recipeshortlink',
+)
+
+STDIO_PATH = '-'
+
+
+class DatasetError(Exception):
+    """The dump can't be restored."""
+
+
+def get_dataset_models() -> list[Type[Model]]:
+    return [apps.get_model(label) for label in DATASET_MODELS]
+
+
+def open_dataset(path: str, mode: str) -> IO[bytes]:
+    """Binary file, gzip-compressed for `.gz`, stdin or stdout for `-`."""
+    if path == STDIO_PATH:
+        return (sys.stdin if 'r' in mode else sys.stdout).buffer
+    if path.endswith('.gz'):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def _get_data_fields(model: Type[Model]) -> list[Field]:
+    return [field for field in model._meta.concrete_fields
+            if not field.primary_key]
+
+
+def dump_dataset(out: IO[bytes],
+                 manifest: Optional[IO[bytes]] = None,
+                 using: str = 'default') -> dict[str, int]:
+    """Write every dataset row to `out`, returns rows per model.
+
+    `manifest` receives a line per referenced media file.
+    """
+    counts = {}
+    for model in get_dataset_models():
+        label = model._meta.label_lower
+        fields = _get_data_fields(model)
+        names = [field.name for field in fields]
+        files = [(index, field) for index, field in enumerate(fields)
+                 if isinstance(field, FileField)]
+        rows = model._base_manager.using(using).order_by('pk').values_list(
+            'pk', *(field.attname for field in fields)
+        ).iterator(chunk_size=DATASET_BATCH_SIZE)
+
+        counts[label] = 0
+        for pk, *values in rows:
+            out.write(orjson.dumps({'model': label, 'pk': pk,
+                                    'fields': dict(zip(names, values))}))
+            out.write(b'\n')
+            counts[label] += 1
+            if manifest is not None:
+                _write_manifest(manifest, label, pk, files, values)
+    return counts
+
+
+def _write_manifest(manifest: IO[bytes], label: str, pk: Any,
+                    files: list[tuple[int, FileField]],
+                    values: list[Any]) -> None:
+    for index, field in files:
+        name = values[index]
+        if not name:
+            continue
+        size = (field.storage.size(name) if field.storage.exists(name)
+                else None)
+        manifest.write(orjson.dumps({'model': label, 'pk': pk,
+                                     'field': field.name, 'name': name,
+                                     'size': size}))
+        manifest.write(b'\n')
+
+
+def _parse(lines: Iterable[bytes]) -> Iterator[dict[str, Any]]:
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield orjson.loads(line)
+        except orjson.JSONDecodeError as exc:
+            raise DatasetError(f'Line {number}: {exc}')
+
+
+def _get_rows(model: Type[Model], fields: list[Field],
+              objs: Iterable[dict[str, Any]]) -> Iterator[list[Any]]:
+    names = [field.name for field in fields]
+    for obj in objs:
+        values = obj['fields']
+        try:
+            yield [obj['pk'], *(values[name] for name in names)]
+        except KeyError as exc:
+            raise DatasetError(f'{model._meta.label_lower} {obj["pk"]}: '
+                               f'field {exc} is missing.')
+
+
+def _copy_rows(connection, model: Type[Model], fields: list[Field],
+               rows: Iterable[list[Any]]) -> int:
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column)
+                        for field in (model._meta.pk, *fields))
+    count = 0
+    with connection.cursor() as cursor:
+        with cursor.copy(f'COPY {quote(model._meta.db_table)} ({columns}) '
+                         'FROM STDIN') as copy:
+            for row in rows:
+                copy.write_row(row)
+                count += 1
+    return count
+
+
+def _insert_rows(connection, model: Type[Model], fields: list[Field],
+                 rows: Iterable[list[Any]]) -> int:
+    quote = connection.ops.quote_name
+    fields = [model._meta.pk, *fields]
+    sql = (f'INSERT INTO {quote(model._meta.db_table)} '
+           f'({", ".join(quote(field.column) for field in fields)}) '
+           f'VALUES ({", ".join(["%s"] * len(fields))})')
+    count = 0
+    with connection.cursor() as cursor:
+        rows = iter(rows)
+        while batch := list(islice(rows, DATASET_BATCH_SIZE)):
+            cursor.executemany(sql, [
+                [field.get_db_prep_save(field.to_python(value), connection)
+                 for field, value in zip(fields, row)]
+                for row in batch
+            ])
+            count += len(batch)
+    return count
+
+
+def restore_dataset(lines: Iterable[bytes], replace: bool = False,
+                    using: str = 'default') -> dict[str, int]:
+    """Load a dump into the dataset tables, returns rows per model.
+
+    PostgreSQL loads rows with `COPY`, other databases with batched
+    inserts. Foreign keys are checked once, at the end. `replace`
+    empties the tables first, with the rows referencing them.
+    Sync cursors of clients are expired.
+    """
+    models = {model._meta.label_lower: model
+              for model in get_dataset_models()}
+    connection = connections[using]
+    load_rows = (_copy_rows if connection.vendor == 'postgresql'
+                 else _insert_rows)
+    counts = dict.fromkeys(models, 0)
+
+    with transaction.atomic(using=using), \
+            connection.constraint_checks_disabled():
+        if replace:
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sql_flush(
+                    no_style(),
+                    [model._meta.db_table for model in models.values()],
+                    allow_cascade=True
+                ):
+                    cursor.execute(sql)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+
+        for label, objs in groupby(_parse(lines),
+                                   key=lambda obj: obj.get('model')):
+            model = models.get(label)
+            if model is None:
+                raise DatasetError(f'Unexpected model {label!r}.')
+            fields = _get_data_fields(model)
+            counts[label] += load_rows(connection, model, fields,
+                                       _get_rows(model, fields, objs))
+
+        connection.check_constraints(
+            table_names=[model._meta.db_table for model in models.values()]
+        )
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), list(models.values())
+            ):
+                cursor.execute(sql)
+        # Restored lists aren't in the sync log.
+        reset_cursors(using)
+    return counts
@@ -0,0 +1,141 @@
+"""Deletion of accounts and recipes in the background.
+
+Deleting only marks the rows with `deleted_at`, the default managers
+hide them at once, and queues a `Deletion`. The `purgedeleted` worker
+deletes the dependent rows stage by stage in batches, each batch in
+a transaction of its own, and the marked row last. Locks are held and
+rows are loaded for one batch at a time, however much there is.
+"""
+from datetime import datetime
+from functools import partial
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import CharField, Q, QuerySet, Value
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.const import (DELETED_USER_EMAIL_DOMAIN, DELETED_USER_PREFIX,
+                        DELETION_BATCH_SIZE)
+from foodgram.facets import invalidate_facets
+from foodgram.models import (Deletion, Favorite, Recipe, RecipeIngredient,
+                             RecipeShortLink, ShoppingCart, SimilarRecipe,
+                             SyncEvent)
+from foodgram.pantry import publish_recipe_changes
+from foodgram.sync import log_events
+from users.models import Subscription, User
+
+Kind = Deletion.Kind
+
+
+def _hide_recipes(recipe_ids: list[int], now: datetime) -> None:
+    Recipe.objects.filter(pk__in=recipe_ids).update(deleted_at=now)
+    log_events(SyncEvent.Kind.RECIPE, recipe_ids, True)
+    transaction.on_commit(invalidate_facets, robust=True)
+    transaction.on_commit(partial(publish_recipe_changes, recipe_ids),
+                          robust=True)
+
+
+def mark_recipes_deleted(queryset: QuerySet) -> int:
+    """Hide the recipes and queue them for purging."""
+    with transaction.atomic():
+        recipe_ids = list(queryset.values_list('pk', flat=True))
+        _hide_recipes(recipe_ids, timezone.now())
+        Deletion.objects.bulk_create(
+            Deletion(kind=Kind.RECIPE, object_id=pk) for pk in recipe_ids
+        )
+    return len(recipe_ids)
+
+
+def mark_users_deleted(queryset: QuerySet) -> int:
+    """Hide the users with their recipes and queue them for purging.
+
+    Usernames and emails are released for new accounts, tokens
+    are revoked and the accounts are deactivated.
+    """
+    with transaction.atomic():
+        user_ids = list(queryset.values_list('pk', flat=True))
+        now = timezone.now()
+        pk = Cast('pk', CharField())
+        User.objects.filter(pk__in=user_ids).update(
+            deleted_at=now,
+            is_active=False,
+            username=Concat(Value(DELETED_USER_PREFIX), pk),
+            email=Concat(Value(DELETED_USER_PREFIX), pk,
+                         Value(DELETED_USER_EMAIL_DOMAIN))
+        )
+        Token.objects.filter(user__in=user_ids).delete()
+        _hide_recipes(list(Recipe.objects.filter(
+            author__in=user_ids
+        ).values_list('pk', flat=True)), now)
+        Deletion.objects.bulk_create(
+            Deletion(kind=Kind.USER, object_id=pk) for pk in user_ids
+        )
+    return len(user_ids)
+
+
+def _get_recipe_stages(recipes: QuerySet) -> tuple[QuerySet, ...]:
+    return (
+        Favorite.objects.filter(recipe__in=recipes),
+        ShoppingCart.objects.filter(recipe__in=recipes),
+        RecipeIngredient.objects.filter(recipe__in=recipes),
+        Recipe.tags.through.objects.filter(recipe__in=recipes),
+        SimilarRecipe.objects.filter(Q(recipe__in=recipes)
+                                     | Q(similar__in=recipes)),
+        RecipeShortLink.objects.filter(recipe__in=recipes),
+        recipes,
+    )
+
+
+def get_stages(deletion: Deletion) -> tuple[QuerySet, ...]:
+    """Rows to purge, in order, the marked row last.
+
+    Only rows of marked objects match, a deletion can't reach
+    anything still in use.
+    """
+    if deletion.kind == Kind.RECIPE:
+        return _get_recipe_stages(Recipe.all_objects.filter(
+            pk=deletion.object_id, deleted_at__isnull=False
+        ))
+    users = User.all_objects.filter(pk=deletion.object_id,
+                                    deleted_at__isnull=False)
+    return (
+        *_get_recipe_stages(Recipe.all_objects.filter(author__in=users)),
+        Favorite.objects.filter(user__in=users),
+        ShoppingCart.objects.filter(user__in=users),
+        Subscription.objects.filter(Q(user__in=users) | Q(author__in=users)),
+        users,
+    )
+
+
+def purge_next(batch_size: int = DELETION_BATCH_SIZE) -> Optional[Deletion]:
+    """Purge a batch of the oldest unfinished deletion.
+
+    Returns the deletion, finished once its stages are empty,
+    or None when there is nothing left to purge. Workers running
+    side by side take different deletions.
+    """
+    with transaction.atomic():
+        deletion = Deletion.objects.select_for_update(
+            skip_locked=True
+        ).filter(finished_at=None).order_by('pk').first()
+        if deletion is None:
+            return None
+
+        stages = get_stages(deletion)
+        while deletion.stage < len(stages):
+            queryset = stages[deletion.stage]
+            pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if pks:
+                # The collector loads and cascades this batch only.
+                deleted, _ = queryset.model._base_manager.filter(
+                    pk__in=pks
+                ).delete()
+                deletion.purged_rows += deleted
+                break
+            deletion.stage += 1
+        else:
+            deletion.finished_at = timezone.now()
+        deletion.save(update_fields=('stage', 'purged_rows', 'finished_at'))
+    return deletion
@@ -0,0 +1,61 @@
+"""Recipe counts per tag and per author for a recipe list selection.
+
+Every facet is counted by one `GROUP BY` over the filtered recipes.
+Counts are cached per filter signature. The keys carry a generation
+that recipe writes bump, selections of the user's favorites or
+shopping cart also carry the user's own generation.
+"""
+import hashlib
+from typing import Any, Optional
+
+import orjson
+from django.db.models import Count, F, QuerySet
+
+from core.const import RECIPE_FACETS_AUTHORS_LIMIT, RECIPE_FACETS_CACHE_PREFIX
+from core.locks import bump_generation, get_generation
+from foodgram.models import Recipe
+
+
+def _get_generation_key(user_id: Optional[int] = None) -> str:
+    if user_id is None:
+        return f'{RECIPE_FACETS_CACHE_PREFIX}:generation:all'
+    return f'{RECIPE_FACETS_CACHE_PREFIX}:generation:user:{user_id}'
+
+
+def get_facets_key(signature: dict[str, Any],
+                   user_id: Optional[int] = None) -> str:
+    """Cache key of the facets of a selection, see `invalidate_facets()`."""
+    generations = [get_generation(_get_generation_key())]
+    if user_id is not None:
+        generations.append(get_generation(_get_generation_key(user_id)))
+    digest = hashlib.sha1(
+        orjson.dumps(signature, option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+    return (f'{RECIPE_FACETS_CACHE_PREFIX}:'
+            f'{":".join(generations)}:{digest}')
+
+
+def invalidate_facets(user_id: Optional[int] = None) -> None:
+    """Expire facets of every selection, or of the user's own ones.
+
+    Call after the change commits, see `foodgram.signals`.
+    """
+    bump_generation(_get_generation_key(user_id))
+
+
+def count_tags(recipes: QuerySet) -> dict[int, int]:
+    return dict(Recipe.tags.through.objects.filter(
+        recipe__in=recipes.order_by().values('pk')
+    ).values('tag').annotate(n=Count('pk')).order_by().values_list(
+        'tag', 'n'
+    ))
+
+
+def count_authors(recipes: QuerySet,
+                  limit: int = RECIPE_FACETS_AUTHORS_LIMIT) -> list[dict]:
+    """Authors with the most recipes first."""
+    return list(recipes.order_by().values(
+        'author', username=F('author__username')
+    ).annotate(count=Count('pk')).order_by('-count', 'author').values(
+        'username', 'count', id=F('author')
+    )[:limit])
@@ -0,0 +1,148 @@
+"""New recipes of followed authors, pushed to connected clients.
+
+Every process keeps the queues of its own connections. On PostgreSQL
+a new recipe sends `NOTIFY` in its transaction, it is delivered on
+commit to one `LISTEN` connection of each process. Other databases
+deliver it after commit within the creating process only.
+"""
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from contextvars import Context
+from functools import partial
+from typing import AsyncIterator, Optional
+
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError, connections, transaction
+from psycopg import AsyncConnection
+from psycopg import Error as PsycopgError
+
+from core.const import (PRIMARY_DB_ALIAS, RECIPE_FEED_BACKFILL_LIMIT,
+                        RECIPE_FEED_CHANNEL, RECIPE_FEED_QUEUE_SIZE,
+                        RECIPE_FEED_RECONNECT_SECONDS)
+from foodgram.models import Recipe
+from users.models import Subscription
+
+# `(recipe id, author id)`, `None` ends a stream that fell behind.
+Event = Optional[tuple[int, int]]
+
+
+def _uses_notify(using: str = PRIMARY_DB_ALIAS) -> bool:
+    return connections[using].vendor == 'postgresql'
+
+
+@sync_to_async
+def _get_followers(author_id: int, user_ids: list[int]) -> set[int]:
+    try:
+        return set(Subscription.objects.filter(
+            author_id=author_id, user_id__in=user_ids
+        ).values_list('user_id', flat=True))
+    finally:
+        # Runs outside of requests, nothing returns the connection.
+        connections.close_all()
+
+
+def get_missed_recipes(user_id: int,
+                       last_id: int) -> list[tuple[int, int]]:
+    """A page of recipes of followed authors created after `last_id`."""
+    return list(Recipe.objects.filter(
+        author__in=Subscription.objects.filter(
+            user_id=user_id
+        ).values('author'),
+        id__gt=last_id
+    ).order_by('id').values_list(
+        'id', 'author_id'
+    )[:RECIPE_FEED_BACKFILL_LIMIT])
+
+
+class RecipeFeed:
+    """Fan-out of new recipes to the connections of this process."""
+
+    def __init__(self) -> None:
+        self._queues: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    @asynccontextmanager
+    async def connect(self, user_id: int) -> AsyncIterator[asyncio.Queue]:
+        """Queue of events for the user while the block runs."""
+        self._start()
+        queue = asyncio.Queue(maxsize=RECIPE_FEED_QUEUE_SIZE)
+        self._queues[user_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self._queues[user_id].discard(queue)
+            if not self._queues[user_id]:
+                del self._queues[user_id]
+
+    def publish(self, recipe_id: int, author_id: int) -> None:
+        """Deliver from any thread of this process."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._spawn,
+                                      self._dispatch(recipe_id, author_id))
+
+    def _start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        if _uses_notify() and (self._listener is None
+                               or self._listener.done()):
+            self._listener = self._spawn(self._listen())
+
+    def _spawn(self, coroutine) -> asyncio.Task:
+        # A fresh context, the task must not outlive the executor
+        # of the request that happened to start it.
+        return Context().run(self._loop.create_task, coroutine)
+
+    async def _dispatch(self, recipe_id: int, author_id: int) -> None:
+        if not self._queues:
+            return
+        try:
+            followers = await _get_followers(author_id, list(self._queues))
+        except DatabaseError:
+            return
+        for user_id in followers:
+            for queue in self._queues.get(user_id, ()):
+                self._put(queue, (recipe_id, author_id))
+
+    def _put(self, queue: asyncio.Queue, event: Event) -> None:
+        if not queue.full():
+            queue.put_nowait(event)
+            return
+        # The client doesn't read, it catches up after reconnecting.
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    async def _listen(self) -> None:
+        params = connections[PRIMARY_DB_ALIAS].get_connection_params()
+        params.pop('cursor_factory', None)
+        params.pop('context', None)
+        while True:
+            try:
+                async with await AsyncConnection.connect(
+                    **params, autocommit=True
+                ) as connection:
+                    await connection.execute(f'LISTEN {RECIPE_FEED_CHANNEL}')
+                    async for notify in connection.notifies():
+                        recipe_id, author_id = map(
+                            int, notify.payload.split(':')
+                        )
+                        await self._dispatch(recipe_id, author_id)
+            except PsycopgError:
+                await asyncio.sleep(RECIPE_FEED_RECONNECT_SECONDS)
+
+
+feed = RecipeFeed()
+
+
+def publish_new_recipe(recipe_id: int, author_id: int,
+                       using: str = PRIMARY_DB_ALIAS) -> None:
+    """Announce a created recipe once its transaction commits."""
+    if _uses_notify(using):
+        with connections[using].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)',
+                           [RECIPE_FEED_CHANNEL, f'{recipe_id}:{author_id}'])
+    else:
+        transaction.on_commit(partial(feed.publish, recipe_id, author_id),
+                              using=using, robust=True)
@@ -0,0 +1,118 @@
+import statistics
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.const import SIMILAR_RECIPES_CHUNK_SIZE, SIMILAR_RECIPES_TOP_K
+from foodgram.models import Recipe
+from foodgram.similarity import (get_frequent, iter_neighbours,
+                                 refresh_similar_recipes)
+
+PERCENTILES = (50, 95, 99)
+
+
+class Rollback(Exception):
+    """Discards the refreshed neighbours."""
+
+
+class Command(BaseCommand):
+    help = ('Measure the similar recipes computation on a synthetic '
+            'dataset with Zipf-distributed ingredient popularity, '
+            'and the refresh of edited recipes on the database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', help='Recipes in the dataset',
+                            type=int, default=100000)
+        parser.add_argument('--ingredients', help='Known ingredients',
+                            type=int, default=2200)
+        parser.add_argument('--per-recipe', help='Ingredients per recipe',
+                            type=int, default=8)
+        parser.add_argument('--top', help='Similar recipes per recipe',
+                            type=int, default=SIMILAR_RECIPES_TOP_K)
+        parser.add_argument('--chunk-size', help='Recipes per matrix product',
+                            type=int, default=SIMILAR_RECIPES_CHUNK_SIZE)
+        parser.add_argument('--sample', help='Recipes checked against '
+                            'exact neighbours', type=int, default=200)
+        parser.add_argument('--refreshes', help='Random recipes of the '
+                            'database refreshed one by one, rolled back',
+                            type=int, default=0)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **kwargs):
+        if min(kwargs['recipes'], kwargs['ingredients'],
+               kwargs['per_recipe'], kwargs['top'],
+               kwargs['chunk_size']) < 1:
+            raise CommandError('Expected positive sizes.')
+        if kwargs['refreshes'] == 1 or kwargs['refreshes'] < 0:
+            raise CommandError('Expected no refreshes or at least 2.')
+
+        rng = np.random.default_rng(kwargs['seed'])
+        popularity = 1 / np.arange(1, kwargs['ingredients'] + 1)
+        recipe_ids = np.repeat(np.arange(kwargs['recipes']),
+                               kwargs['per_recipe'])
+        ingredient_ids = rng.choice(kwargs['ingredients'],
+                                    size=len(recipe_ids),
+                                    p=popularity / popularity.sum())
+
+        start = time.perf_counter()
+        scores = {}
+        for sources, _, chunk_scores in iter_neighbours(
+            recipe_ids, ingredient_ids, kwargs['top'],
+            chunk_size=kwargs['chunk_size']
+        ):
+            for source, score in zip(sources.tolist(), chunk_scores.tolist()):
+                scores[source] = scores.get(source, 0) + score
+        elapsed = time.perf_counter() - start
+
+        sample = rng.choice(kwargs['recipes'],
+                            size=min(kwargs['sample'], kwargs['recipes']),
+                            replace=False)
+        exact = {}
+        for sources, _, chunk_scores in iter_neighbours(
+            recipe_ids, ingredient_ids, kwargs['top'], sample, frequent=()
+        ):
+            for source, score in zip(sources.tolist(), chunk_scores.tolist()):
+                exact[source] = exact.get(source, 0) + score
+        # Share of the exact top-K score mass the pruned search finds.
+        quality = (sum(scores.get(source, 0) for source in exact)
+                   / (sum(exact.values()) or 1))
+
+        self.stdout.write(
+            f'{kwargs["recipes"]} recipes, {len(recipe_ids)} ingredients\n'
+            f'  {elapsed:.1f} s, {kwargs["recipes"] / elapsed:.0f} recipes/s\n'
+            f'  {quality:.1%} of the exact top-{kwargs["top"]} score '
+            f'on {len(sample)} recipes'
+        )
+        if kwargs['refreshes']:
+            self._measure_refreshes(rng, kwargs['refreshes'])
+
+    def _measure_refreshes(self, rng: np.random.Generator,
+                           n_refreshes: int) -> None:
+        recipe_ids = np.fromiter(Recipe.objects.values_list('pk', flat=True),
+                                 dtype=np.int64)
+        if len(recipe_ids) < 2:
+            raise CommandError('Expected recipes in the database.')
+        # The worker keeps the frequent ingredients between refreshes.
+        get_frequent()
+
+        timings = []
+        try:
+            with transaction.atomic():
+                for recipe_id in rng.choice(
+                    recipe_ids, size=min(n_refreshes, len(recipe_ids)),
+                    replace=False
+                ).tolist():
+                    started = time.perf_counter()
+                    refresh_similar_recipes((recipe_id,))
+                    timings.append((time.perf_counter() - started) * 1000)
+                raise Rollback
+        except Rollback:
+            pass
+        quantiles = statistics.quantiles(timings, n=100)
+        self.stdout.write(
+            f'{len(timings)} refreshes of {len(recipe_ids)} recipes\n  '
+            + ', '.join(f'p{p} {quantiles[p - 1]:.1f} ms'
+                        for p in PERCENTILES)
+        )
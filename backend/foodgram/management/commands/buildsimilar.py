@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.const import SIMILAR_RECIPES_TOP_K
+from foodgram.similarity import rebuild_similar_recipes
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the similar recipes of every recipe '
+            'from the ingredient overlap')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', help='Similar recipes per recipe',
+                            type=int, default=SIMILAR_RECIPES_TOP_K)
+
+    def handle(self, *args, **kwargs):
+        if kwargs['top'] < 1:
+            raise CommandError('Expected positive top.')
+
+        start = time.perf_counter()
+        n_created = rebuild_similar_recipes(kwargs['top'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Store {n_created} similar recipes '
+            f'in {time.perf_counter() - start:.1f} s.'
+        ))
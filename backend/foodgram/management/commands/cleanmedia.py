@@ -0,0 +1,91 @@
+import os
+import time
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+
+from core.const import MEDIA_GC_MIN_AGE_SECONDS
+
+CHUNK_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = ('Delete media files that no model references anymore, '
+            'e.g. replaced recipe images and avatars')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', help='Keep files younger than this, '
+                            'seconds, as uploads may not be committed yet',
+                            type=int, default=MEDIA_GC_MIN_AGE_SECONDS)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='List unreferenced files without deleting')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['min_age'] < 0:
+            raise CommandError('Expected non-negative min age.')
+
+        fields = self._get_file_fields()
+        directories = {field.upload_to for field in fields}
+        if not all(isinstance(directory, str) and directory
+                   for directory in directories):
+            raise CommandError('Only static upload_to directories '
+                               'can be cleaned.')
+
+        referenced = self._get_referenced_names(fields)
+        deadline = time.time() - kwargs['min_age']
+        n_files = n_bytes = 0
+
+        for name, stat in self._walk(sorted(directories)):
+            if name in referenced or stat.st_mtime > deadline:
+                continue
+            n_files += 1
+            n_bytes += stat.st_size
+            if kwargs['dry_run']:
+                self.stdout.write(name)
+            else:
+                default_storage.delete(name)
+
+        if not kwargs['dry_run']:
+            self._remove_empty_directories(directories)
+        action = 'Found' if kwargs['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {n_files} unreferenced files, {n_bytes} bytes.'
+        ))
+
+    def _get_file_fields(self) -> list[models.FileField]:
+        return [
+            field
+            for model in apps.get_models()
+            for field in model._meta.concrete_fields
+            if isinstance(field, models.FileField)
+            and field.storage is default_storage
+        ]
+
+    def _get_referenced_names(self, fields: list[models.FileField]) -> set:
+        referenced = set()
+        for field in fields:
+            referenced.update(
+                field.model._default_manager
+                .exclude(**{field.attname: ''})
+                .exclude(**{f'{field.attname}__isnull': True})
+                .values_list(field.attname, flat=True)
+                .iterator(chunk_size=CHUNK_SIZE)
+            )
+        return referenced
+
+    def _walk(self, directories: list[str]):
+        for directory in directories:
+            for root, _, filenames in os.walk(default_storage.path(directory)):
+                for filename in filenames:
+                    path = os.path.join(root, filename)
+                    name = os.path.relpath(path, default_storage.location)
+                    yield name.replace('\\', '/'), os.stat(path)
+
+    def _remove_empty_directories(self, directories: set[str]) -> None:
+        for directory in directories:
+            top = default_storage.path(directory)
+            for root, _, _ in os.walk(top, topdown=False):
+                if root != top and not os.listdir(root):
+                    os.rmdir(root)
@@ -0,0 +1,43 @@
+import resource
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from foodgram.dataset import STDIO_PATH, dump_dataset, open_dataset
+
+
+class Command(BaseCommand):
+    help = ('Stream users, recipes, reference data and user lists '
+            'as NDJSON, in constant memory')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=STDIO_PATH,
+                            help='File to write, `.gz` is compressed, '
+                            'stdout by default')
+        parser.add_argument('--media-manifest',
+                            help='Also list referenced media files '
+                            'with their sizes into this file')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Database to dump')
+
+    def handle(self, *args, **kwargs):
+        started = time.perf_counter()
+        with open_dataset(kwargs['output'], 'wb') as out:
+            if kwargs['media_manifest']:
+                with open_dataset(kwargs['media_manifest'], 'wb') as manifest:
+                    counts = dump_dataset(out, manifest, kwargs['database'])
+            else:
+                counts = dump_dataset(out, using=kwargs['database'])
+        report_counts(self.stderr, counts, time.perf_counter() - started)
+
+
+def report_counts(stream, counts: dict[str, int], seconds: float) -> None:
+    """Rows per model, speed and peak memory of the process."""
+    for label, count in counts.items():
+        stream.write(f'{label}: {count}')
+    total = sum(counts.values())
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    stream.write(f'{total} rows in {seconds:.1f} s, '
+                 f'{total / max(seconds, 1e-9):.0f} rows/s, '
+                 f'peak memory {peak_mb:.0f} MB')
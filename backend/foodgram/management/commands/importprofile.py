@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORT_SCRIPT = ('import django; django.setup(); '
+                 'import project_foodgram.asgi, project_foodgram.urls')
+
+
+class Command(BaseCommand):
+    help = ('Report the slowest imports of a cold application start, '
+            'measured with `python -X importtime`')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', help='Imports to report',
+                            type=int, default=25)
+        parser.add_argument('--by-self', action='store_true',
+                            help='Sort by own import time, not cumulative')
+
+    def handle(self, *args, **kwargs):
+        env = {**os.environ, 'DJANGO_WARM_UP': 'False',
+               'DJANGO_SETTINGS_MODULE': os.environ.get(
+                   'DJANGO_SETTINGS_MODULE', 'project_foodgram.settings'
+               )}
+        result = subprocess.run(
+            (sys.executable, '-X', 'importtime', '-c', IMPORT_SCRIPT),
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        if result.returncode:
+            raise CommandError(f'Application import failed:\n{result.stderr}')
+
+        imports = self._parse(result.stderr)
+        total_us = sum(self_us for self_us, _, _ in imports)
+        column = 0 if kwargs['by_self'] else 1
+        imports.sort(key=lambda item: item[column], reverse=True)
+
+        self.stdout.write(f'{len(imports)} modules imported '
+                          f'in {total_us / 1000:.0f} ms\n'
+                          f'{"self ms":>9} {"cumul. ms":>10}  module')
+        for self_us, cumulative_us, module in imports[:kwargs['top']]:
+            self.stdout.write(f'{self_us / 1000:9.1f} '
+                              f'{cumulative_us / 1000:10.1f}  {module}')
+
+    def _parse(self, stderr: str) -> list[tuple[int, int, str]]:
+        imports = []
+        for line in stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            self_us, cumulative_us, module = line[12:].split('|')
+            if not self_us.strip().isdigit():
+                continue
+            imports.append((int(self_us), int(cumulative_us),
+                            module.strip()))
+        return imports
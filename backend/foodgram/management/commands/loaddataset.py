@@ -0,0 +1,40 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+
+from foodgram.dataset import (STDIO_PATH, DatasetError, open_dataset,
+                              restore_dataset)
+from foodgram.management.commands.dumpdataset import report_counts
+
+
+class Command(BaseCommand):
+    help = ('Restore a `dumpdataset` dump with COPY or batched inserts '
+            'in one transaction, checking foreign keys at the end')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', nargs='?', default=STDIO_PATH,
+                            help='File to read, `.gz` is decompressed, '
+                            'stdin by default')
+        parser.add_argument('--replace', action='store_true',
+                            help='Empty the tables first, together with '
+                            'rows referencing them, e.g. tokens')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Database to restore into')
+
+    def handle(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            with open_dataset(kwargs['input'], 'rb') as lines:
+                counts = restore_dataset(lines, kwargs['replace'],
+                                         kwargs['database'])
+        except (DatasetError, DatabaseError, OSError) as exc:
+            raise CommandError(f'Dataset is not restored: {exc}')
+
+        # Cached reference data, short links and indexes are stale now.
+        cache.clear()
+        report_counts(self.stderr, counts, time.perf_counter() - started)
+        self.stdout.write(self.style.SUCCESS(
+            'Restored, run `buildsimilar` to recompute similar recipes.'
+        ))
@@ -2,8 +2,10 @@ import json
 from pathlib import Path
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.management.base import BaseCommand, CommandError
 
+from core.const import INGREDIENTS_CACHE_KEY
 from foodgram.models import Ingredient
 
 
@@ -34,6 +36,7 @@ class Command(BaseCommand):
             (Ingredient(**item) for item in data),
             ignore_conflicts=True
         )
+        cache.delete(INGREDIENTS_CACHE_KEY)
 
         self.stdout.write(
             self.style.SUCCESS(f'Insert {len(inserted)} ingredients.')
@@ -0,0 +1,64 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Measure throughput of a running server under concurrent load, '
+            'e.g. to compare WSGI and ASGI deployments')
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='Absolute URLs to load')
+        parser.add_argument('--requests', help='Requests per URL',
+                            type=int, default=1000)
+        parser.add_argument('--concurrency', help='Parallel clients',
+                            type=int, default=32)
+        parser.add_argument('--token', help='Auth token of the client',
+                            type=str)
+
+    def handle(self, *args, **kwargs):
+        if kwargs['requests'] < 1 or kwargs['concurrency'] < 1:
+            raise CommandError('Expected positive requests and concurrency.')
+
+        self.headers = ({'Authorization': f'Token {kwargs["token"]}'}
+                        if kwargs['token'] else {})
+        self.local = threading.local()
+
+        for url in kwargs['urls']:
+            self._load(url, kwargs['requests'], kwargs['concurrency'])
+
+    def _get(self, url: str) -> tuple[float, bool]:
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+
+        start = time.perf_counter()
+        try:
+            ok = self.local.session.get(url, headers=self.headers,
+                                        allow_redirects=False).ok
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    def _load(self, url: str, n_requests: int, concurrency: int) -> None:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(self._get, (url,) * n_requests))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency for latency, _ in results)
+        percentiles = quantiles(latencies, n=100) if n_requests > 1 else (
+            latencies * 99
+        )
+        n_errors = sum(not ok for _, ok in results)
+
+        self.stdout.write(
+            f'{url}\n'
+            f'  {n_requests / elapsed:.1f} req/s, {n_errors} errors\n'
+            f'  latency p50 {percentiles[49] * 1000:.1f} ms, '
+            f'p95 {percentiles[94] * 1000:.1f} ms, '
+            f'p99 {percentiles[98] * 1000:.1f} ms'
+        )
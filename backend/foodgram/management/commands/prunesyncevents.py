@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.const import SYNC_EVENTS_RETENTION_DAYS
+from foodgram.sync import prune_events
+
+
+class Command(BaseCommand):
+    help = ('Delete old sync events, clients with older cursors '
+            'get 410 and sync the full lists')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', help='Keep events of these last days',
+                            type=int, default=SYNC_EVENTS_RETENTION_DAYS)
+
+    def handle(self, *args, **kwargs):
+        if kwargs['days'] < 0:
+            raise CommandError('Expected non-negative days.')
+        deleted = prune_events(kwargs['days'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} sync events.'
+        ))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from core.const import DELETION_BATCH_SIZE, DELETION_POLL_SECONDS
+from foodgram.deletion import purge_next
+
+
+class Command(BaseCommand):
+    help = ('Purge accounts and recipes marked as deleted, '
+            'with their dependent rows, in batches')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', help='Rows deleted per batch',
+                            type=int, default=DELETION_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep waiting for new deletions')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['batch_size'] < 1:
+            raise CommandError('Expected a positive batch size.')
+
+        while True:
+            deletion = purge_next(kwargs['batch_size'])
+            if deletion is not None:
+                if deletion.finished_at is not None:
+                    self.stdout.write(f'{deletion}: purged '
+                                      f'{deletion.purged_rows} rows.')
+                continue
+            if not kwargs['loop']:
+                break
+            close_old_connections()
+            time.sleep(DELETION_POLL_SECONDS)
+
+        self.stdout.write(self.style.SUCCESS('Nothing left to purge.'))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from core.const import SIMILAR_REFRESH_BATCH_SIZE, SIMILAR_REFRESH_POLL_SECONDS
+from foodgram.similarity import refresh_next
+
+
+class Command(BaseCommand):
+    help = ('Refresh the similar recipes of created and edited recipes '
+            'queued by the API and the admin, in batches')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', help='Recipes per refresh',
+                            type=int, default=SIMILAR_REFRESH_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep waiting for new refreshes')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['batch_size'] < 1:
+            raise CommandError('Expected a positive batch size.')
+
+        while True:
+            n_refreshed = refresh_next(kwargs['batch_size'])
+            if n_refreshed:
+                self.stdout.write(f'Refreshed {n_refreshed} recipes.')
+                continue
+            if not kwargs['loop']:
+                break
+            close_old_connections()
+            time.sleep(SIMILAR_REFRESH_POLL_SECONDS)
+
+        self.stdout.write(self.style.SUCCESS('Nothing left to refresh.'))
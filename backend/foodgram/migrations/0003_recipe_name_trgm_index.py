@@ -0,0 +1,22 @@
+from django.db import migrations
+
+import core.db.operations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0002_recipe_filter_indexes'),
+    ]
+
+    operations = [
+        core.db.operations.PostgresRunSQL(
+            sql='CREATE EXTENSION IF NOT EXISTS pg_trgm;',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        core.db.operations.PostgresRunSQL(
+            sql='CREATE INDEX recipe_name_trgm_idx ON foodgram_recipe '
+                'USING gin ((UPPER(name::text)) gin_trgm_ops);',
+            reverse_sql='DROP INDEX recipe_name_trgm_idx;',
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.16 on 2026-10-19 11:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('foodgram', '0004_similarrecipe'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'избранное'), (2, 'список покупок'), (3, 'подписка'), (4, 'рецепт')], verbose_name='объект')),
+                ('object_id', models.BigIntegerField(verbose_name='id объекта')),
+                ('is_deleted', models.BooleanField(verbose_name='удалён')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='создано')),
+                ('user', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='sync_events', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'событие синхронизации',
+                'verbose_name_plural': 'События синхронизации',
+                'indexes': [models.Index(fields=['user', 'id'], name='sync_event_user_idx'), models.Index(condition=models.Q(('user__isnull', True)), fields=['object_id', 'id'], name='sync_event_recipe_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.16 on 2026-10-19 11:28
+
+import core.storage
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('foodgram', '0005_syncevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='создан')),
+                ('method', models.CharField(max_length=8, verbose_name='метод')),
+                ('path', models.CharField(max_length=255, verbose_name='путь')),
+                ('route', models.CharField(blank=True, max_length=255, verbose_name='маршрут')),
+                ('status', models.PositiveSmallIntegerField(verbose_name='статус')),
+                ('duration_ms', models.PositiveIntegerField(verbose_name='время, мс')),
+                ('samples', models.PositiveIntegerField(verbose_name='выборок стека')),
+                ('memory_peak', models.PositiveBigIntegerField(verbose_name='пик памяти, байт')),
+                ('trigger', models.CharField(choices=[('sample', 'выборка'), ('header', 'заголовок')], max_length=8, verbose_name='причина')),
+                ('stacks', models.FileField(storage=core.storage.get_profiles_storage, upload_to='', verbose_name='стеки')),
+                ('allocations', models.FileField(storage=core.storage.get_profiles_storage, upload_to='', verbose_name='выделения памяти')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
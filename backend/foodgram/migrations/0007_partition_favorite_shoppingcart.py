@@ -0,0 +1,23 @@
+from django.db import migrations
+
+import core.db.operations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0006_requestprofile'),
+    ]
+
+    operations = [
+        core.db.operations.PostgresHashPartition(
+            model_name='favorite',
+            field_name='user',
+            partitions=16,
+        ),
+        core.db.operations.PostgresHashPartition(
+            model_name='shoppingcart',
+            field_name='user',
+            partitions=16,
+        ),
+    ]
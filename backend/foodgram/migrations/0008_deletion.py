@@ -0,0 +1,36 @@
+# Generated by Django 4.2.16 on 2026-10-19 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0007_partition_favorite_shoppingcart'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='удалён'),
+        ),
+        migrations.CreateModel(
+            name='Deletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'пользователь'), (2, 'рецепт')], verbose_name='объект')),
+                ('object_id', models.BigIntegerField(verbose_name='id объекта')),
+                ('stage', models.PositiveSmallIntegerField(default=0, verbose_name='этап')),
+                ('purged_rows', models.PositiveBigIntegerField(default=0, verbose_name='удалено строк')),
+                ('requested_at', models.DateTimeField(auto_now_add=True, verbose_name='запрошено')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='завершено')),
+            ],
+            options={
+                'verbose_name': 'удаление',
+                'verbose_name_plural': 'Удаления',
+                'ordering': ('-requested_at',),
+                'indexes': [models.Index(condition=models.Q(('finished_at__isnull', True)), fields=['id'], name='deletion_pending_idx')],
+            },
+        ),
+    ]
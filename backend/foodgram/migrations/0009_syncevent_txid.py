@@ -0,0 +1,35 @@
+# Generated by Django 4.2.16 on 2026-10-19 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0008_deletion'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='syncevent',
+            name='sync_event_user_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='syncevent',
+            name='sync_event_recipe_idx',
+        ),
+        migrations.AddField(
+            model_name='syncevent',
+            name='txid',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='транзакция'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='syncevent',
+            index=models.Index(fields=['user', 'txid', 'id'], name='sync_event_user_txid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='syncevent',
+            index=models.Index(condition=models.Q(('user__isnull', True)), fields=['object_id', 'txid', 'id'], name='sync_event_recipe_txid_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.16 on 2026-10-19 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0009_syncevent_txid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarRefresh',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe_id', models.BigIntegerField(verbose_name='id рецепта')),
+                ('requested_at', models.DateTimeField(auto_now_add=True, verbose_name='запрошено')),
+            ],
+            options={
+                'verbose_name': 'пересчёт похожих рецептов',
+                'verbose_name_plural': 'Пересчёты похожих рецептов',
+            },
+        ),
+    ]
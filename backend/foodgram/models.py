@@ -4,6 +4,7 @@ from django.db import models
 from django.db.models import Exists, OuterRef
 
 from core import const, factories
+from core.storage import get_profiles_storage
 
 User = get_user_model()
 
@@ -105,7 +106,14 @@ class RecipeQuerySet(models.QuerySet):
                 recipe=OuterRef('pk'),
                 user_id=user_id
             ))
-        ).order_by(const.ORDER_BY_CREATED_AT_DESC)
+        ).order_by(*const.RECIPE_ORDERING)
+
+
+class RecipeManager(models.Manager.from_queryset(RecipeQuerySet)):
+    """Recipes not marked as deleted."""
+
+    def get_queryset(self) -> models.QuerySet:
+        return super().get_queryset().filter(deleted_at=None)
 
 
 class Recipe(models.Model):
@@ -138,12 +146,22 @@ class Recipe(models.Model):
 
     created_at = models.DateTimeField('создан', auto_now_add=True)
 
-    objects = RecipeQuerySet.as_manager()
+    deleted_at = models.DateTimeField('удалён', null=True, blank=True,
+                                      editable=False)
+
+    objects = RecipeManager()
+
+    # Deleted recipes too, until `purgedeleted` removes them.
+    all_objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = const.VERBOSE_RECIPE_FIELD
         verbose_name_plural = 'Рецепты'
-        ordering = (const.ORDER_BY_CREATED_AT_DESC,)
+        ordering = const.RECIPE_ORDERING
+        indexes = (
+            models.Index(fields=('created_at', 'id'),
+                         name='recipe_created_at_id_idx'),
+        )
 
     def __str__(self) -> str:
         return factories.make_model_str(self.name)
@@ -196,3 +214,195 @@ class RecipeShortLink(models.Model):
         return factories.make_model_str(
             f'Рецепт-ссылка <id: {self.pk}>'
         )
+
+
+class SimilarRecipe(models.Model):
+    recipe = models.ForeignKey(Recipe,
+                               on_delete=models.CASCADE,
+                               related_name='similar_recipes',
+                               verbose_name=const.VERBOSE_RECIPE_FIELD)
+
+    similar = models.ForeignKey(Recipe,
+                                on_delete=models.CASCADE,
+                                related_name='similar_to',
+                                verbose_name='похожий рецепт')
+
+    score = models.FloatField('сходство ингредиентов')
+
+    class Meta:
+        verbose_name = 'похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = (
+            models.UniqueConstraint(fields=('recipe', 'similar'),
+                                    name='unique_similar_recipe'),
+        )
+        indexes = (
+            models.Index(fields=('recipe', '-score'),
+                         name='similar_recipe_score_idx'),
+        )
+
+    def __str__(self) -> str:
+        return factories.make_model_str(
+            f'Похожий рецепт <id: {self.pk}>'
+        )
+
+
+class SimilarRefresh(models.Model):
+    """Recipe whose similar recipes are due, see `refreshsimilar`.
+
+    A recipe edited again while queued is queued once more,
+    the worker refreshes it once per batch.
+    """
+
+    recipe_id = models.BigIntegerField('id рецепта')
+
+    requested_at = models.DateTimeField('запрошено', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'пересчёт похожих рецептов'
+        verbose_name_plural = 'Пересчёты похожих рецептов'
+
+    def __str__(self) -> str:
+        return factories.make_model_str(
+            f'Пересчёт похожих рецептов <id: {self.recipe_id}>'
+        )
+
+
+class SyncEvent(models.Model):
+    """Change of a user's lists or of a recipe, read by `/api/sync/`.
+
+    `user` is empty for recipe edits, which concern everyone
+    having the recipe in the favorites or the shopping cart.
+    It has no constraint: events are logged while users are deleted
+    and are left for `prunesyncevents`. Events are read in the order
+    of `txid`, the id of the writing transaction, then of `id`.
+    """
+
+    class Kind(models.IntegerChoices):
+        FAVORITE = 1, 'избранное'
+        SHOPPING_CART = 2, 'список покупок'
+        SUBSCRIPTION = 3, 'подписка'
+        RECIPE = 4, const.VERBOSE_RECIPE_FIELD
+
+    user = models.ForeignKey(User,
+                             on_delete=models.DO_NOTHING,
+                             db_constraint=False,
+                             null=True,
+                             related_name='sync_events',
+                             verbose_name='пользователь')
+
+    kind = models.PositiveSmallIntegerField('объект', choices=Kind.choices)
+
+    object_id = models.BigIntegerField('id объекта')
+
+    is_deleted = models.BooleanField('удалён')
+
+    txid = models.BigIntegerField('транзакция', editable=False)
+
+    created_at = models.DateTimeField('создано', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'событие синхронизации'
+        verbose_name_plural = 'События синхронизации'
+        indexes = (
+            models.Index(fields=('user', 'txid', 'id'),
+                         name='sync_event_user_txid_idx'),
+            models.Index(fields=('object_id', 'txid', 'id'),
+                         condition=models.Q(user__isnull=True),
+                         name='sync_event_recipe_txid_idx'),
+        )
+
+    def __str__(self) -> str:
+        return factories.make_model_str(
+            f'Событие синхронизации <id: {self.pk}>'
+        )
+
+
+class RequestProfile(models.Model):
+    """CPU and memory profile of a sampled or requested API call."""
+
+    class Trigger(models.TextChoices):
+        SAMPLE = 'sample', 'выборка'
+        HEADER = 'header', 'заголовок'
+
+    created_at = models.DateTimeField('создан', auto_now_add=True)
+
+    method = models.CharField('метод', max_length=8)
+
+    path = models.CharField('путь', max_length=const.MAX_PROFILE_PATH_LENGTH)
+
+    route = models.CharField('маршрут',
+                             max_length=const.MAX_PROFILE_PATH_LENGTH,
+                             blank=True)
+
+    status = models.PositiveSmallIntegerField('статус')
+
+    duration_ms = models.PositiveIntegerField('время, мс')
+
+    samples = models.PositiveIntegerField('выборок стека')
+
+    memory_peak = models.PositiveBigIntegerField('пик памяти, байт')
+
+    trigger = models.CharField('причина', max_length=8,
+                               choices=Trigger.choices)
+
+    user = models.ForeignKey(User,
+                             on_delete=models.SET_NULL,
+                             null=True,
+                             blank=True,
+                             related_name='+',
+                             verbose_name='пользователь')
+
+    stacks = models.FileField('стеки', storage=get_profiles_storage)
+
+    allocations = models.FileField('выделения памяти',
+                                   storage=get_profiles_storage)
+
+    class Meta:
+        ordering = ('-created_at',)
+        verbose_name = 'профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+
+    def __str__(self) -> str:
+        return factories.make_model_str(
+            f'{self.method} {self.path} {self.duration_ms} мс'
+        )
+
+
+class Deletion(models.Model):
+    """Account or recipe marked as deleted, purged by `purgedeleted`.
+
+    Dependent rows are deleted in batches, stage by stage,
+    `purged_rows` counts them.
+    """
+
+    class Kind(models.IntegerChoices):
+        USER = 1, 'пользователь'
+        RECIPE = 2, const.VERBOSE_RECIPE_FIELD
+
+    kind = models.PositiveSmallIntegerField('объект', choices=Kind.choices)
+
+    object_id = models.BigIntegerField('id объекта')
+
+    stage = models.PositiveSmallIntegerField('этап', default=0)
+
+    purged_rows = models.PositiveBigIntegerField('удалено строк', default=0)
+
+    requested_at = models.DateTimeField('запрошено', auto_now_add=True)
+
+    finished_at = models.DateTimeField('завершено', null=True, blank=True)
+
+    class Meta:
+        ordering = ('-requested_at',)
+        verbose_name = 'удаление'
+        verbose_name_plural = 'Удаления'
+        indexes = (
+            models.Index(fields=('id',),
+                         condition=models.Q(finished_at__isnull=True),
+                         name='deletion_pending_idx'),
+        )
+
+    def __str__(self) -> str:
+        return factories.make_model_str(
+            f'Удаление <{self.get_kind_display()}: {self.object_id}>'
+        )
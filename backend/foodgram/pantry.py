@@ -0,0 +1,220 @@
+"""Recipes that can be cooked from a set of ingredients.
+
+Every process keeps an inverted index from ingredient to a compressed
+(roaring) bitmap of recipe ids. Recipe writes are published as
+a versioned change log in the shared cache, other processes replay
+it before answering, or rebuild the index when the log is gone.
+"""
+import threading
+from collections import defaultdict
+from secrets import token_hex
+from typing import Iterable, Iterator, Optional
+
+from django.core.cache import cache
+from pyroaring import BitMap
+
+from core.const import (PANTRY_BATCH_SIZE, PANTRY_CHANGES_CACHE_PREFIX,
+                        PANTRY_CHANGES_TIMEOUT, PANTRY_EPOCH_CACHE_KEY,
+                        PANTRY_MAX_REPLAY, PANTRY_VERSION_CACHE_KEY)
+from core.locks import cache_lock
+from foodgram.models import RecipeIngredient
+
+
+class PantryIndex:
+    """Inverted index of recipe ingredients."""
+
+    def __init__(self) -> None:
+        self.postings: dict[int, BitMap] = defaultdict(BitMap)
+        self.by_size: dict[int, BitMap] = defaultdict(BitMap)
+        self.recipes: dict[int, tuple[int, ...]] = {}
+        self.version: Optional[tuple[str, int]] = None
+
+    @classmethod
+    def build(cls, recipes: Iterable[tuple[int, Iterable[int]]]
+              ) -> 'PantryIndex':
+        """Index of `(recipe id, ingredient ids)` pairs, built in bulk."""
+        index = cls()
+        postings, by_size = defaultdict(list), defaultdict(list)
+        for recipe_id, ingredient_ids in recipes:
+            ingredient_ids = tuple(set(ingredient_ids))
+            index.recipes[recipe_id] = ingredient_ids
+            by_size[len(ingredient_ids)].append(recipe_id)
+            for ingredient_id in ingredient_ids:
+                postings[ingredient_id].append(recipe_id)
+        for ingredient_id, recipe_ids in postings.items():
+            index.postings[ingredient_id] = BitMap(recipe_ids)
+        for size, recipe_ids in by_size.items():
+            index.by_size[size] = BitMap(recipe_ids)
+        return index
+
+    def update(self, recipe_id: int, ingredient_ids: Iterable[int]) -> None:
+        """Set ingredients of the recipe, none removes it."""
+        self.remove(recipe_id)
+        ingredient_ids = tuple(set(ingredient_ids))
+        if not ingredient_ids:
+            return
+        self.recipes[recipe_id] = ingredient_ids
+        self.by_size[len(ingredient_ids)].add(recipe_id)
+        for ingredient_id in ingredient_ids:
+            self.postings[ingredient_id].add(recipe_id)
+
+    def remove(self, recipe_id: int) -> None:
+        ingredient_ids = self.recipes.pop(recipe_id, ())
+        if ingredient_ids:
+            self.by_size[len(ingredient_ids)].discard(recipe_id)
+        for ingredient_id in ingredient_ids:
+            self.postings[ingredient_id].discard(recipe_id)
+
+    def match(self, pantry: Iterable[int], max_missing: int = 0) -> list[int]:
+        """Recipes missing at most `max_missing` ingredients of `pantry`.
+
+        The fewest missing go first, then the most pantry ingredients
+        used, then the newest.
+        """
+        # levels[c] holds recipes having at least c + 1 pantry ingredients.
+        levels: list[BitMap] = []
+        for ingredient_id in set(pantry):
+            posting = self.postings.get(ingredient_id)
+            if not posting:
+                continue
+            levels.append(BitMap())
+            for level in range(len(levels) - 1, 0, -1):
+                levels[level] |= levels[level - 1] & posting
+            levels[0] |= posting
+
+        recipe_ids = []
+        for missing in range(max_missing + 1):
+            for level in range(len(levels) - 1, -1, -1):
+                size = level + 1 + missing
+                if size not in self.by_size:
+                    continue
+                exact = levels[level] & self.by_size[size]
+                if level + 1 < len(levels):
+                    exact -= levels[level + 1]
+                recipe_ids.extend(reversed(exact))
+        return recipe_ids
+
+
+_index = PantryIndex()
+_lock = threading.Lock()
+
+
+def _iter_recipe_ingredients(queryset) -> Iterator[tuple[int, list[int]]]:
+    """`(recipe id, ingredient ids)` of the rows, grouped by recipe."""
+    recipe_id, ingredient_ids = None, []
+    for row_recipe_id, ingredient_id in queryset.values_list(
+        'recipe_id', 'ingredient_id'
+    ).order_by('recipe_id').iterator(chunk_size=PANTRY_BATCH_SIZE):
+        if row_recipe_id != recipe_id:
+            if ingredient_ids:
+                yield recipe_id, ingredient_ids
+            recipe_id, ingredient_ids = row_recipe_id, []
+        ingredient_ids.append(ingredient_id)
+    if ingredient_ids:
+        yield recipe_id, ingredient_ids
+
+
+def _read_version() -> Optional[tuple[str, int]]:
+    epoch = cache.get(PANTRY_EPOCH_CACHE_KEY)
+    number = cache.get(PANTRY_VERSION_CACHE_KEY)
+    if epoch is None or number is None:
+        return None
+    return epoch, number
+
+
+def _get_version() -> tuple[str, int]:
+    """Current `(epoch, number)` of the change log.
+
+    A new epoch starts whenever the counter is evicted from the cache,
+    processes seeing it rebuild instead of replaying.
+    """
+    version = _read_version()
+    if version is None:
+        with cache_lock(PANTRY_VERSION_CACHE_KEY):
+            version = _read_version()
+            if version is None:
+                version = token_hex(8), 0
+                cache.set(PANTRY_VERSION_CACHE_KEY, 0, timeout=None)
+                cache.set(PANTRY_EPOCH_CACHE_KEY, version[0], timeout=None)
+    return version
+
+
+def _get_changes_key(epoch: str, number: int) -> str:
+    return f'{PANTRY_CHANGES_CACHE_PREFIX}:{epoch}:{number}'
+
+
+def _rebuild(version: tuple[str, int]) -> None:
+    global _index
+    index = PantryIndex.build(
+        _iter_recipe_ingredients(RecipeIngredient.objects.filter(
+            recipe__deleted_at=None
+        ))
+    )
+    index.version = version
+    _index = index
+
+
+def _replay(version: tuple[str, int]) -> bool:
+    """Apply logged changes up to `version`, False if it can't be done."""
+    if _index.version is None:
+        return False
+    epoch, number = version
+    local_epoch, local_number = _index.version
+    if (epoch != local_epoch or number < local_number
+            or number - local_number > PANTRY_MAX_REPLAY):
+        return False
+
+    keys = [_get_changes_key(epoch, n)
+            for n in range(local_number + 1, number + 1)]
+    changes = cache.get_many(keys)
+    if len(changes) < len(keys):
+        return False
+
+    recipe_ids = {recipe_id for ids in changes.values() for recipe_id in ids}
+    ingredients = dict(_iter_recipe_ingredients(
+        RecipeIngredient.objects.filter(recipe__in=recipe_ids,
+                                        recipe__deleted_at=None)
+    ))
+    for recipe_id in recipe_ids:
+        _index.update(recipe_id, ingredients.get(recipe_id, ()))
+    _index.version = version
+    return True
+
+
+def _sync() -> None:
+    # Read before the queries, so changes made meanwhile are replayed.
+    version = _get_version()
+    if _index.version != version and not _replay(version):
+        _rebuild(version)
+
+
+def match_pantry(pantry: Iterable[int], max_missing: int = 0) -> list[int]:
+    """Ranked recipes cookable from `pantry`, see `PantryIndex.match()`."""
+    with _lock:
+        _sync()
+        return _index.match(pantry, max_missing)
+
+
+def publish_recipe_changes(recipe_ids: Iterable[int]) -> None:
+    """Log created, edited or deleted recipes for every process.
+
+    Call after the transaction is committed.
+    """
+    # Numbers are taken under the lock, and the changes are stored
+    # before the number, so readers never miss or skip an entry.
+    with cache_lock(PANTRY_VERSION_CACHE_KEY):
+        version = _read_version()
+        if version is None:
+            # Evicted meanwhile, the next reader starts a new epoch.
+            return
+        epoch, number = version
+        cache.set(_get_changes_key(epoch, number + 1), list(recipe_ids),
+                  PANTRY_CHANGES_TIMEOUT)
+        cache.set(PANTRY_VERSION_CACHE_KEY, number + 1, timeout=None)
+
+
+def warm_pantry_index() -> int:
+    """Build the index before workers fork, returns indexed recipes."""
+    with _lock:
+        _sync()
+        return len(_index.recipes)
@@ -0,0 +1,139 @@
+import random
+import threading
+import time
+from secrets import token_hex
+from typing import Optional
+
+from asgiref.sync import (iscoroutinefunction, markcoroutinefunction,
+                          sync_to_async)
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.http import HttpRequest, HttpResponse
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import TokenAuthentication
+from core.const import MAX_PROFILE_PATH_LENGTH, PROFILING_HEADER
+from core.profiling import MemoryTracer, StackSampler
+from foodgram.models import RequestProfile
+
+Trigger = RequestProfile.Trigger
+
+
+class ProfilingMiddleware:
+    """Profile a `PROFILING_RATE` share of requests.
+
+    With `PROFILING_ON_DEMAND` staff may also ask for a profile
+    with the `X-Profile` header. Its token is checked before anything
+    is traced, the header of anybody else is ignored. Both off,
+    the middleware isn't installed and costs nothing.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        if not (settings.PROFILING_RATE or settings.PROFILING_ON_DEMAND):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        trigger = self._get_trigger(
+            self._asks_profile(request) and self._is_staff(request)
+        )
+        if trigger is None:
+            return self.get_response(request)
+
+        sampler, tracer = self._start({threading.get_ident(): 'main'})
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._save(request, response, trigger, sampler, tracer,
+                   time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request: HttpRequest):
+        trigger = self._get_trigger(
+            self._asks_profile(request) and await self._ais_staff(request)
+        )
+        if trigger is None:
+            return await self.get_response(request)
+
+        # Sync code of the request runs in a thread of its own.
+        worker_id = await sync_to_async(threading.get_ident)()
+        sampler, tracer = self._start({threading.get_ident(): 'event loop',
+                                       worker_id: 'worker'})
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        await sync_to_async(self._save)(request, response, trigger,
+                                        sampler, tracer,
+                                        time.perf_counter() - started)
+        return response
+
+    def _asks_profile(self, request: HttpRequest) -> bool:
+        return (settings.PROFILING_ON_DEMAND
+                and PROFILING_HEADER in request.headers)
+
+    def _is_staff(self, request: HttpRequest) -> bool:
+        try:
+            user_auth = TokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return user_auth is not None and user_auth[0].is_staff
+
+    async def _ais_staff(self, request: HttpRequest) -> bool:
+        try:
+            user_auth = await TokenAuthentication().aauthenticate(request)
+        except AuthenticationFailed:
+            return False
+        return user_auth is not None and user_auth[0].is_staff
+
+    def _get_trigger(self, by_staff: bool) -> Optional[Trigger]:
+        if by_staff:
+            return Trigger.HEADER
+        if random.random() < settings.PROFILING_RATE:
+            return Trigger.SAMPLE
+        return None
+
+    def _start(self, threads: dict[int, str]
+               ) -> tuple[StackSampler, MemoryTracer]:
+        tracer = MemoryTracer()
+        tracer.start()
+        sampler = StackSampler(threads)
+        sampler.start()
+        return sampler, tracer
+
+    def _save(self, request: HttpRequest, response: HttpResponse,
+              trigger: Trigger, sampler: StackSampler, tracer: MemoryTracer,
+              duration: float) -> None:
+        sampler.stop()
+        memory_peak, allocations = tracer.stop()
+
+        # Set by the API authentication as well as by sessions.
+        user = getattr(request, 'user', None)
+        if user is not None and not user.is_authenticated:
+            user = None
+
+        match = request.resolver_match
+        profile = RequestProfile(
+            method=request.method,
+            path=request.path[:MAX_PROFILE_PATH_LENGTH],
+            route=(match.route[:MAX_PROFILE_PATH_LENGTH] if match else ''),
+            status=response.status_code,
+            duration_ms=round(duration * 1000),
+            samples=sampler.samples,
+            memory_peak=memory_peak,
+            trigger=trigger,
+            user=user
+        )
+        name = f'{timezone.now():%Y%m%d-%H%M%S}-{token_hex(4)}'
+        profile.stacks.save(f'{name}.folded',
+                            ContentFile(sampler.folded()), save=False)
+        profile.allocations.save(f'{name}.txt',
+                                 ContentFile(allocations), save=False)
+        profile.save()
@@ -0,0 +1,136 @@
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.admin import invalidate_display_cache
+from core.const import INGREDIENTS_CACHE_KEY, TAGS_CACHE_KEY
+from foodgram.cache import get_short_link_key
+from foodgram.facets import invalidate_facets
+from foodgram.feed import publish_new_recipe
+from foodgram.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                             RecipeShortLink, RequestProfile, ShoppingCart,
+                             SyncEvent, Tag)
+from foodgram.pantry import publish_recipe_changes
+from foodgram.sync import log_event
+from users.models import Subscription
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_recipe_columns(sender, instance: Recipe, **kwargs) -> None:
+    invalidate_display_cache(Recipe, (instance.pk,))
+
+
+@receiver(post_save, sender=Recipe)
+def announce_new_recipe(sender, instance: Recipe, created: bool,
+                        using: str, **kwargs) -> None:
+    if created:
+        publish_new_recipe(instance.pk, instance.author_id, using)
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_from_pantry_index(sender, instance: Recipe, **kwargs) -> None:
+    transaction.on_commit(partial(publish_recipe_changes, (instance.pk,)),
+                          robust=True)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def invalidate_recipe_ingredient_columns(sender, instance: RecipeIngredient,
+                                         **kwargs) -> None:
+    invalidate_display_cache(Recipe, (instance.recipe_id,))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tag_columns(sender, instance, reverse: bool,
+                                  **kwargs) -> None:
+    invalidate_display_cache(Recipe, None if reverse else (instance.pk,))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_all_recipe_columns(sender, **kwargs) -> None:
+    invalidate_display_cache(Recipe)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tags(sender, **kwargs) -> None:
+    cache.delete(TAGS_CACHE_KEY)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_all_facets(sender, using: str, **kwargs) -> None:
+    # After commit, or a read in between caches the old counts
+    # under the new generation.
+    transaction.on_commit(invalidate_facets, using=using, robust=True)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def invalidate_user_facets(sender, instance, using: str, **kwargs) -> None:
+    transaction.on_commit(partial(invalidate_facets, instance.user_id),
+                          using=using, robust=True)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredients(sender, **kwargs) -> None:
+    cache.delete(INGREDIENTS_CACHE_KEY)
+
+
+@receiver(post_delete, sender=RecipeShortLink)
+def invalidate_short_link(sender, instance: RecipeShortLink,
+                          **kwargs) -> None:
+    cache.delete(get_short_link_key(instance.slug))
+
+
+@receiver(post_delete, sender=RequestProfile)
+def delete_profile_files(sender, instance: RequestProfile,
+                         **kwargs) -> None:
+    instance.stacks.delete(save=False)
+    instance.allocations.delete(save=False)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def log_user_recipe_event(sender, instance, created: bool = False,
+                          **kwargs) -> None:
+    if kwargs['signal'] is post_save and not created:
+        return
+    kind = (SyncEvent.Kind.FAVORITE if sender is Favorite
+            else SyncEvent.Kind.SHOPPING_CART)
+    log_event(kind, instance.recipe_id, kwargs['signal'] is post_delete,
+              instance.user_id)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def log_subscription_event(sender, instance: Subscription,
+                           created: bool = False, **kwargs) -> None:
+    if kwargs['signal'] is post_save and not created:
+        return
+    log_event(SyncEvent.Kind.SUBSCRIPTION, instance.author_id,
+              kwargs['signal'] is post_delete, instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def log_recipe_event(sender, instance: Recipe, created: bool = False,
+                     **kwargs) -> None:
+    # New recipes can't be in anyone's lists yet.
+    if not created:
+        log_event(SyncEvent.Kind.RECIPE, instance.pk,
+                  kwargs['signal'] is post_delete)
@@ -0,0 +1,261 @@
+"""Similar recipes by Jaccard similarity of their ingredient sets.
+
+Recipes are rows of a binary sparse recipe × ingredient matrix,
+intersection sizes of a chunk of rows with every recipe are one
+sparse matrix product. A few very frequent ingredients (salt, water)
+would make that product dense, so they are packed into a bitmask
+per recipe: they count in the score, but recipes sharing only them
+are not candidates. Top-K neighbours are stored in `SimilarRecipe`.
+
+Edited recipes are queued in `SimilarRefresh` and refreshed by the
+`refreshsimilar` worker, off the request path.
+"""
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Window
+from django.db.models.functions import RowNumber
+from scipy import sparse
+
+from core.const import (SIMILAR_RECIPES_BATCH_SIZE, SIMILAR_RECIPES_CHUNK_SIZE,
+                        SIMILAR_RECIPES_FREQUENT_CACHE_KEY,
+                        SIMILAR_RECIPES_FREQUENT_MIN,
+                        SIMILAR_RECIPES_FREQUENT_SHARE,
+                        SIMILAR_RECIPES_MAX_REVERSE, SIMILAR_RECIPES_TOP_K,
+                        SIMILAR_REFRESH_BATCH_SIZE)
+from foodgram.models import (Recipe, RecipeIngredient, SimilarRecipe,
+                             SimilarRefresh)
+
+Neighbours = tuple[np.ndarray, np.ndarray, np.ndarray]
+
+MAX_FREQUENT = 64
+
+
+def select_frequent(ingredient_ids: np.ndarray, counts: np.ndarray,
+                    n_recipes: int) -> np.ndarray:
+    """Ingredients pruned from candidate generation, at most 64."""
+    order = np.argsort(-counts, kind='stable')[:MAX_FREQUENT]
+    counts = counts[order]
+    return ingredient_ids[order][
+        (counts > SIMILAR_RECIPES_FREQUENT_SHARE * n_recipes)
+        & (counts >= SIMILAR_RECIPES_FREQUENT_MIN)
+    ]
+
+
+def iter_neighbours(
+    recipe_ids: np.ndarray,
+    ingredient_ids: np.ndarray,
+    k: Optional[int] = SIMILAR_RECIPES_TOP_K,
+    sources: Optional[Iterable[int]] = None,
+    frequent: Optional[Iterable[int]] = None,
+    chunk_size: int = SIMILAR_RECIPES_CHUNK_SIZE,
+) -> Iterator[Neighbours]:
+    """Yield `(recipe ids, neighbour ids, scores)` chunks.
+
+    `recipe_ids` and `ingredient_ids` are pairs of the relation.
+    Neighbours of each source recipe are ordered by descending score,
+    `k=None` yields every neighbour. `frequent` ingredients are taken
+    from the pairs by default, an empty one gives exact results.
+    """
+    recipes, rows = np.unique(recipe_ids, return_inverse=True)
+    ingredients, columns = np.unique(ingredient_ids, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, columns)),
+        shape=(len(recipes), len(ingredients))
+    )
+    matrix.data[:] = 1
+    sizes = np.asarray(matrix.sum(axis=1)).ravel()
+
+    if frequent is None:
+        frequent = select_frequent(
+            ingredients, np.asarray(matrix.sum(axis=0)).ravel(), len(recipes)
+        )
+    is_frequent = np.isin(ingredients, list(frequent))
+    positions = np.cumsum(is_frequent) - 1
+
+    entries = matrix.tocoo()
+    frequent_entries = is_frequent[entries.col]
+    bits = np.zeros(len(recipes), dtype=np.uint64)
+    np.bitwise_or.at(bits, entries.row[frequent_entries], np.left_shift(
+        np.uint64(1),
+        positions[entries.col[frequent_entries]].astype(np.uint64)
+    ))
+    rare = matrix[:, np.flatnonzero(~is_frequent)].tocsr()
+    rare_transposed = rare.T.tocsr()
+
+    source_rows = (np.arange(len(recipes)) if sources is None
+                   else np.flatnonzero(np.isin(recipes, list(sources))))
+
+    for start in range(0, len(source_rows), chunk_size):
+        chunk = source_rows[start:start + chunk_size]
+        intersections = (rare[chunk] @ rare_transposed).tocoo()
+        source = chunk[intersections.row]
+        neighbour = intersections.col
+
+        not_self = source != neighbour
+        source, neighbour = source[not_self], neighbour[not_self]
+        common = (intersections.data[not_self].astype(np.float64)
+                  + np.bitwise_count(bits[source] & bits[neighbour]))
+        scores = common / (sizes[source] + sizes[neighbour] - common)
+
+        order = np.lexsort((neighbour, -scores, source))
+        source, neighbour, scores = (source[order], neighbour[order],
+                                     scores[order])
+        if k is not None:
+            group_starts = np.flatnonzero(np.r_[True, source[1:]
+                                                != source[:-1]])
+            group_sizes = np.diff(np.r_[group_starts, len(source)])
+            ranks = (np.arange(len(source))
+                     - np.repeat(group_starts, group_sizes))
+            top = ranks < k
+            source, neighbour, scores = (source[top], neighbour[top],
+                                         scores[top])
+
+        yield recipes[source], recipes[neighbour], scores
+
+
+def _get_pairs(queryset) -> tuple[np.ndarray, np.ndarray]:
+    pairs = np.fromiter(
+        (value
+         for pair in queryset.values_list('recipe_id', 'ingredient_id')
+         .order_by().iterator(chunk_size=SIMILAR_RECIPES_BATCH_SIZE)
+         for value in pair),
+        dtype=np.int64
+    ).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def get_frequent() -> list[int]:
+    """Frequent ingredients, stored by `rebuild_similar_recipes()`."""
+    frequent = cache.get(SIMILAR_RECIPES_FREQUENT_CACHE_KEY)
+    if frequent is None:
+        counts = np.array(
+            RecipeIngredient.objects.values('ingredient').annotate(
+                n=Count('pk')
+            ).filter(
+                n__gte=SIMILAR_RECIPES_FREQUENT_MIN
+            ).values_list('ingredient', 'n').order_by(),
+            dtype=np.int64
+        ).reshape(-1, 2)
+        frequent = select_frequent(counts[:, 0], counts[:, 1],
+                                   Recipe.objects.count()).tolist()
+        cache.set(SIMILAR_RECIPES_FREQUENT_CACHE_KEY, frequent, timeout=None)
+    return frequent
+
+
+def _create(neighbours: Iterable[Neighbours]) -> int:
+    n_created = 0
+    for recipe_ids, similar_ids, scores in neighbours:
+        SimilarRecipe.objects.bulk_create(
+            (SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id,
+                           score=score)
+             for recipe_id, similar_id, score in zip(
+                 recipe_ids.tolist(), similar_ids.tolist(), scores.tolist()
+            )),
+            batch_size=SIMILAR_RECIPES_BATCH_SIZE
+        )
+        n_created += len(recipe_ids)
+    return n_created
+
+
+def _trim(recipe_ids: set[int], k: int) -> None:
+    extra = SimilarRecipe.objects.filter(recipe__in=recipe_ids).annotate(
+        rank=Window(RowNumber(), partition_by=F('recipe'),
+                    order_by=(F('score').desc(), F('similar')))
+    ).filter(rank__gt=k).values_list('pk', flat=True)
+    SimilarRecipe.objects.filter(pk__in=list(extra)).delete()
+
+
+def rebuild_similar_recipes(k: int = SIMILAR_RECIPES_TOP_K) -> int:
+    """Recompute neighbours of every recipe, returns stored rows.
+
+    Refreshes queued so far are covered and dropped.
+    """
+    queued = SimilarRefresh.objects.aggregate(last=Max('pk'))['last']
+    recipe_ids, ingredient_ids = _get_pairs(RecipeIngredient.objects.all())
+    ingredients, counts = np.unique(ingredient_ids, return_counts=True)
+    frequent = select_frequent(ingredients, counts,
+                               len(np.unique(recipe_ids)))
+    with transaction.atomic():
+        SimilarRecipe.objects.all().delete()
+        n_created = _create(iter_neighbours(recipe_ids, ingredient_ids, k,
+                                            frequent=frequent))
+        if queued is not None:
+            SimilarRefresh.objects.filter(pk__lte=queued).delete()
+    cache.set(SIMILAR_RECIPES_FREQUENT_CACHE_KEY, frequent.tolist(),
+              timeout=None)
+    return n_created
+
+
+def queue_similar_refresh(ids: Iterable[int]) -> None:
+    """Have the neighbours of recipes `ids` refreshed by the worker.
+
+    Call in the transaction changing them, the worker sees them
+    once it commits.
+    """
+    SimilarRefresh.objects.bulk_create(
+        SimilarRefresh(recipe_id=pk) for pk in ids
+    )
+
+
+def refresh_next(batch_size: int = SIMILAR_REFRESH_BATCH_SIZE) -> int:
+    """Refresh a batch of the oldest queued recipes.
+
+    Returns the number of recipes refreshed, 0 when the queue
+    is empty. Workers running side by side take different rows.
+    """
+    with transaction.atomic():
+        queued = list(SimilarRefresh.objects.select_for_update(
+            skip_locked=True
+        ).order_by('pk').values_list('pk', 'recipe_id')[:batch_size])
+        if not queued:
+            return 0
+        recipe_ids = {recipe_id for _, recipe_id in queued}
+        refresh_similar_recipes(recipe_ids)
+        SimilarRefresh.objects.filter(pk__in=[pk for pk, _ in queued]).delete()
+    return len(recipe_ids)
+
+
+def refresh_similar_recipes(ids: Iterable[int],
+                            k: int = SIMILAR_RECIPES_TOP_K) -> None:
+    """Update neighbours after recipes `ids` were created or edited.
+
+    Lists of other recipes get the edited ones inserted or removed
+    only among their `SIMILAR_RECIPES_MAX_REVERSE` closest candidates,
+    so they are approximate until the next full rebuild.
+    """
+    ids = list(ids)
+    frequent = get_frequent()
+    candidates = RecipeIngredient.objects.filter(
+        ingredient__in=RecipeIngredient.objects.filter(
+            recipe__in=ids
+        ).exclude(ingredient__in=frequent).values('ingredient')
+    ).values('recipe')
+    recipe_ids, ingredient_ids = _get_pairs(RecipeIngredient.objects.filter(
+        Q(recipe__in=candidates) | Q(recipe__in=ids)
+    ))
+
+    forward, reverse = [], []
+    for source, neighbour, scores in iter_neighbours(
+        recipe_ids, ingredient_ids, None, ids, frequent
+    ):
+        for recipe_id in np.unique(source):
+            own = source == recipe_id
+            forward.append((source[own][:k], neighbour[own][:k],
+                            scores[own][:k]))
+            # Pairs of two edited recipes are already in `forward`.
+            own &= ~np.isin(neighbour, ids)
+            reverse.append((neighbour[own][:SIMILAR_RECIPES_MAX_REVERSE],
+                            source[own][:SIMILAR_RECIPES_MAX_REVERSE],
+                            scores[own][:SIMILAR_RECIPES_MAX_REVERSE]))
+
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(
+            Q(recipe__in=ids) | Q(similar__in=ids)
+        ).delete()
+        _create(forward)
+        _create(reverse)
+        _trim({recipe_id for recipe_ids, _, _ in reverse
+               for recipe_id in recipe_ids.tolist()}, k)
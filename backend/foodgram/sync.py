@@ -0,0 +1,168 @@
+"""Change log of user lists for incremental client sync.
+
+The client keeps the id of the last seen event as its cursor. Ids are
+assigned at insert but become visible at commit, so events are read
+in the order of the writing transaction's id (`txid`), then of their
+own id. In PostgreSQL only events of transactions older than the
+oldest one still running are read. Every event of a later commit then
+sorts after the cursor, however long its transaction ran. SQLite
+serializes writers, so ids already follow the commits.
+
+Bulk writes bypass the log. Imported recipes can't be in anyone's
+lists yet, and restoring a dataset calls `reset_cursors()`.
+"""
+from datetime import timedelta
+from typing import Any, Iterable, Optional
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import BigIntegerField, Func, Q
+from django.utils import timezone
+
+from core.const import SYNC_EVENTS_RETENTION_DAYS, SYNC_PAGE_SIZE
+from foodgram.models import Favorite, ShoppingCart, SyncEvent
+
+Kind = SyncEvent.Kind
+
+SECTIONS = {
+    Kind.FAVORITE: ('favorites', 'added', 'removed'),
+    Kind.SHOPPING_CART: ('shopping_cart', 'added', 'removed'),
+    Kind.SUBSCRIPTION: ('subscriptions', 'added', 'removed'),
+    Kind.RECIPE: ('recipes', 'updated', 'deleted'),
+}
+
+
+class CursorExpired(Exception):
+    """Events after the cursor were pruned, a full sync is needed."""
+
+
+class TransactionId(Func):
+    """Id of the current transaction, 0 outside PostgreSQL."""
+
+    output_field = BigIntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return '0', []
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return 'pg_current_xact_id()::text::bigint', []
+
+
+class OldestRunningTransactionId(Func):
+    """Transactions with lower ids have finished, committed or not."""
+
+    output_field = BigIntegerField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return 'pg_snapshot_xmin(pg_current_snapshot())::text::bigint', []
+
+
+def log_event(kind: Kind, object_id: int, is_deleted: bool,
+              user_id: Optional[int] = None) -> None:
+    SyncEvent.objects.create(user_id=user_id, kind=kind, object_id=object_id,
+                             is_deleted=is_deleted, txid=TransactionId())
+
+
+def log_events(kind: Kind, object_ids: Iterable[int], is_deleted: bool,
+               user_id: Optional[int] = None) -> None:
+    SyncEvent.objects.bulk_create(
+        SyncEvent(user_id=user_id, kind=kind, object_id=object_id,
+                  is_deleted=is_deleted, txid=TransactionId())
+        for object_id in object_ids
+    )
+
+
+def reset_cursors(using: str = DEFAULT_DB_ALIAS) -> None:
+    """Expire every cursor after lists were written around the log.
+
+    A marker event of no recipe is kept, as `prune_events()` keeps
+    the newest event, so cursors taken afterwards stay valid.
+    """
+    events = SyncEvent.objects.using(using)
+    with transaction.atomic(using=using):
+        events.all().delete()
+        events.create(kind=Kind.RECIPE, object_id=0, is_deleted=False,
+                      txid=TransactionId())
+
+
+def _visible_events():
+    events = SyncEvent.objects.all()
+    if connections[events.db].vendor == 'postgresql':
+        events = events.filter(txid__lt=OldestRunningTransactionId())
+    return events
+
+
+def get_cursor() -> int:
+    """Cursor to start from, taken before a full sync."""
+    return _visible_events().order_by('-txid', '-id').values_list(
+        'id', flat=True
+    ).first() or 0
+
+
+def get_changes(user_id: int, since: int,
+                limit: int = SYNC_PAGE_SIZE) -> dict[str, Any]:
+    """Latest state of everything changed for the user after `since`.
+
+    An object changed several times is reported once, by its last event.
+    """
+    if since:
+        txid = SyncEvent.objects.filter(id=since).values_list(
+            'txid', flat=True
+        ).first()
+        if txid is None:
+            raise CursorExpired
+        after = Q(txid__gt=txid) | Q(txid=txid, id__gt=since)
+    else:
+        oldest = SyncEvent.objects.order_by('id').values_list(
+            'id', flat=True
+        ).first()
+        if oldest is not None and oldest > 1:
+            raise CursorExpired
+        after = Q()
+
+    recipe_events = Q(user__isnull=True, kind=Kind.RECIPE)
+    events = list(_visible_events().filter(
+        Q(user_id=user_id)
+        | recipe_events & Q(object_id__in=Favorite.objects.filter(
+            user_id=user_id
+        ).values('recipe'))
+        | recipe_events & Q(object_id__in=ShoppingCart.objects.filter(
+            user_id=user_id
+        ).values('recipe')),
+        after
+    ).order_by('txid', 'id').values_list(
+        'id', 'kind', 'object_id', 'is_deleted'
+    )[:limit + 1])
+
+    states = {kind: {} for kind in SECTIONS}
+    for _, kind, object_id, is_deleted in events[:limit]:
+        states[kind][object_id] = is_deleted
+
+    changes = {
+        'cursor': events[:limit][-1][0] if events else since,
+        'has_more': len(events) > limit,
+    }
+    for kind, (section, present, deleted) in SECTIONS.items():
+        changes[section] = {
+            present: [pk for pk, gone in states[kind].items() if not gone],
+            deleted: [pk for pk, gone in states[kind].items() if gone],
+        }
+    return changes
+
+
+def prune_events(days: int = SYNC_EVENTS_RETENTION_DAYS) -> int:
+    """Delete events older than `days`, always keeping the newest one.
+
+    Cursors pointing at a deleted event have expired.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    keep_from = SyncEvent.objects.filter(
+        created_at__gte=cutoff
+    ).order_by('id').values_list('id', flat=True).first()
+    if keep_from is None:
+        keep_from = SyncEvent.objects.order_by('-id').values_list(
+            'id', flat=True
+        ).first()
+    if keep_from is None:
+        return 0
+    deleted, _ = SyncEvent.objects.filter(id__lt=keep_from).delete()
+    return deleted
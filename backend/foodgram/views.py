@@ -3,20 +3,17 @@ from django.http.response import HttpResponse, HttpResponsePermanentRedirect
 from django.views import View
 
 from core.const import FRONTEND_RECIPES_PATH
-from foodgram.models import RecipeShortLink
+from foodgram.cache import aget_short_link_recipe_id
 
 
 class RecipeShortLinkView(View):
-    def get(self, request: HttpRequest, slug: str) -> HttpResponse:
-        try:
-            short_link = RecipeShortLink.objects.select_related(
-                'recipe'
-            ).get(slug=slug)
-        except RecipeShortLink.DoesNotExist:
+    async def get(self, request: HttpRequest, slug: str) -> HttpResponse:
+        recipe_id = await aget_short_link_recipe_id(slug)
+        if recipe_id is None:
             redirect_url = request.build_absolute_uri('/not_found')
         else:
             redirect_url = request.build_absolute_uri(
-                f'/{FRONTEND_RECIPES_PATH}{short_link.recipe.pk}/'
+                f'/{FRONTEND_RECIPES_PATH}{recipe_id}/'
             )
 
         return HttpResponsePermanentRedirect(redirect_url)
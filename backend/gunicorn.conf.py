@@ -0,0 +1,17 @@
+"""Gunicorn settings, read from the working directory on start."""
+from os import getenv
+
+bind = '0.0.0.0:8000'
+worker_class = 'uvicorn_worker.UvicornWorker'
+workers = int(getenv('GUNICORN_WORKERS', '1'))
+
+# The application is imported and warmed up once in the master,
+# workers are forked from it with imports and caches in place.
+preload_app = getenv('GUNICORN_PRELOAD', 'True').title() == 'True'
+
+
+def pre_fork(server, worker) -> None:
+    if preload_app:
+        from core.warmup import release_connections
+
+        release_connections()
@@ -0,0 +1,18 @@
+import os
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+
+from core.asgi import CancelOnDisconnect, StreamASGIHandler
+from core.const import RECIPE_FEED_URL_PATH
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_foodgram.settings')
+
+application = CancelOnDisconnect(get_asgi_application(),
+                                 paths=(f'/api/{RECIPE_FEED_URL_PATH}',),
+                                 stream_app=StreamASGIHandler())
+
+if settings.WARM_UP_ON_START:
+    from core.warmup import warm_up
+
+    warm_up()
@@ -3,6 +3,8 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 
+from core.const import THROTTLE_CACHE_ALIAS
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 load_dotenv(BASE_DIR.parent / '.env')
@@ -32,6 +34,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.profiling.ProfilingMiddleware',
+    'core.middleware.QueryInspectionMiddleware',
+    'core.middleware.DegradedModeMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,6 +67,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'project_foodgram.wsgi.application'
 
+ASGI_APPLICATION = 'project_foodgram.asgi.application'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = "users.User"
@@ -68,15 +76,50 @@ AUTH_USER_MODEL = "users.User"
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3' if DEBUG else 'django.db.backends.postgresql',
+        'ENGINE': 'django.db.backends.sqlite3' if DEBUG else 'core.db.postgresql',
         'NAME': BASE_DIR / 'db.sqlite3' if DEBUG else getenv('POSTGRES_DB', 'postgres'),
         'USER': getenv('POSTGRES_USER', 'postgres'),
         'PASSWORD': getenv('POSTGRES_PASSWORD', 'postgres'),
         'HOST': getenv('POSTGRES_HOST', '127.0.0.1'),
-        'PORT': getenv('POSTGRES_PORT', 5432)
+        'PORT': getenv('POSTGRES_PORT', 5432),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+if not DEBUG:
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(getenv('POSTGRES_POOL_MIN_SIZE', 2)),
+            'max_size': int(getenv('POSTGRES_POOL_MAX_SIZE', 10)),
+            'timeout': float(getenv('POSTGRES_POOL_TIMEOUT', 10)),
+            'max_idle': float(getenv('POSTGRES_POOL_MAX_IDLE', 600)),
+            'max_lifetime': float(getenv('POSTGRES_POOL_MAX_LIFETIME', 3600)),
+        }
+    }
+
+    for index, replica in enumerate(getenv('POSTGRES_REPLICA_HOSTS', '').split()):
+        replica_host, _, replica_port = replica.partition(':')
+        DATABASES[f'replica_{index}'] = {
+            **DATABASES['default'],
+            'HOST': replica_host,
+            'PORT': replica_port or DATABASES['default']['PORT'],
+            'TEST': {'MIRROR': 'default'},
+        }
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+REPLICA_MAX_LAG = float(getenv('POSTGRES_REPLICA_MAX_LAG', 5))
+
+REPLICA_CHECK_INTERVAL = float(getenv('POSTGRES_REPLICA_CHECK_INTERVAL', 10))
+
+REPLICA_PIN_SECONDS = int(getenv('POSTGRES_REPLICA_PIN_SECONDS', 10))
+
+DB_BREAKER_FAILURES = int(getenv('DJANGO_DB_BREAKER_FAILURES', 5))
+
+DB_BREAKER_RESET_SECONDS = float(getenv('DJANGO_DB_BREAKER_RESET_SECONDS', 30))
+
+STALE_RESPONSE_TIMEOUT = int(getenv('DJANGO_STALE_RESPONSE_TIMEOUT', 24 * 60 * 60))
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -101,14 +144,84 @@ MEDIA_URL = 'media/'
 
 MEDIA_ROOT = BASE_DIR / 'media'
 
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.FileCache',
+        'LOCATION': getenv('DJANGO_CACHE_LOCATION', '/tmp/foodgram_cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(getenv('DJANGO_CACHE_MAX_ENTRIES', '100000')),
+        },
+    },
+    # Apart, so throttled clients can't cull the cached data.
+    THROTTLE_CACHE_ALIAS: {
+        'BACKEND': 'core.cache.FileCache',
+        'LOCATION': getenv('THROTTLE_CACHE_LOCATION',
+                           '/tmp/foodgram_throttle'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(getenv('THROTTLE_CACHE_MAX_ENTRIES', '100000')),
+        },
+    },
+}
+
+STORAGES = {
+    'default': {'BACKEND': 'core.storage.ContentAddressedStorage'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'
+    },
+}
+
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework.authentication.TokenAuthentication',),
+    'DEFAULT_AUTHENTICATION_CLASSES': ('api.authentication.TokenAuthentication',),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer',
+        'api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.ORJSONParser',
+        'api.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PERMISSION_CLASSES': ('rest_framework.permissions.AllowAny',),
+    'DEFAULT_THROTTLE_CLASSES': ('api.throttling.CostThrottle',),
+    'NUM_PROXIES': int(getenv('DJANGO_NUM_PROXIES', '1')),
     'DEFAULT_FILTER_BACKENDS': ('django_filters.rest_framework.DjangoFilterBackend',),
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
 }
 
+THROTTLE_BUCKET_CAPACITY = int(getenv('THROTTLE_BUCKET_CAPACITY', '120'))
+THROTTLE_BUCKET_RATE = float(getenv('THROTTLE_BUCKET_RATE', '2'))
+THROTTLE_DEFAULT_COST = 1
+THROTTLE_BYTES_PER_TOKEN = 256 * 1024
+THROTTLE_COSTS = {
+    'recipes-download-shopping-cart': 20,
+    'recipes-get-link': 5,
+    'recipes-list:post': 10,
+    'recipes-list:ndjson': 30,
+    'recipes-detail:patch': 10,
+    'users-avatar': 10,
+}
+
+WARM_UP_ON_START = getenv('DJANGO_WARM_UP', 'True').title() == 'True'
+WARM_UP_TASKS = (
+    'core.warmup.init_image_plugins',
+    'core.warmup.populate_url_resolver',
+    'api.warmup.compile_serializers',
+    'api.warmup.warm_reference_cache',
+    'foodgram.pantry.warm_pantry_index',
+)
+
+QUERY_INSPECTION = getenv('DJANGO_QUERY_INSPECTION', 'warn' if DEBUG else 'off')
+QUERY_BUDGETS_FILE = BASE_DIR / 'query_budgets.json'
+
+PROFILING_RATE = float(getenv('DJANGO_PROFILING_RATE', '0'))
+PROFILING_ON_DEMAND = getenv('DJANGO_PROFILING_ON_DEMAND', 'False').title() == 'True'
+PROFILING_DIR = getenv('DJANGO_PROFILING_DIR', BASE_DIR / 'profiles')
+
+FAST_SERIALIZERS = getenv('DJANGO_FAST_SERIALIZERS', 'True').title() == 'True'
+
 DJOSER = {
     'HIDE_USERS': False,
     'SERIALIZERS': {
@@ -1,11 +1,17 @@
 from django.contrib import admin
 from django.urls import include, path
 
-from core.const import SHORT_LINK_URL_PATH
+from core.const import (HEALTHZ_URL_PATH, METRICS_URL_PATH, READYZ_URL_PATH,
+                        SHORT_LINK_URL_PATH)
+from core.views import healthz, metrics, readyz
 from foodgram.views import RecipeShortLinkView
 
 urlpatterns = (
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
-    path(f'{SHORT_LINK_URL_PATH}<slug:slug>', RecipeShortLinkView.as_view())
+    path(f'{SHORT_LINK_URL_PATH}<slug:slug>', RecipeShortLinkView.as_view(),
+         name='short-link'),
+    path(METRICS_URL_PATH, metrics),
+    path(HEALTHZ_URL_PATH, healthz),
+    path(READYZ_URL_PATH, readyz),
 )
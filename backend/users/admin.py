@@ -1,14 +1,19 @@
 from django.contrib import admin as admin_site
 from django.contrib.auth import admin, get_user_model, models
-from django.db.models import Count
+from django.db.models import OuterRef
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
+from core.admin import (EstimatedCountPaginator, SoftDeleteAdminMixin,
+                        SubqueryCount)
+from foodgram.deletion import mark_users_deleted
+from foodgram.models import Recipe
 from users.models import Subscription, User
 
 
 @admin_site.register(get_user_model())
-class UserAdmin(admin.UserAdmin):
+class UserAdmin(SoftDeleteAdminMixin, admin.UserAdmin):
+    mark_deleted = staticmethod(mark_users_deleted)
     list_display = (
         'username',
         'first_name',
@@ -37,18 +42,25 @@ class UserAdmin(admin.UserAdmin):
     list_filter = ('is_active', 'is_staff')
     search_fields = ('username', 'email')
     ordering = ('username',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     @admin_site.display(description='подписчиков')
     def n_subscribers(self, obj: User) -> int:
-        return obj.subscriptions_on_author__count
+        return obj.subscribers_count
 
     @admin_site.display(description='рецептов')
     def n_users_recipes(self, obj: User) -> int:
-        return obj.recipes__count
+        return obj.recipes_count
 
     def get_queryset(self, request: HttpRequest) -> QuerySet:
         return super().get_queryset(request).annotate(
-            Count('subscriptions_on_author'), Count('recipes')
+            subscribers_count=SubqueryCount(Subscription.objects.filter(
+                author=OuterRef('pk')
+            ).values('pk')),
+            recipes_count=SubqueryCount(Recipe.objects.filter(
+                author=OuterRef('pk')
+            ).values('pk')),
         )
 
 
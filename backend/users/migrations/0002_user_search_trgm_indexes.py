@@ -0,0 +1,27 @@
+from django.db import migrations
+
+import core.db.operations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        core.db.operations.PostgresRunSQL(
+            sql='CREATE EXTENSION IF NOT EXISTS pg_trgm;',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        core.db.operations.PostgresRunSQL(
+            sql='CREATE INDEX user_username_trgm_idx ON users_user '
+                'USING gin ((UPPER(username::text)) gin_trgm_ops);',
+            reverse_sql='DROP INDEX user_username_trgm_idx;',
+        ),
+        core.db.operations.PostgresRunSQL(
+            sql='CREATE INDEX user_email_trgm_idx ON users_user '
+                'USING gin ((UPPER(email::text)) gin_trgm_ops);',
+            reverse_sql='DROP INDEX user_email_trgm_idx;',
+        ),
+    ]
@@ -1,10 +1,18 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import UserManager as BaseUserManager
 from django.db import models
 
 from core.const import MAX_EMAIL_LENGTH, MAX_USER_FIRST_LAST_NAME_LENGTH
 from core.factories import make_model_str
 
 
+class UserManager(BaseUserManager):
+    """Users not marked as deleted."""
+
+    def get_queryset(self) -> models.QuerySet:
+        return super().get_queryset().filter(deleted_at=None)
+
+
 class User(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS: tuple[str, ...] = ('username', 'first_name', 'last_name')
@@ -20,6 +28,14 @@ class User(AbstractUser):
 
     avatar = models.ImageField('Аватар', upload_to='avatars', blank=True)
 
+    deleted_at = models.DateTimeField('Удалён', null=True, blank=True,
+                                      editable=False)
+
+    objects = UserManager()
+
+    # Deleted users too, until `purgedeleted` removes them.
+    all_objects = models.Manager()
+
     class Meta:
         ordering = ('username',)
         verbose_name = 'пользователь'